@@ -0,0 +1,165 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+from products import Product
+from store import Store
+
+# Marks the end of the order queue, see AsyncStore.close()
+_CLOSE = object()
+
+
+class AsyncStore:
+    """
+    An asyncio front end for a Store.
+
+    Orders from many coroutines are queued, and orders arriving within a
+    short window are coalesced into a batch placed with
+    Store.order_batch(), which takes the stock locks and waits for the
+    journal once per batch. Store calls run one at a time on a worker
+    thread, so the event loop never blocks on locks or disk syncs. The
+    queue is bounded, so callers wait for room once too many orders are
+    pending.
+
+    Attributes:
+        store (Store): The store receiving the orders.
+
+    Methods:
+        order(shopping_list) -> float:
+            Queues an order and returns its total price once processed.
+
+        get_all_products() -> List[Product]:
+            Returns a list of all active products in the store.
+
+        get_total_quantity() -> int:
+            Returns the total quantity of all products in the store.
+
+        close():
+            Processes the pending orders and stops the batch worker.
+    """
+
+    def __init__(self, store: Store, batch_window=0.001, max_batch=256,
+                 max_pending=1024):
+        """
+        Initializes a new instance of the AsyncStore class.
+
+        Args:
+            store (Store): The store receiving the orders.
+            batch_window (float): Seconds to wait for more orders after
+                the first order of a batch arrives. Defaults to 0.001.
+            max_batch (int): Maximum number of orders per batch.
+                Defaults to 256.
+            max_pending (int): Maximum number of queued orders before
+                order() waits for room. Defaults to 1024.
+        """
+        if max_batch < 1 or max_pending < 1:
+            raise ValueError("Batch and queue sizes must be positive")
+        self.store = store
+        self._batch_window = batch_window
+        self._max_batch = max_batch
+        self._queue = asyncio.Queue(maxsize=max_pending)
+        self._worker = None
+        self._executor = None  # Thread making the store calls, see _call()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def order(self, shopping_list: List[Tuple[Product, int]]) -> float:
+        """
+        Queues an order and waits until its batch has been processed.
+
+        Args:
+            shopping_list (List[Tuple[Product, int]]): A list of tuples,
+                where each tuple contains a Product and an integer quantity.
+
+        Returns:
+            float: The total price of the order.
+
+        Raises:
+            ValueError: If the order is rejected by the store.
+        """
+        if self._worker is None:
+            self._worker = asyncio.get_running_loop().create_task(
+                self._process_batches())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((shopping_list, future))
+        return await future
+
+    async def get_all_products(self) -> List[Product]:
+        """
+        Returns a list of all active products in the store.
+        """
+        return await self._call(self.store.get_all_products)
+
+    async def get_total_quantity(self) -> int:
+        """
+        Returns the total quantity of all products in the store.
+        """
+        return await self._call(self.store.get_total_quantity)
+
+    async def close(self):
+        """
+        Processes the orders still queued and stops the batch worker.
+        """
+        if self._worker is not None:
+            await self._queue.put(_CLOSE)
+            await self._worker
+            self._worker = None
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    async def _call(self, function, *args):
+        """
+        Runs a store call on the worker thread and returns its result.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, function, *args)
+
+    async def _process_batches(self):
+        """
+        Collects queued orders into batches and processes them until
+        close() is called.
+        """
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            if batch[0] is not _CLOSE and self._batch_window > 0:
+                await asyncio.sleep(self._batch_window)
+            while len(batch) < self._max_batch and not queue.empty() \
+                    and batch[-1] is not _CLOSE:
+                batch.append(queue.get_nowait())
+
+            closing = batch[-1] is _CLOSE
+            if closing:
+                batch.pop()
+            await self._process_batch(batch)
+            if closing:
+                return
+
+    async def _process_batch(self, batch):
+        """
+        Places the orders of a batch with one Store.order_batch() call,
+        and hands every caller its result.
+        """
+        batch = [(shopping_list, future) for shopping_list, future in batch
+                 if not future.cancelled()]
+        if not batch:
+            return
+        try:
+            results = await self._call(
+                self.store.order_batch,
+                [shopping_list for shopping_list, _ in batch])
+        except Exception as error:  # Reported to every waiting caller
+            results = [error] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.cancelled():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
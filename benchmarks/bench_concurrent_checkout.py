@@ -0,0 +1,97 @@
+"""
+Stress test for concurrent checkout: hammers Store.order from several
+threads and checks the stock invariants afterwards.
+
+Usage:
+    python benchmarks/bench_concurrent_checkout.py [threads] [orders]
+"""
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import products  # noqa: E402
+import store  # noqa: E402
+
+PRODUCT_COUNT = 200
+INITIAL_QUANTITY = 500
+
+
+def run(thread_count, orders_per_thread, thread_safe):
+    """
+    Runs the stress test once and returns (seconds, sold units per product,
+    store).
+    """
+    catalog = [products.Product(f"Product {index}", price=10,
+                                quantity=INITIAL_QUANTITY, product_id=index)
+               for index in range(PRODUCT_COUNT)]
+    store_obj = store.Store(catalog, thread_safe=thread_safe)
+    sold = [[0] * PRODUCT_COUNT for _ in range(thread_count)]
+
+    def worker(worker_index):
+        rng = random.Random(worker_index)
+        counts = sold[worker_index]
+        for _ in range(orders_per_thread):
+            lines = [(catalog[rng.randrange(PRODUCT_COUNT)],
+                      rng.randint(1, 3)) for _ in range(rng.randint(1, 4))]
+            try:
+                store_obj.order(lines)
+            except ValueError:
+                continue
+            for product, quantity in lines:
+                counts[product.product_id] += quantity
+
+    threads = [threading.Thread(target=worker, args=(index,))
+               for index in range(thread_count)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    totals = [sum(counts[index] for counts in sold)
+              for index in range(PRODUCT_COUNT)]
+    return seconds, totals, store_obj
+
+
+def check_invariants(totals, store_obj):
+    """
+    Returns a list of violated stock invariants.
+    """
+    problems = []
+    for product in store_obj.products:
+        expected = INITIAL_QUANTITY - totals[product.product_id]
+        if product.get_quantity() != expected:
+            problems.append(f"{product.name}: stock {product.get_quantity()}"
+                            f", expected {expected}")
+        if product.get_quantity() < 0:
+            problems.append(f"{product.name}: oversold")
+    if store_obj.get_total_quantity() != sum(
+            product.get_quantity() for product in store_obj.products):
+        problems.append("total quantity aggregate out of sync")
+    return problems
+
+
+def main():
+    thread_count = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    orders_per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    # Switch threads often to make races likely
+    sys.setswitchinterval(1e-5)
+    for thread_safe in (False, True):
+        seconds, totals, store_obj = run(thread_count, orders_per_thread,
+                                         thread_safe)
+        problems = check_invariants(totals, store_obj)
+        orders = thread_count * orders_per_thread
+        print(f"thread_safe={thread_safe}: {orders} orders from "
+              f"{thread_count} threads in {seconds:.3f}s "
+              f"({orders / seconds:,.0f} orders/s), "
+              f"{len(problems)} invariant violations")
+        for problem in problems[:5]:
+            print(f"  {problem}")
+
+
+if __name__ == "__main__":
+    main()
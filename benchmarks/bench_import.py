@@ -0,0 +1,76 @@
+"""
+Measures the throughput of importer.import_feed on a generated feed.
+
+Usage:
+    python benchmarks/bench_import.py [rows] [csv|jsonl]
+"""
+import csv
+import json
+import os
+import sys
+import resource
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import importer  # noqa: E402
+import promotions  # noqa: E402
+import store  # noqa: E402
+
+FIELDS = ["product_id", "name", "price", "quantity", "type", "maximum",
+          "promotion"]
+
+
+def generate_rows(count):
+    """
+    Yields feed rows mixing the product types, with one bad row in 1000.
+    """
+    for index in range(count):
+        row = {"product_id": index, "name": f"Product {index}",
+               "price": 10 + index % 990, "quantity": index % 500,
+               "type": "product", "maximum": "", "promotion": ""}
+        if index % 10 == 0:
+            row["type"] = "non_stocked"
+        elif index % 10 == 1:
+            row["type"], row["maximum"] = "limited", 5
+        if index % 4 == 0:
+            row["promotion"] = "30% off!"
+        if index % 1000 == 999:
+            row["price"] = -1
+        yield row
+
+
+def write_feed(path, count, feed_format):
+    with open(path, "w", newline="", encoding="utf-8") as feed_file:
+        if feed_format == "csv":
+            writer = csv.DictWriter(feed_file, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(generate_rows(count))
+        else:
+            for row in generate_rows(count):
+                feed_file.write(json.dumps(row) + "\n")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+    feed_format = sys.argv[2] if len(sys.argv) > 2 else "csv"
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f"feed.{feed_format}")
+        write_feed(path, count, feed_format)
+        catalog_promotions = {
+            "30% off!": promotions.PercentDiscount("30% off!", percent=30)}
+
+        start = time.perf_counter()
+        report = importer.import_feed(store.Store(), path, feed_format,
+                                      catalog_promotions)
+        seconds = time.perf_counter() - start
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{report} in {seconds:.1f}s "
+          f"({report.rows / seconds:,.0f} rows/s), "
+          f"peak RSS {peak / 2 ** 10:,.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Compares the memory taken by a catalog of Product objects against the
+same catalog in a columnar ProductTable, measured with tracemalloc.
+
+Usage:
+    python benchmarks/bench_memory.py [products]
+"""
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import products  # noqa: E402
+import product_table  # noqa: E402
+
+
+def build_objects(count):
+    catalog = []
+    for index in range(count):
+        if index % 10 == 1:
+            catalog.append(products.LimitedProduct(
+                f"Product {index}", price=index % 1000, quantity=100,
+                maximum=5, product_id=index))
+        else:
+            catalog.append(products.Product(
+                f"Product {index}", price=index % 1000, quantity=100,
+                product_id=index))
+    return catalog
+
+
+def build_table(count):
+    table = product_table.ProductTable()
+    for index in range(count):
+        if index % 10 == 1:
+            table.append(f"Product {index}", index % 1000, 100,
+                         kind=product_table.KIND_LIMITED, maximum=5,
+                         product_id=index)
+        else:
+            table.append(f"Product {index}", index % 1000, 100,
+                         product_id=index)
+    return table
+
+
+def measure(builder, count):
+    """
+    Returns the bytes still allocated after building the catalog.
+    """
+    gc.collect()
+    tracemalloc.start()
+    catalog = builder(count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del catalog
+    return current
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    for label, builder in (("Product objects (__slots__)", build_objects),
+                           ("ProductTable columns", build_table)):
+        size = measure(builder, count)
+        print(f"{label}: {size / 2 ** 20:,.1f} MiB "
+              f"({size / count:.0f} bytes/product)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Compares Store.order throughput in float dollars and in integer cents.
+
+Usage:
+    python benchmarks/bench_money.py [orders] [products]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_order_many import build_store, build_orders, bind  # noqa: E402
+
+
+def time_orders(money, orders, product_count, repeat=3):
+    """
+    Returns the best time to place all orders in a fresh store.
+    """
+    best = None
+    for _ in range(repeat):
+        store_obj = build_store(product_count, money=money)
+        bound = bind(store_obj, orders)
+        # Compile the pricing functions before timing
+        for shopping_list in bound[:product_count]:
+            for product, quantity in shopping_list:
+                product.get_price(quantity)
+                product.get_price_cents(quantity)
+        start = time.perf_counter()
+        for shopping_list in bound:
+            store_obj.order(shopping_list)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def main():
+    order_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    product_count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    orders = build_orders(order_count, product_count)
+    float_seconds = time_orders("float", orders, product_count)
+    cents_seconds = time_orders("cents", orders, product_count)
+    print(f"{order_count} orders over {product_count} products")
+    print(f"float dollars: {float_seconds:.3f}s "
+          f"({order_count / float_seconds:,.0f} orders/s)")
+    print(f"integer cents: {cents_seconds:.3f}s "
+          f"({order_count / cents_seconds:,.0f} orders/s)")
+
+
+if __name__ == "__main__":
+    main()
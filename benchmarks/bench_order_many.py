@@ -0,0 +1,95 @@
+"""
+Compares Store.order_many against calling Store.order in a loop.
+
+Usage:
+    python benchmarks/bench_order_many.py [orders] [products]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import products  # noqa: E402
+import promotions  # noqa: E402
+import store  # noqa: E402
+
+
+def build_store(product_count, **store_options):
+    """
+    Builds a store with a mix of product types and promotions.
+    """
+    catalog_promotions = [None,
+                          promotions.PercentDiscount("30% off!", percent=30),
+                          promotions.SecondHalfPrice("Second Half price!"),
+                          promotions.ThirdOneFree("Third One Free!")]
+    catalog = []
+    for index in range(product_count):
+        if index % 10 == 0:
+            product = products.NonStockedProduct(f"License {index}",
+                                                 price=125,
+                                                 product_id=index)
+        elif index % 10 == 1:
+            product = products.LimitedProduct(f"Shipping {index}", price=10,
+                                              quantity=10 ** 9, maximum=5,
+                                              product_id=index)
+        else:
+            product = products.Product(f"Product {index}",
+                                       price=10 + index % 990,
+                                       quantity=10 ** 9, product_id=index)
+        promotion = catalog_promotions[index % len(catalog_promotions)]
+        if promotion:
+            product.set_promotion(promotion)
+        catalog.append(product)
+    return store.Store(catalog, **store_options)
+
+
+def build_orders(order_count, product_count, seed=42):
+    """
+    Builds shopping lists as (product_id, quantity) pairs.
+    """
+    rng = random.Random(seed)
+    return [[(rng.randrange(product_count), rng.randint(1, 5))
+             for _ in range(rng.randint(1, 8))]
+            for _ in range(order_count)]
+
+
+def bind(store_obj, orders):
+    """
+    Resolves product IDs to the store's product objects.
+    """
+    return [[(store_obj.get_product(product_id), quantity)
+             for product_id, quantity in shopping_list]
+            for shopping_list in orders]
+
+
+def main():
+    order_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    product_count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    orders = build_orders(order_count, product_count)
+
+    looped = build_store(product_count)
+    looped_orders = bind(looped, orders)
+    start = time.perf_counter()
+    for shopping_list in looped_orders:
+        looped.order(shopping_list)
+    loop_seconds = time.perf_counter() - start
+
+    batched = build_store(product_count)
+    batched_orders = bind(batched, orders)
+    start = time.perf_counter()
+    batched.order_many(batched_orders)
+    batch_seconds = time.perf_counter() - start
+
+    assert looped.get_total_quantity() == batched.get_total_quantity()
+    print(f"{order_count} orders over {product_count} products")
+    print(f"Store.order loop: {loop_seconds:.3f}s "
+          f"({order_count / loop_seconds:,.0f} orders/s)")
+    print(f"Store.order_many: {batch_seconds:.3f}s "
+          f"({order_count / batch_seconds:,.0f} orders/s)")
+    print(f"Speedup: {loop_seconds / batch_seconds:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark for ShardedStore: measures checkout throughput with 1 to N
+worker processes, next to a single-process Store.
+
+Usage:
+    python benchmarks/bench_sharding.py [max_shards] [orders] [batch_size]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import products  # noqa: E402
+import sharding  # noqa: E402
+import store  # noqa: E402
+
+PRODUCT_COUNT = 10000
+
+
+def build_catalog():
+    """
+    Returns products with enough stock that no order is rejected.
+    """
+    return [products.Product(f"Product {index}", price=10,
+                             quantity=10 ** 9, product_id=index)
+            for index in range(PRODUCT_COUNT)]
+
+
+def build_orders(catalog, order_count):
+    """
+    Returns order_count shopping lists of one to four random lines.
+    """
+    rng = random.Random(42)
+    return [[(catalog[rng.randrange(PRODUCT_COUNT)], rng.randint(1, 3))
+             for _ in range(rng.randint(1, 4))]
+            for _ in range(order_count)]
+
+
+def bench_single(order_count):
+    """
+    Returns the orders per second of one Store placing every order.
+    """
+    catalog = build_catalog()
+    orders = build_orders(catalog, order_count)
+    store_obj = store.Store(catalog)
+    start = time.perf_counter()
+    for shopping_list in orders:
+        store_obj.order(shopping_list)
+    return order_count / (time.perf_counter() - start)
+
+
+def bench_sharded(shard_count, order_count, batch_size):
+    """
+    Returns the orders per second of a ShardedStore, and the share of
+    orders spanning several shards.
+    """
+    catalog = build_catalog()
+    orders = build_orders(catalog, order_count)
+    cross_shard = sum(
+        len({hash(product.product_id) % shard_count
+             for product, _ in shopping_list}) > 1
+        for shopping_list in orders) / order_count
+    with sharding.ShardedStore(catalog, shards=shard_count) as store_obj:
+        start = time.perf_counter()
+        for offset in range(0, order_count, batch_size):
+            results = store_obj.order_batch(orders[offset:offset + batch_size])
+            assert not any(isinstance(result, ValueError)
+                           for result in results)
+        seconds = time.perf_counter() - start
+    return order_count / seconds, cross_shard
+
+
+def main():
+    max_shards = int(sys.argv[1]) if len(sys.argv) > 1 \
+        else os.cpu_count() or 1
+    order_count = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+    print(f"{os.cpu_count()} CPUs, {order_count} orders, "
+          f"batches of {batch_size}")
+    baseline = bench_single(order_count)
+    print(f"single Store: {baseline:,.0f} orders/s")
+    for shard_count in range(1, max_shards + 1):
+        rate, cross_shard = bench_sharded(shard_count, order_count,
+                                          batch_size)
+        print(f"{shard_count} shards: {rate:,.0f} orders/s "
+              f"({rate / baseline:.2f}x single Store, "
+              f"{cross_shard:.0%} cross-shard orders)")
+
+
+if __name__ == "__main__":
+    main()
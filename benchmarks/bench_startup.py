@@ -0,0 +1,118 @@
+"""
+Startup benchmark: measures the time from launching main.py to its
+first menu prompt, with the catalog loaded from a prebuilt snapshot
+("artifact") and, for comparison, rebuilt from Python objects the way
+the demo inventory is ("rebuild"), at several catalog sizes.
+
+Every run is a fresh interpreter, so the time includes interpreter
+startup and every import.
+
+Usage:
+    python benchmarks/bench_startup.py [--sizes 10000,100000,1000000]
+        [--repeat 5] [--modes artifact,rebuild] [--output results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from main import MENU_PROMPT  # noqa: E402
+from snapshot import write_snapshot  # noqa: E402
+from workload import build_catalog  # noqa: E402
+
+# Starts the menu on a catalog built from Python objects
+REBUILD_SCRIPT = """
+import sys
+sys.path[:0] = [{root!r}, {benchmarks!r}]
+import main
+import store
+from workload import build_catalog
+main.start(store.Store(build_catalog({product_count})))
+"""
+
+
+def time_to_prompt(command) -> float:
+    """
+    Launches command and returns the seconds until it prompts for a menu
+    choice, then quits it through the menu.
+    """
+    prompt = MENU_PROMPT.encode()
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE)
+    output = b""
+    while not output.endswith(prompt):
+        chunk = os.read(process.stdout.fileno(), 65536)
+        if not chunk:
+            raise RuntimeError(f"{command} exited before the menu prompt")
+        output += chunk
+    elapsed = time.perf_counter() - started
+    process.communicate(b"4\n")
+    return elapsed
+
+
+def run_size(product_count, modes, repeat, directory):
+    """
+    Times every startup mode on a catalog of product_count products.
+
+    Returns:
+        Dict[str, dict]: The fastest and median startup in seconds
+        by mode.
+    """
+    commands = {}
+    if "artifact" in modes:
+        path = os.path.join(directory, f"catalog-{product_count}.snap")
+        write_snapshot(build_catalog(product_count), path)
+        commands["artifact"] = [sys.executable, "main.py", path]
+    if "rebuild" in modes:
+        commands["rebuild"] = [sys.executable, "-c", REBUILD_SCRIPT.format(
+            root=ROOT, benchmarks=os.path.join(ROOT, "benchmarks"),
+            product_count=product_count)]
+
+    results = {}
+    for mode, command in commands.items():
+        seconds = sorted(time_to_prompt(command) for _ in range(repeat))
+        results[mode] = {"min_s": seconds[0],
+                         "median_s": seconds[len(seconds) // 2]}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000",
+                        help="comma separated catalog sizes")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="launches per catalog size and mode")
+    parser.add_argument("--modes", default="artifact,rebuild",
+                        help="comma separated startup modes to time")
+    parser.add_argument("--output", help="file to save the results to")
+    args = parser.parse_args()
+
+    modes = args.modes.split(",")
+    results = {}
+    print(f"{'catalog':>10}{'mode':>10}{'min s':>10}{'median s':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for product_count in [int(size) for size in args.sizes.split(",")]:
+            for mode, result in run_size(product_count, modes, args.repeat,
+                                         directory).items():
+                results[f"{mode}@{product_count}"] = result
+                print(f"{product_count:>10}{mode:>10}"
+                      f"{result['min_s']:>10.3f}{result['median_s']:>10.3f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({"python": platform.python_version(),
+                       "platform": platform.platform(),
+                       "cpus": os.cpu_count(),
+                       "repeat": args.repeat,
+                       "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
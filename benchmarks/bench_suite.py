@@ -0,0 +1,207 @@
+"""
+Checkout benchmark suite: measures throughput and p50/p99 latency of
+Store.order, Store.quote, Store.quote_many, Product.buy, each
+Promotion.apply_promotion, Store.get_all_products and
+Store.get_total_quantity at several catalog sizes, on a
+Zipf-distributed order stream.
+
+Results can be saved as JSON and compared against an earlier run; the
+comparison exits with status 1 if any benchmark regressed.
+
+Usage:
+    python benchmarks/bench_suite.py [--sizes 1000,10000,100000]
+        [--orders 20000] [--repeat 3] [--output results.json]
+        [--compare baseline.json] [--threshold 0.1]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import store  # noqa: E402
+from workload import PROMOTION_MIX, build_catalog, zipf_orders  # noqa: E402
+
+# Calls timed together per latency sample, so sub-microsecond
+# operations are not swamped by the timer itself
+SAMPLE_BATCH = 100
+
+
+def measure(call, arguments, batch=1):
+    """
+    Times call(*args) for every args in arguments.
+
+    Args:
+        call (callable): The operation to time.
+        arguments (List[tuple]): The arguments of each call.
+        batch (int): Number of calls timed together per sample.
+
+    Returns:
+        Dict[str, float]: Calls per second and the p50/p99 latency
+        of one call in microseconds.
+    """
+    clock = time.perf_counter_ns
+    samples = []
+    for start in range(0, len(arguments) - batch + 1, batch):
+        chunk = arguments[start:start + batch]
+        began = clock()
+        for args in chunk:
+            call(*args)
+        samples.append((clock() - began) / batch)
+    samples.sort()
+    total_ns = sum(samples) * batch
+    return {
+        "calls": len(samples) * batch,
+        "ops_per_sec": len(samples) * batch / (total_ns / 1e9),
+        "p50_us": samples[len(samples) // 2] / 1e3,
+        "p99_us": samples[min(len(samples) - 1,
+                              len(samples) * 99 // 100)] / 1e3,
+    }
+
+
+def run_size(product_count, order_count):
+    """
+    Runs every benchmark on a catalog of product_count products.
+
+    Returns:
+        Dict[str, dict]: The measurements by benchmark name.
+    """
+    results = {}
+    catalog = build_catalog(product_count)
+    orders = zipf_orders(catalog, order_count)
+    store_obj = store.Store(catalog)
+    results["Store.order"] = measure(
+        store_obj.order, [(shopping_list,) for shopping_list in orders])
+
+    results["Store.quote"] = measure(
+        store_obj.quote, [(shopping_list,) for shopping_list in orders])
+    # Each call quotes SAMPLE_BATCH carts
+    results[f"Store.quote_many[{SAMPLE_BATCH}]"] = measure(
+        store_obj.quote_many,
+        [(orders[start:start + SAMPLE_BATCH],)
+         for start in range(0, len(orders), SAMPLE_BATCH)])
+
+    lines = [line for shopping_list in orders for line in shopping_list]
+    loose = {product.product_id: product
+             for product in build_catalog(product_count)}
+    results["Product.buy"] = measure(
+        lambda product_id, quantity: loose[product_id].buy(quantity),
+        [(product.product_id, quantity) for product, quantity in lines],
+        SAMPLE_BATCH)
+
+    for promotion, _ in PROMOTION_MIX:
+        results[f"{type(promotion).__name__}.apply_promotion"] = measure(
+            promotion.apply_promotion, lines, SAMPLE_BATCH)
+
+    # Copies the in-stock products, so a call costs O(catalog size)
+    calls = max(10, min(10000, 10 ** 7 // product_count))
+    results["Store.get_all_products"] = measure(
+        store_obj.get_all_products, [()] * calls)
+    results["Store.get_total_quantity"] = measure(
+        store_obj.get_total_quantity, [()] * (len(lines) // SAMPLE_BATCH
+                                               * SAMPLE_BATCH),
+        SAMPLE_BATCH)
+    return results
+
+
+def run(sizes, order_count, repeat=3):
+    """
+    Runs the suite at every catalog size, keeping each benchmark's
+    fastest of repeat runs to filter out noise from other processes.
+
+    Returns:
+        dict: The results, keyed "<benchmark>@<catalog size>", with
+        details of the machine that produced them.
+    """
+    results = {}
+    for product_count in sizes:
+        runs = [run_size(product_count, order_count)
+                for _ in range(repeat)]
+        for name in runs[0]:
+            results[f"{name}@{product_count}"] = max(
+                (measurements[name] for measurements in runs),
+                key=lambda measurement: measurement["ops_per_sec"])
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "orders": order_count,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold):
+    """
+    Compares two runs of the suite.
+
+    Args:
+        baseline (dict): The earlier run.
+        current (dict): The new run.
+        threshold (float): Relative slowdown of throughput or p50
+            latency counted as a regression, e.g. 0.1 for 10%.
+
+    Returns:
+        List[str]: A description of every regression.
+    """
+    regressions = []
+    for name, now in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        throughput = now["ops_per_sec"] / before["ops_per_sec"] - 1
+        latency = now["p50_us"] / before["p50_us"] - 1 \
+            if before["p50_us"] else 0.0
+        if throughput < -threshold or latency > threshold:
+            regressions.append(f"{name}: {throughput:+.1%} throughput, "
+                               f"{latency:+.1%} p50 latency")
+    return regressions
+
+
+def print_results(report):
+    """
+    Prints one line per benchmark.
+    """
+    print(f"Python {report['python']} on {report['platform']}, "
+          f"{report['cpus']} CPUs, {report['orders']} orders")
+    print(f"{'benchmark':<45}{'ops/s':>14}{'p50 us':>10}{'p99 us':>10}")
+    for name, result in report["results"].items():
+        print(f"{name:<45}{result['ops_per_sec']:>14,.0f}"
+              f"{result['p50_us']:>10.2f}{result['p99_us']:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="comma separated catalog sizes")
+    parser.add_argument("--orders", type=int, default=20000,
+                        help="orders per catalog size")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per catalog size, the fastest is kept")
+    parser.add_argument("--output", help="file to save the results to")
+    parser.add_argument("--compare", help="results of an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative slowdown counted as a regression")
+    args = parser.parse_args()
+
+    report = run([int(size) for size in args.sizes.split(",")], args.orders,
+                 args.repeat)
+    print_results(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            regressions = compare(json.load(file), report, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
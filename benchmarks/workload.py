@@ -0,0 +1,87 @@
+"""
+Synthetic workloads for the benchmarks: mixed catalogs and skewed,
+Zipf-distributed order streams.
+"""
+import os
+import random
+import sys
+from itertools import accumulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import products  # noqa: E402
+import promotions  # noqa: E402
+
+# Share of each product type in generated catalogs
+PRODUCT_MIX = (("product", 0.8), ("non_stocked", 0.1), ("limited", 0.1))
+# Share of products with each promotion, the rest have none
+PROMOTION_MIX = ((promotions.PercentDiscount("30% off!", percent=30), 0.15),
+                 (promotions.SecondHalfPrice("Second Half price!"), 0.1),
+                 (promotions.ThirdOneFree("Third One Free!"), 0.1))
+
+
+def build_catalog(product_count, seed=42, quantity=10 ** 9):
+    """
+    Returns product_count products mixing every product type and
+    promotion, with IDs 0 to product_count - 1.
+
+    Args:
+        product_count (int): Number of products.
+        seed (int): Seed of the random choices.
+        quantity (int): Stock of each stocked product, large by default
+            so benchmark orders are never rejected.
+    """
+    rng = random.Random(seed)
+    kinds = rng.choices([kind for kind, _ in PRODUCT_MIX],
+                        weights=[share for _, share in PRODUCT_MIX],
+                        k=product_count)
+    catalog = []
+    for product_id, kind in enumerate(kinds):
+        price = round(rng.uniform(1, 2000), 2)
+        if kind == "non_stocked":
+            product = products.NonStockedProduct(
+                f"License {product_id}", price=price, product_id=product_id)
+        elif kind == "limited":
+            product = products.LimitedProduct(
+                f"Limited {product_id}", price=price, quantity=quantity,
+                maximum=5, product_id=product_id)
+        else:
+            product = products.Product(f"Product {product_id}", price=price,
+                                       quantity=quantity,
+                                       product_id=product_id)
+        draw = rng.random()
+        for promotion, share in PROMOTION_MIX:
+            if draw < share:
+                product.set_promotion(promotion)
+                break
+            draw -= share
+        catalog.append(product)
+    return catalog
+
+
+def zipf_orders(catalog, order_count, exponent=1.1, max_lines=8,
+                max_quantity=5, seed=42):
+    """
+    Returns order_count shopping lists whose products follow a Zipf
+    distribution: the product of popularity rank r is picked with weight
+    1 / r ** exponent, and ranks are shuffled over the catalog.
+
+    Args:
+        catalog (List[Product]): The products to order from.
+        order_count (int): Number of shopping lists.
+        exponent (float): Skew of the distribution, 0 for uniform.
+        max_lines (int): Maximum number of lines per order.
+        max_quantity (int): Maximum quantity per line.
+        seed (int): Seed of the random choices.
+    """
+    rng = random.Random(seed)
+    by_rank = list(catalog)
+    rng.shuffle(by_rank)
+    cumulative = list(accumulate(1 / rank ** exponent
+                                 for rank in range(1, len(by_rank) + 1)))
+    line_counts = [rng.randint(1, max_lines) for _ in range(order_count)]
+    picks = iter(rng.choices(by_rank, cum_weights=cumulative,
+                             k=sum(line_counts)))
+    return [[(next(picks), rng.randint(1, max_quantity))
+             for _ in range(line_count)]
+            for line_count in line_counts]
@@ -0,0 +1,336 @@
+from bisect import bisect_left, insort
+from typing import List
+from products import NonStockedProduct
+
+
+class SortedList:
+    """
+    A sorted list split into buckets of bounded size, so insertions and
+    removals move at most one bucket's items instead of the whole list.
+
+    Methods:
+        add(item):
+            Inserts an item in order.
+
+        remove(item):
+            Removes an item, raising ValueError if missing.
+
+        irange(low, high):
+            Yields the items with low <= item < high, in order.
+    """
+
+    # Buckets are split once they hold twice this many items
+    LOAD = 512
+
+    def __init__(self, items=()):
+        """
+        Initializes a new instance of the SortedList class.
+
+        Args:
+            items (Iterable): Initial items, in any order.
+        """
+        items = sorted(items)
+        self._buckets = [items[start:start + self.LOAD]
+                         for start in range(0, len(items), self.LOAD)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._length = len(items)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self):
+        for bucket in self._buckets:
+            yield from bucket
+
+    def add(self, item):
+        """
+        Inserts an item in order.
+
+        Args:
+            item: The item to insert.
+        """
+        buckets, maxes = self._buckets, self._maxes
+        if not buckets:
+            buckets.append([item])
+            maxes.append(item)
+            self._length = 1
+            return
+        index = bisect_left(maxes, item)
+        if index == len(maxes):
+            index -= 1
+        bucket = buckets[index]
+        insort(bucket, item)
+        maxes[index] = bucket[-1]
+        self._length += 1
+        if len(bucket) > 2 * self.LOAD:
+            buckets.insert(index + 1, bucket[self.LOAD:])
+            del bucket[self.LOAD:]
+            maxes.insert(index, bucket[-1])
+
+    def remove(self, item):
+        """
+        Removes an item.
+
+        Args:
+            item: The item to remove.
+
+        Raises:
+            ValueError: If the item is not in the list.
+        """
+        index = bisect_left(self._maxes, item)
+        if index < len(self._buckets):
+            bucket = self._buckets[index]
+            position = bisect_left(bucket, item)
+            if position < len(bucket) and bucket[position] == item:
+                del bucket[position]
+                self._length -= 1
+                if bucket:
+                    self._maxes[index] = bucket[-1]
+                else:
+                    del self._buckets[index]
+                    del self._maxes[index]
+                return
+        raise ValueError(f"{item!r} not in list")
+
+    def irange(self, low, high):
+        """
+        Yields the items with low <= item < high, in order.
+
+        Args:
+            low: Inclusive lower bound.
+            high: Exclusive upper bound.
+        """
+        index = bisect_left(self._maxes, low)
+        if index == len(self._buckets):
+            return
+        position = bisect_left(self._buckets[index], low)
+        for bucket in self._buckets[index:]:
+            for item in bucket[position:]:
+                if not item < high:
+                    return
+                yield item
+            position = 0
+
+
+class NameTrie:
+    """
+    A prefix tree over product names, matched case-insensitively.
+
+    Each node is a dict from the next character to the child node, and
+    holds the IDs of the products whose name ends there under the None
+    key.
+    """
+
+    def __init__(self):
+        """
+        Initializes a new, empty instance of the NameTrie class.
+        """
+        self._root = {}
+
+    def add(self, name, product_id):
+        """
+        Adds a product's name to the trie.
+        """
+        node = self._root
+        for character in name.casefold():
+            node = node.setdefault(character, {})
+        node.setdefault(None, {})[product_id] = None
+
+    def remove(self, name, product_id):
+        """
+        Removes a product's name from the trie, pruning empty nodes.
+        """
+        path = [self._root]
+        key = name.casefold()
+        for character in key:
+            path.append(path[-1][character])
+        del path[-1][None][product_id]
+        if not path[-1][None]:
+            del path[-1][None]
+        for depth in range(len(key), 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][key[depth - 1]]
+
+    def search(self, prefix):
+        """
+        Yields the IDs of the products whose name starts with prefix.
+        """
+        node = self._root
+        for character in prefix.casefold():
+            node = node.get(character)
+            if node is None:
+                return
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for character, child in node.items():
+                if character is None:
+                    yield from child
+                else:
+                    stack.append(child)
+
+
+class CatalogIndex:
+    """
+    Secondary indexes over a store's products: sorted (price, ID) and
+    (quantity, ID) lists, an inverted index from promotion to products
+    and a trie of names. Product IDs must be mutually comparable.
+    Non-stocked products are left out of the quantity index.
+
+    The keys each product is indexed under are recorded, so updates and
+    removals always find its entries, even if the reported old value
+    doesn't match what was indexed, e.g. after a change raced with
+    building the index.
+
+    Methods:
+        add(product) / remove(product):
+            Indexes or unindexes a product.
+
+        update(product, field, old_value):
+            Reindexes a product after it changed.
+
+        by_price(low, high) -> List[Product]:
+            Returns the products with low <= price < high.
+
+        by_quantity(low, high) -> List[Product]:
+            Returns the stocked products with low <= quantity < high.
+
+        by_promotion(promotion) -> List[Product]:
+            Returns the products with the given promotion.
+
+        by_name_prefix(prefix) -> List[Product]:
+            Returns the products whose name starts with prefix.
+    """
+
+    def __init__(self, products):
+        """
+        Initializes a new instance of the CatalogIndex class.
+
+        Args:
+            products (Dict[int, Product]): The store's products by ID,
+                used to resolve query results.
+        """
+        self._products = products
+        # product_id -> (price, quantity or None if not stocked, promotion)
+        self._keys = {product_id: self._get_keys(product)
+                      for product_id, product in products.items()}
+        self._prices = SortedList((keys[0], product_id)
+                                  for product_id, keys in self._keys.items())
+        self._quantities = SortedList(
+            (keys[1], product_id) for product_id, keys in self._keys.items()
+            if keys[1] is not None)
+        self._promotions = {}  # id(promotion) -> {product_id: None}
+        self._names = NameTrie()
+        for product_id, product in products.items():
+            self._add_promotion(self._keys[product_id][2], product_id)
+            self._names.add(product.name, product_id)
+
+    @staticmethod
+    def _get_keys(product) -> tuple:
+        """
+        Returns the price, quantity and promotion to index a product by.
+        """
+        quantity = None if isinstance(product, NonStockedProduct) \
+            else product.get_quantity()
+        return product.price, quantity, product.promotion
+
+    def add(self, product):
+        """
+        Indexes a product.
+        """
+        product_id = product.product_id
+        price, quantity, promotion = self._keys[product_id] = \
+            self._get_keys(product)
+        self._prices.add((price, product_id))
+        if quantity is not None:
+            self._quantities.add((quantity, product_id))
+        self._add_promotion(promotion, product_id)
+        self._names.add(product.name, product_id)
+
+    def remove(self, product):
+        """
+        Unindexes a product.
+        """
+        product_id = product.product_id
+        price, quantity, promotion = self._keys.pop(product_id)
+        self._prices.remove((price, product_id))
+        if quantity is not None:
+            self._quantities.remove((quantity, product_id))
+        self._remove_promotion(promotion, product_id)
+        self._names.remove(product.name, product_id)
+
+    def update(self, product, field, old_value):
+        """
+        Reindexes a product after one of its fields changed.
+
+        Args:
+            product (Product): The changed product.
+            field (str): "quantity", "price" or "promotion".
+            old_value: The value of the field before the change. The
+                value recorded when indexing is replaced instead.
+        """
+        product_id = product.product_id
+        old_keys = self._keys.get(product_id)
+        if old_keys is None or field not in ("quantity", "price",
+                                             "promotion"):
+            return
+        price, quantity, promotion = new_keys = self._get_keys(product)
+        self._keys[product_id] = new_keys
+        if quantity != old_keys[1]:
+            self._quantities.remove((old_keys[1], product_id))
+            self._quantities.add((quantity, product_id))
+        if price != old_keys[0]:
+            self._prices.remove((old_keys[0], product_id))
+            self._prices.add((price, product_id))
+        if promotion is not old_keys[2]:
+            self._remove_promotion(old_keys[2], product_id)
+            self._add_promotion(promotion, product_id)
+
+    def by_price(self, low, high) -> List:
+        """
+        Returns the products with low <= price < high, by price.
+        """
+        return self._resolve(self._prices.irange((low,), (high,)))
+
+    def by_quantity(self, low, high) -> List:
+        """
+        Returns the stocked products with low <= quantity < high,
+        by quantity.
+        """
+        return self._resolve(self._quantities.irange((low,), (high,)))
+
+    def by_promotion(self, promotion) -> List:
+        """
+        Returns the products with the given promotion.
+        """
+        products = self._products
+        return [products[product_id] for product_id
+                in self._promotions.get(id(promotion), ())]
+
+    def by_name_prefix(self, prefix) -> List:
+        """
+        Returns the products whose name starts with prefix,
+        ignoring case.
+        """
+        products = self._products
+        return [products[product_id]
+                for product_id in self._names.search(prefix)]
+
+    def _resolve(self, entries) -> List:
+        """
+        Returns the products of (key, product_id) index entries.
+        """
+        products = self._products
+        return [products[product_id] for _, product_id in entries]
+
+    def _add_promotion(self, promotion, product_id):
+        if promotion is not None:
+            self._promotions.setdefault(id(promotion), {})[product_id] = None
+
+    def _remove_promotion(self, promotion, product_id):
+        if promotion is not None:
+            product_ids = self._promotions[id(promotion)]
+            del product_ids[product_id]
+            if not product_ids:
+                del self._promotions[id(promotion)]
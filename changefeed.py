@@ -0,0 +1,206 @@
+import threading
+from typing import List, NamedTuple
+
+
+class ChangeEvent(NamedTuple):
+    """
+    One change to a store's catalog, see ChangeFeed.
+
+    Attributes:
+        sequence (int): The position of the event in the feed, counting
+            up from 0 without gaps.
+        product_id (int): The product that changed.
+        kind (str): What changed, and what value holds:
+            "added": the product was added, value is the product.
+            "removed": the product was removed, value is None.
+            "quantity": its stock changed, value is the new quantity.
+            "active": it sold out or was restocked, value is whether it
+                has stock now. Follows the "quantity" event causing it.
+            "price": value is the new price.
+            "promotion": value is the new promotion's name, or None if
+                the promotion was removed.
+        value: The new value, see kind.
+    """
+    sequence: int
+    product_id: int
+    kind: str
+    value: object
+
+
+class ChangeBatch(NamedTuple):
+    """
+    The outcome of ChangeFeed.read().
+
+    Attributes:
+        events (List[ChangeEvent]): The events read, oldest first.
+        next_offset (int): The offset to read from next.
+    """
+    events: List[ChangeEvent]
+    next_offset: int
+
+
+class OffsetExpired(ValueError):
+    """
+    Raised when reading events that were overwritten in the ring buffer,
+    because the consumer fell behind by more than its capacity. The
+    consumer has missed changes and should resynchronize, e.g. from
+    Store.products, then read on from oldest_offset.
+
+    Attributes:
+        oldest_offset (int): The oldest offset still readable.
+    """
+
+    def __init__(self, message, oldest_offset):
+        super().__init__(message)
+        self.oldest_offset = oldest_offset
+
+
+class ChangeFeed:
+    """
+    An ordered stream of the changes made to a store's catalog, so
+    caches and search indexes can follow what changed instead of polling
+    the whole catalog.
+
+    Events are published from the store's product listener, given
+    sequence numbers in the order they happen, and kept in a ring buffer
+    of fixed capacity. Each consumer tracks its own offset and reads the
+    events from there in batches, so a read costs O(events read) however
+    large the catalog, and publishing never waits for consumers: a
+    consumer that falls behind by more than the capacity gets
+    OffsetExpired instead.
+
+    Methods:
+        attach(store) / detach(store):
+            Starts or stops publishing the changes of a store.
+
+        read(offset, max_events, timeout) -> ChangeBatch:
+            Returns the events from an offset on.
+    """
+
+    def __init__(self, capacity=65536):
+        """
+        Initializes a new instance of the ChangeFeed class.
+
+        Args:
+            capacity (int): Number of events kept for consumers to read.
+                Defaults to 65536.
+
+        Raises:
+            ValueError: If the capacity is not positive.
+        """
+        if capacity <= 0:
+            raise ValueError("Capacity must be positive")
+        self._capacity = capacity
+        # (product_id, kind, value) of event n at n % capacity, made into
+        # ChangeEvents only when read
+        self._events = [None] * capacity
+        self._next_offset = 0
+        self._lock = threading.Lock()  # Guards the buffer
+        # Wakes consumers waiting for events, notified only when some are
+        self._published = threading.Condition(self._lock)
+        self._waiting = 0
+
+    @property
+    def next_offset(self) -> int:
+        """
+        Returns the sequence number the next event will get.
+        """
+        return self._next_offset
+
+    @property
+    def oldest_offset(self) -> int:
+        """
+        Returns the sequence number of the oldest event still readable.
+        """
+        return max(0, self._next_offset - self._capacity)
+
+    def attach(self, store):
+        """
+        Publishes every change made to a store's catalog from now on.
+        """
+        store.add_product_listener(self._product_changed)
+
+    def detach(self, store):
+        """
+        Stops publishing the changes of a store.
+        """
+        store.remove_product_listener(self._product_changed)
+
+    def _product_changed(self, product, field, old_value):
+        """
+        Publishes the events of a change reported by a store.
+        """
+        if field == "quantity":
+            quantity = product.get_quantity()
+            if (quantity > 0) == (old_value > 0):
+                changes = (("quantity", quantity),)
+            else:
+                changes = (("quantity", quantity), ("active", quantity > 0))
+        elif field == "promotion":
+            promotion = product.promotion
+            changes = (("promotion", promotion.name if promotion else None),)
+        elif field == "price":
+            changes = (("price", product.price),)
+        elif field == "added":
+            changes = (("added", product),)
+        elif field == "removed":
+            changes = (("removed", None),)
+        else:
+            return
+        product_id = product.product_id
+        events = self._events
+        capacity = self._capacity
+        with self._lock:
+            for kind, value in changes:
+                sequence = self._next_offset
+                events[sequence % capacity] = (product_id, kind, value)
+                self._next_offset = sequence + 1
+            if self._waiting:
+                self._published.notify_all()
+
+    def read(self, offset, max_events=1000, timeout=0.0) -> ChangeBatch:
+        """
+        Returns the events from an offset on, oldest first.
+
+        Args:
+            offset (int): The sequence number of the first event to read,
+                0 for the start of the feed or a batch's next_offset.
+            max_events (int): The most events returned. Defaults to 1000.
+            timeout (float, optional): Seconds to wait for an event if
+                there is none to read yet, None to wait until there is.
+                Defaults to 0, not waiting.
+
+        Returns:
+            ChangeBatch: The events, possibly none, and the offset of the
+            next read.
+
+        Raises:
+            ValueError: If max_events is not positive or the offset is
+            past the end of the feed.
+            OffsetExpired: If events from the offset on were overwritten.
+        """
+        if max_events <= 0:
+            raise ValueError("Batch size must be positive")
+        with self._lock:
+            if offset >= self._next_offset and timeout != 0:
+                self._waiting += 1
+                try:
+                    self._published.wait_for(
+                        lambda: self._next_offset > offset, timeout)
+                finally:
+                    self._waiting -= 1
+            next_offset = self._next_offset
+            if offset > next_offset:
+                raise ValueError(f"Offset {offset} is past the end of "
+                                 f"the feed at {next_offset}")
+            oldest_offset = max(0, next_offset - self._capacity)
+            if offset < oldest_offset:
+                raise OffsetExpired(f"Events before {oldest_offset} were "
+                                    f"overwritten", oldest_offset)
+            end = min(next_offset, offset + max_events)
+            events = self._events
+            capacity = self._capacity
+            records = [events[sequence % capacity]
+                       for sequence in range(offset, end)]
+        return ChangeBatch([ChangeEvent(sequence, *record) for sequence, record
+                            in zip(range(offset, end), records)], end)
@@ -0,0 +1,416 @@
+import threading
+from typing import Dict, List, NamedTuple, Tuple
+from products import (INVALID_QUANTITY, OUT_OF_STOCK, UNKNOWN_PRODUCT,
+                      LimitedProduct, NonStockedProduct, Product,
+                      PurchaseError)
+from store import Store
+
+
+class Shipment(NamedTuple):
+    """
+    The part of a federated order filled by one store.
+
+    Attributes:
+        store_name (str): The name of the store filling it.
+        shopping_list (List[Tuple[Product, int]]): The store's products
+            and the quantities bought from it.
+        total (float): The price charged by the store.
+    """
+    store_name: str
+    shopping_list: List[Tuple[Product, int]]
+    total: float
+
+
+class FederatedOrder(NamedTuple):
+    """
+    The outcome of Federation.order().
+
+    Attributes:
+        total (float): The total price charged by all the stores.
+        shipments (List[Shipment]): The part filled by each store.
+    """
+    total: float
+    shipments: List[Shipment]
+
+
+class PartialOrderError(ValueError):
+    """
+    Raised when a split order failed after some stores had already
+    placed their part, e.g. because another store's hold expired before
+    it was committed. The parts placed are not undone.
+
+    Attributes:
+        shipments (List[Shipment]): The parts that were placed.
+    """
+
+    def __init__(self, message, shipments):
+        super().__init__(message)
+        self.shipments = shipments
+
+
+class Federation:
+    """
+    The inventory of many stores, e.g. one per location, with a global
+    index of where each SKU is in stock.
+
+    Products are matched across stores by product_id, which serves as
+    their SKU: every store holds its own Product object for a SKU. The
+    index maps each SKU to the stores carrying it and to those with
+    stock. It is kept up to date by a product listener on every store, so
+    it follows orders, restocks and catalog changes made through the
+    stores directly, and lookups cost O(stores with the SKU) however large
+    the inventory.
+
+    An order lists SKUs and quantities. It goes to a single store that
+    can fill all of it when there is one, otherwise it is split line by
+    line over the stores with stock. A split order is placed with holds:
+    every store reserves its part, and the parts are committed only once
+    all the stores accepted theirs, so an order no store can fill its
+    part of buys nothing. Committing can still fail, if a hold expired
+    or a product was removed in the meantime, and the parts committed
+    before are then reported by PartialOrderError rather than undone.
+    Lines of a LimitedProduct are never split, so its maximum per order
+    holds across stores.
+
+    Methods:
+        add_store(name, store):
+            Adds a store and indexes its products.
+
+        remove_store(name):
+            Removes a store and its products from the index.
+
+        get_store(name) -> Store:
+            Returns the store with the given name.
+
+        find_stores(sku, quantity) -> List[Tuple[str, int]]:
+            Returns the stores with enough stock of a SKU.
+
+        get_available_quantity(sku) -> int:
+            Returns the stock of a SKU across all stores.
+
+        order(shopping_list, split) -> FederatedOrder:
+            Routes an order of SKUs to the stores that can fill it.
+    """
+
+    def __init__(self, stores=None, hold_ttl=30.0):
+        """
+        Initializes a new instance of the Federation class.
+
+        Args:
+            stores (Dict[str, Store], optional): The initial stores by
+                name. Defaults to None.
+            hold_ttl (float): Seconds the holds of a split order last if
+                it is never committed. Defaults to 30.
+
+        Raises:
+            ValueError: If the hold TTL is not positive.
+        """
+        if hold_ttl <= 0:
+            raise ValueError("Hold TTL must be positive")
+        self._hold_ttl = hold_ttl
+        self._stores = {}  # name -> Store
+        self._listeners = {}  # name -> product listener added to the store
+        self._carriers = {}  # sku -> {store name: Product}
+        self._in_stock = {}  # sku -> {store name: Product}, quantity > 0
+        # Guards the index, held only briefly
+        self._lock = threading.Lock()
+        if stores is not None:
+            for name, store in stores.items():
+                self.add_store(name, store)
+
+    @property
+    def stores(self) -> Dict[str, Store]:
+        """
+        Returns the stores by name, in the order they were added.
+        """
+        return dict(self._stores)
+
+    def add_store(self, name, store):
+        """
+        Adds a store and indexes its products, in O(store size).
+
+        Args:
+            name (str): A name identifying the store, e.g. its location.
+            store (Store): The store.
+
+        Raises:
+            ValueError: If a store with that name is already federated.
+        """
+        def listener(product, field, _):
+            self._product_changed(name, product, field)
+
+        with self._lock:
+            if name in self._stores:
+                raise ValueError(f"Store {name} already in federation")
+            self._stores[name] = store
+            self._listeners[name] = listener
+            # Registered under the lock, so changes made while indexing
+            # wait and are applied after
+            store.add_product_listener(listener)
+            for product in store.products:
+                self._index(name, product)
+
+    def remove_store(self, name):
+        """
+        Removes a store and its products from the index.
+
+        Args:
+            name (str): The name of the store.
+
+        Raises:
+            ValueError: If no store has that name.
+        """
+        with self._lock:
+            store = self._stores.pop(name, None)
+            if store is None:
+                raise ValueError(f"Store {name} not found in federation")
+            store.remove_product_listener(self._listeners.pop(name))
+            for product in store.products:
+                self._unindex(name, product.product_id)
+
+    def get_store(self, name) -> Store:
+        """
+        Returns the store with the given name.
+
+        Raises:
+            ValueError: If no store has that name.
+        """
+        store = self._stores.get(name)
+        if store is None:
+            raise ValueError(f"Store {name} not found in federation")
+        return store
+
+    def _product_changed(self, name, product, field):
+        """
+        Keeps the index in sync with a change to a store's catalog.
+        """
+        if field not in ("quantity", "added", "removed"):
+            return
+        with self._lock:
+            if name not in self._stores:
+                return
+            if field == "removed":
+                self._unindex(name, product.product_id)
+            else:
+                self._index(name, product)
+
+    def _index(self, name, product):
+        """
+        Records a store's product and whether it is in stock, with the
+        lock held.
+        """
+        sku = product.product_id
+        self._carriers.setdefault(sku, {})[name] = product
+        if product.get_quantity() > 0:
+            self._in_stock.setdefault(sku, {})[name] = product
+        else:
+            self._discard(self._in_stock, sku, name)
+
+    def _unindex(self, name, sku):
+        """
+        Forgets a store's product, with the lock held.
+        """
+        self._discard(self._carriers, sku, name)
+        self._discard(self._in_stock, sku, name)
+
+    @staticmethod
+    def _discard(index, sku, name):
+        """
+        Removes a store from a SKU's entry, dropping the entry if empty.
+        """
+        stores = index.get(sku)
+        if stores is not None and stores.pop(name, None) is not None \
+                and not stores:
+            del index[sku]
+
+    def _offers(self, sku) -> List[Tuple[str, Product, int]]:
+        """
+        Returns the (store name, product, units available) of every store
+        with stock of a SKU, most units first. Held units don't count.
+        """
+        with self._lock:
+            in_stock = list(self._in_stock.get(sku, {}).items())
+        offers = []
+        for name, product in in_stock:
+            available = self._stores[name].get_available_quantity(product)
+            if available > 0:
+                offers.append((name, product, available))
+        offers.sort(key=lambda offer: -offer[2])
+        return offers
+
+    def find_stores(self, sku, quantity=1) -> List[Tuple[str, int]]:
+        """
+        Returns the stores with at least quantity units of a SKU
+        available, in O(stores with the SKU in stock).
+
+        Args:
+            sku (int): The product_id to look up.
+            quantity (int): The units needed. Defaults to 1.
+
+        Returns:
+            List[Tuple[str, int]]: The name of each matching store and
+            its units available, most units first.
+        """
+        return [(name, available)
+                for name, _, available in self._offers(sku)
+                if available >= quantity]
+
+    def get_available_quantity(self, sku) -> int:
+        """
+        Returns the units of a SKU available across all stores.
+
+        Args:
+            sku (int): The product_id to look up.
+
+        Returns:
+            int: The sum of every store's stock that isn't held.
+        """
+        return sum(available for _, _, available in self._offers(sku))
+
+    def order(self, shopping_list: List[Tuple[int, int]], split=True) \
+            -> FederatedOrder:
+        """
+        Places an order of SKUs with the store that can fill all of it,
+        or else, if split is allowed, splits it over several stores.
+
+        Args:
+            shopping_list (List[Tuple[int, int]]): A list of tuples, where
+                each tuple contains a SKU and an integer quantity.
+            split (bool): Whether the order may be filled by several
+                stores. Defaults to True.
+
+        Returns:
+            FederatedOrder: The total price and the part of each store.
+
+        Raises:
+            ValueError: If a quantity is not positive, a SKU is not
+            carried by any store, or the stores can't fill the order
+            together (or a single store can't, without split).
+            PartialOrderError: If a split order failed after some of its
+            parts were placed.
+        """
+        shopping_list = list(shopping_list)
+        for sku, quantity in shopping_list:
+            if quantity <= 0:
+                raise PurchaseError("Purchase quantity must be positive",
+                                    INVALID_QUANTITY)
+            if sku not in self._carriers:
+                raise PurchaseError(f"SKU {sku} not found in any store",
+                                    UNKNOWN_PRODUCT)
+
+        for name, store_lines in self._single_store_candidates(
+                shopping_list):
+            store = self._stores[name]
+            if not store.quote(store_lines).can_order:
+                continue
+            try:
+                total = store.order(store_lines)
+            except ValueError:
+                continue  # Sold by a concurrent order since the quote
+            return FederatedOrder(total, [Shipment(name, store_lines, total)])
+        if not split:
+            raise PurchaseError("No single store can fill the order",
+                                OUT_OF_STOCK)
+        return self._order_split(self._allocate(shopping_list))
+
+    def _single_store_candidates(self, shopping_list) \
+            -> List[Tuple[str, List[Tuple[Product, int]]]]:
+        """
+        Returns every store with all the SKUs of an order in stock, with
+        the order's lines in its products, in O(lines * stores with the
+        rarest SKU).
+        """
+        with self._lock:
+            stocked = [self._in_stock.get(sku, {})
+                       for sku, _ in shopping_list]
+            if not stocked:
+                return []
+            rarest = min(stocked, key=len)
+            return [(name, [(in_stock[name], quantity) for in_stock,
+                            (_, quantity) in zip(stocked, shopping_list)])
+                    for name in rarest
+                    if all(name in in_stock for in_stock in stocked)]
+
+    def _allocate(self, shopping_list) -> Dict[str, list]:
+        """
+        Splits the lines of an order over the stores with stock, taking
+        from the stores with most units first.
+
+        Returns:
+            Dict[str, List[Tuple[Product, int]]]: The lines of each store.
+
+        Raises:
+            ValueError: If the stores together can't fill a line.
+        """
+        allocations = {}  # store name -> [(product, quantity)]
+        allocated = {}  # (store name, sku) -> units allocated so far
+        for sku, quantity in shopping_list:
+            remaining = quantity
+            for name, product, available in self._offers(sku):
+                if isinstance(product, NonStockedProduct):
+                    take = remaining
+                else:
+                    take = min(remaining,
+                               available - allocated.get((name, sku), 0))
+                    if isinstance(product, LimitedProduct) \
+                            and take < remaining:
+                        continue  # Never split below the maximum
+                if take <= 0:
+                    continue
+                allocations.setdefault(name, []).append((product, take))
+                allocated[name, sku] = allocated.get((name, sku), 0) + take
+                remaining -= take
+                if not remaining:
+                    break
+            if remaining:
+                raise PurchaseError(f"Not enough stock of SKU {sku} "
+                                    f"across stores", OUT_OF_STOCK)
+        return allocations
+
+    def _order_split(self, allocations) -> FederatedOrder:
+        """
+        Places the parts of an order with two-phase commit: every store
+        holds its part, then all the holds are committed, or all released
+        if any store rejected its part. If a commit fails, the holds left
+        are released, and the parts committed before are kept.
+
+        Raises:
+            ValueError: If a store rejected its part, buying nothing.
+            PartialOrderError: If a commit failed after others succeeded.
+        """
+        holds = []  # (store name, lines, token)
+        try:
+            for name, store_lines in allocations.items():
+                holds.append((name, store_lines, self._stores[name].reserve(
+                    store_lines, self._hold_ttl)))
+        except ValueError:
+            self._release(holds)
+            raise
+
+        shipments = []
+        for index, (name, store_lines, token) in enumerate(holds):
+            try:
+                total = self._stores[name].commit(token)
+            except ValueError as error:
+                # Only if a hold expired or a product was removed since
+                self._release(holds[index + 1:])
+                if not shipments:
+                    raise
+                raise PartialOrderError(
+                    f"Order only partly placed, store {name} failed: "
+                    f"{error}", shipments) from error
+            shipments.append(Shipment(name, store_lines, total))
+        return FederatedOrder(sum(shipment.total for shipment in shipments),
+                              shipments)
+
+    def _release(self, holds):
+        """
+        Releases the holds of an order that failed. Holds that expired
+        meanwhile are skipped, so the error that failed the order is the
+        one reported.
+        """
+        for name, _, token in holds:
+            try:
+                self._stores[name].release(token)
+            except ValueError:
+                pass  # Expired, its stock is available again already
@@ -0,0 +1,259 @@
+import csv
+import json
+from typing import List, Tuple
+from products import Product, NonStockedProduct, LimitedProduct
+
+# Accepted values of the "type" field
+PRODUCT_TYPES = {
+    "product": Product,
+    "non_stocked": NonStockedProduct,
+    "limited": LimitedProduct,
+}
+
+
+class ImportReport:
+    """
+    The outcome of a catalog import.
+
+    Attributes:
+        rows (int): Number of rows read.
+        created (int): Number of products added to the store.
+        updated (int): Number of existing products updated.
+        errors (List[Tuple[int, str]]): Row number and reason of every
+            rejected row.
+    """
+
+    def __init__(self):
+        """
+        Initializes a new, empty instance of the ImportReport class.
+        """
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.errors: List[Tuple[int, str]] = []
+
+    def __repr__(self):
+        return (f"ImportReport(rows={self.rows}, created={self.created}, "
+                f"updated={self.updated}, errors={len(self.errors)})")
+
+
+def read_feed(path, feed_format=None):
+    """
+    Yields the rows of a CSV or JSONL feed as dicts, one at a time.
+
+    Args:
+        path (str): The feed file.
+        feed_format (str, optional): "csv" or "jsonl". Guessed from the
+            file extension when omitted.
+
+    Yields:
+        Tuple[int, dict]: The row number, starting at 1, and the row.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    if feed_format is None:
+        feed_format = "jsonl" if str(path).endswith((".jsonl", ".json")) \
+            else "csv"
+    with open(path, newline="", encoding="utf-8") as feed_file:
+        if feed_format == "csv":
+            yield from enumerate(csv.DictReader(feed_file), start=1)
+        elif feed_format == "jsonl":
+            for row_number, line in enumerate(feed_file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield row_number, json.loads(line)
+                except ValueError:
+                    yield row_number, None
+        else:
+            raise ValueError(f"Unknown feed format {feed_format}")
+
+
+def import_feed(store, path, feed_format=None, promotions=None,
+                chunk_size=10000, upsert=True) -> ImportReport:
+    """
+    Streams a vendor feed into a store.
+
+    Each row has a name, price and quantity, and optionally a product_id,
+    a type ("product", "non_stocked" or "limited"), a maximum for limited
+    products and a promotion name. Rows are checked with the same rules
+    as Product() and added in chunks with Store.add_products(), so memory
+    use doesn't grow with the feed. A bad row is reported and skipped.
+
+    When upsert is set, a row whose product_id, or else name, matches a
+    product already in the store updates its price and quantity instead.
+
+    Args:
+        store (Store): The store to fill.
+        path (str): The feed file.
+        feed_format (str, optional): "csv" or "jsonl".
+        promotions (Dict[str, Promotion], optional): Promotions by name,
+            for rows that name one.
+        chunk_size (int): Number of new products added at once.
+            Defaults to 10000.
+        upsert (bool): Whether matching rows update existing products.
+            Defaults to True.
+
+    Returns:
+        ImportReport: Counts of created and updated products and the
+        rejected rows.
+    """
+    promotions = promotions or {}
+    report = ImportReport()
+    chunk = {}  # product_id -> new product waiting to be added
+    chunk_names = {}  # name -> new product waiting to be added
+
+    for row_number, row in read_feed(path, feed_format):
+        report.rows += 1
+        try:
+            if not isinstance(row, dict):
+                raise ValueError("Row is not an object")
+            fields = _parse_row(row, promotions)
+            existing = _find_existing(store, chunk, chunk_names, fields) \
+                if upsert else None
+            if existing is not None:
+                _update_product(existing, fields)
+                if existing.product_id not in chunk:
+                    report.updated += 1
+                continue
+            product = _build_product(fields)
+            if product.product_id in chunk or \
+                    store.get_product(product.product_id, None) is not None:
+                raise ValueError(f"Product ID {product.product_id} "
+                                 f"already exists")
+        except (NameError, ValueError, TypeError) as error:
+            report.errors.append((row_number, str(error)))
+            continue
+
+        chunk[product.product_id] = product
+        chunk_names[product.name] = product
+        if len(chunk) >= chunk_size:
+            store.add_products(chunk.values())
+            report.created += len(chunk)
+            chunk = {}
+            chunk_names = {}
+
+    store.add_products(chunk.values())
+    report.created += len(chunk)
+    return report
+
+
+def _parse_row(row, promotions) -> dict:
+    """
+    Converts the text fields of a feed row and checks them like
+    Product() does.
+
+    Raises:
+        NameError: If the name is empty.
+        ValueError: If a field is missing, malformed or out of range.
+    """
+    product_type = _parse_text(row, "type", "product").lower()
+    if product_type not in PRODUCT_TYPES:
+        raise ValueError(f"Unknown product type {product_type}")
+    name = _parse_text(row, "name", "")
+    price = _parse_number(row, "price", float)
+    quantity = 1 if product_type == "non_stocked" \
+        else _parse_number(row, "quantity", int)
+    Product.validate(name, price, quantity)
+
+    maximum = None
+    if product_type == "limited":
+        maximum = _parse_number(row, "maximum", int)
+        if maximum <= 0:
+            raise ValueError("Maximum must be positive")
+
+    promotion = None
+    promotion_name = _parse_text(row, "promotion", "")
+    if promotion_name:
+        promotion = promotions.get(promotion_name)
+        if promotion is None:
+            raise ValueError(f"Unknown promotion {promotion_name}")
+
+    product_id = row.get("product_id")
+    if product_id in (None, ""):
+        product_id = None
+    else:
+        product_id = _parse_number(row, "product_id", int)
+    return {"type": product_type, "name": name, "price": price,
+            "quantity": quantity, "maximum": maximum,
+            "promotion": promotion, "product_id": product_id}
+
+
+def _parse_text(row, field, default) -> str:
+    """
+    Returns a text field of a row, stripped, or default if it is empty.
+
+    Raises:
+        ValueError: If the field is not text, e.g. a number in JSONL.
+    """
+    value = row.get(field)
+    if value is None or value == "":
+        return default
+    if not isinstance(value, str):
+        raise ValueError(f"Invalid {field}: {value!r}")
+    return value.strip()
+
+
+def _parse_number(row, field, number_type):
+    """
+    Returns a numeric field of a row.
+
+    Raises:
+        ValueError: If the field is missing or not a number.
+    """
+    value = row.get(field)
+    if value is None or value == "":
+        raise ValueError(f"Missing {field}")
+    try:
+        number = number_type(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {field}: {value!r}") from None
+    if number_type is int and isinstance(value, float) and value != number:
+        raise ValueError(f"Invalid {field}: {value!r}")
+    return number
+
+
+def _find_existing(store, chunk, chunk_names, fields):
+    """
+    Returns the product a row refers to, in the store or the pending
+    chunk, or None if it's new.
+    """
+    product_id = fields["product_id"]
+    if product_id is not None:
+        return chunk.get(product_id) or store.get_product(product_id, None)
+    matches = store.find_products(fields["name"])
+    if len(matches) == 1:
+        return matches[0]
+    return chunk_names.get(fields["name"])
+
+
+def _update_product(product, fields):
+    """
+    Applies the price, quantity and promotion of a row to a product.
+    """
+    product.set_price(fields["price"])
+    product.set_quantity(fields["quantity"])
+    if fields["promotion"] is not None:
+        product.set_promotion(fields["promotion"])
+
+
+def _build_product(fields) -> Product:
+    """
+    Creates the product described by a parsed row.
+    """
+    product_type = fields["type"]
+    if product_type == "non_stocked":
+        product = NonStockedProduct(fields["name"], fields["price"],
+                                    product_id=fields["product_id"])
+    elif product_type == "limited":
+        product = LimitedProduct(fields["name"], fields["price"],
+                                 fields["quantity"], fields["maximum"],
+                                 product_id=fields["product_id"])
+    else:
+        product = Product(fields["name"], fields["price"],
+                          fields["quantity"],
+                          product_id=fields["product_id"])
+    if fields["promotion"] is not None:
+        product.set_promotion(fields["promotion"])
+    return product
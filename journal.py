@@ -0,0 +1,372 @@
+import json
+import os
+import threading
+from snapshot import open_snapshot
+from store import Store
+
+
+class OrderJournal:
+    """
+    An append-only journal of committed orders.
+
+    Each record holds a sequence number and the (product_id, quantity,
+    price, promotion name) of every line of one order, as one JSON line.
+    Records are buffered by write() and made durable by wait() with group
+    commit: the first waiting thread writes and fsyncs everything buffered
+    so far, so concurrent orders share one fsync. If the write fails, the
+    batch stays buffered for the next one to retry, and every thread
+    waiting for it gets the error.
+
+    Attributes:
+        path (str): The journal file.
+        snapshot_path (str): The snapshot that checkpoints compact into,
+            or None.
+        sequence (int): The sequence number of the last record written.
+
+    Methods:
+        write(lines) -> int:
+            Buffers a record and returns its sequence number.
+
+        wait(sequence):
+            Blocks until the record with that sequence number is on disk.
+
+        append(lines) -> int:
+            Writes a record and waits until it is on disk.
+
+        compact(sequence):
+            Drops the records covered by a snapshot.
+
+        checkpoint_due() -> bool:
+            Returns whether enough records were written to checkpoint.
+
+        end_checkpoint():
+            Lets the next checkpoint_due() call start a checkpoint.
+
+        close():
+            Flushes pending records and closes the file.
+    """
+
+    def __init__(self, path, sync=True, start_sequence=0,
+                 snapshot_path=None, checkpoint_every=None):
+        """
+        Initializes a new instance of the OrderJournal class, opening
+        or creating the journal file.
+
+        Args:
+            path (str): The journal file.
+            sync (bool): Whether to fsync on commit. Defaults to True.
+            start_sequence (int): Lowest sequence number to continue from,
+                usually the sequence of the last snapshot. Defaults to 0.
+            snapshot_path (str, optional): The snapshot to checkpoint into.
+            checkpoint_every (int, optional): Number of records after
+                which checkpoint_due() returns True.
+
+        Raises:
+            ValueError: If checkpoint_every is given without a
+            snapshot_path to checkpoint into.
+        """
+        if checkpoint_every is not None and snapshot_path is None:
+            raise ValueError("Checkpoints need a snapshot path")
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self._sync = sync
+        self._checkpoint_every = checkpoint_every
+        last_sequence = start_sequence
+        valid_length = 0  # Bytes up to the end of the last whole record
+        if os.path.exists(path):
+            with open(path, "rb") as journal_file:
+                for raw_line in journal_file:
+                    record = _parse_record(raw_line)
+                    if record is None:
+                        break
+                    valid_length += len(raw_line)
+                    if record["seq"] > start_sequence:
+                        last_sequence = record["seq"]
+        self.sequence = last_sequence
+        self._durable = last_sequence
+        self._pending = []
+        self._flushing = False
+        # Count of failed flushes, the last sequence number of the latest
+        # failed batch and its error, see wait()
+        self._failures = 0
+        self._failed_sequence = 0
+        self._error = None
+        self._since_checkpoint = 0
+        self._condition = threading.Condition()
+        self._checkpoint_lock = threading.Lock()
+        self._file = open(path, "ab")
+        # Cut a torn last record off, or new records would be appended to
+        # it and lost on the next recovery
+        if self._file.tell() > valid_length:
+            self._file.truncate(valid_length)
+            if sync:
+                os.fsync(self._file.fileno())
+
+    def write(self, lines) -> int:
+        """
+        Buffers a record of one committed order.
+
+        Args:
+            lines (List[Tuple[int, int, float, str]]): The product ID,
+                quantity, price charged and promotion name of each line.
+
+        Returns:
+            int: The sequence number of the record.
+        """
+        with self._condition:
+            self.sequence += 1
+            self._since_checkpoint += 1
+            self._pending.append(self._encode(self.sequence, lines))
+            return self.sequence
+
+    def wait(self, sequence):
+        """
+        Blocks until the record with the given sequence number is durable.
+        One waiting thread writes the whole pending batch while the others
+        wait for it.
+
+        Args:
+            sequence (int): The sequence number returned by write().
+
+        Raises:
+            OSError: If writing the batch holding the record failed. The
+            record stays buffered and is written by a later flush.
+        """
+        with self._condition:
+            failures = self._failures
+            while self._durable < sequence:
+                if self._failures != failures \
+                        and sequence <= self._failed_sequence:
+                    raise OSError(f"Journal write failed: "
+                                  f"{self._error}") from self._error
+                if self._flushing:
+                    self._condition.wait()
+                else:
+                    self._flush_pending()
+
+    def append(self, lines) -> int:
+        """
+        Writes a record of one committed order and waits until it's
+        durable.
+
+        Args:
+            lines (List[Tuple[int, int, float, str]]): The order lines.
+
+        Returns:
+            int: The sequence number of the record.
+        """
+        sequence = self.write(lines)
+        self.wait(sequence)
+        return sequence
+
+    def checkpoint_due(self) -> bool:
+        """
+        Returns whether checkpoint_every records were written since the
+        last compaction. Only one caller is told so until it calls
+        end_checkpoint().
+        """
+        if self._checkpoint_every is None \
+                or self._since_checkpoint < self._checkpoint_every:
+            return False
+        return self._checkpoint_lock.acquire(blocking=False)
+
+    def compact(self, sequence):
+        """
+        Rewrites the journal without the records up to a sequence number,
+        once a snapshot covering them has been written.
+
+        Args:
+            sequence (int): The sequence number stored in the snapshot.
+        """
+        with self._condition:
+            while self._flushing:
+                self._condition.wait()
+            self._write_batch(self._pending)
+            self._pending = []
+            self._durable = self.sequence
+            self._file.close()
+
+            temporary_path = f"{self.path}.tmp"
+            with open(temporary_path, "wb") as compacted:
+                for record_sequence, lines in read_journal(self.path,
+                                                           after=sequence):
+                    compacted.write(self._encode(record_sequence, lines))
+                compacted.flush()
+                os.fsync(compacted.fileno())
+            os.replace(temporary_path, self.path)
+
+            self._file = open(self.path, "ab")
+            self._since_checkpoint = self.sequence - sequence
+            self._condition.notify_all()
+
+    def end_checkpoint(self):
+        """
+        Ends a checkpoint started after checkpoint_due() returned True,
+        whether it succeeded or not.
+        """
+        self._checkpoint_lock.release()
+
+    def close(self):
+        """
+        Flushes any pending records and closes the journal file.
+        """
+        self.wait(self.sequence)
+        self._file.close()
+
+    @staticmethod
+    def _encode(sequence, lines) -> bytes:
+        """
+        Returns the journal line for one record.
+        """
+        return json.dumps({"seq": sequence, "lines": lines},
+                          separators=(",", ":")).encode("utf-8") + b"\n"
+
+    def _flush_pending(self):
+        """
+        Writes the pending batch, releasing the condition during the
+        write so more records can be buffered for the next batch. If the
+        write fails, the batch is put back in front of the records
+        buffered meanwhile and the threads waiting for it are woken to
+        raise the error.
+        """
+        batch, self._pending = self._pending, []
+        last_sequence = self.sequence
+        self._flushing = True
+        self._condition.release()
+        try:
+            self._write_batch(batch)
+        except Exception as error:
+            self._condition.acquire()
+            self._pending = batch + self._pending
+            self._failures += 1
+            self._failed_sequence = last_sequence
+            self._error = error
+            raise
+        else:
+            self._condition.acquire()
+            self._durable = max(self._durable, last_sequence)
+        finally:
+            self._flushing = False
+            self._condition.notify_all()
+
+    def _write_batch(self, batch):
+        """
+        Writes records to the journal file and syncs it to disk.
+        """
+        if not batch:
+            return
+        start = self._file.tell()
+        try:
+            self._file.write(b"".join(batch))
+            self._file.flush()
+            if self._sync:
+                os.fsync(self._file.fileno())
+        except Exception:
+            # Drop any part of the batch that reached the file, so a retry
+            # doesn't leave a torn record in the middle of the journal
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            os.truncate(self.path, start)
+            self._file = open(self.path, "ab")
+            raise
+
+
+def read_journal(path, after=0):
+    """
+    Yields the records of a journal file in order.
+
+    A torn last line, left by a crash in the middle of a write, is
+    ignored.
+
+    Args:
+        path (str): The journal file.
+        after (int): Only records with a greater sequence number are
+            returned. Defaults to 0.
+
+    Yields:
+        Tuple[int, List[list]]: The sequence number and lines of a record.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as journal_file:
+        for raw_line in journal_file:
+            record = _parse_record(raw_line)
+            if record is None:
+                break
+            if record["seq"] > after:
+                yield record["seq"], record["lines"]
+
+
+def _parse_record(raw_line):
+    """
+    Returns the record of a journal line, or None if the line is torn.
+    """
+    if not raw_line.endswith(b"\n"):
+        return None
+    try:
+        return json.loads(raw_line)
+    except ValueError:
+        return None
+
+
+def recover(snapshot_path, journal_path):
+    """
+    Rebuilds the stock of a snapshot by replaying the journal over it.
+
+    The snapshot is mapped copy-on-write, so the replayed and later
+    changes stay in memory and the file keeps matching its sequence
+    number.
+
+    Only orders are journaled, not catalog edits: after adding or
+    removing products, checkpoint the store so the snapshot holds the
+    catalog the journal's orders refer to.
+
+    Args:
+        snapshot_path (str): The last snapshot.
+        journal_path (str): The journal written since.
+
+    Returns:
+        Tuple[MappedProductTable, int]: The recovered table and the
+        sequence number of the last replayed record.
+
+    Raises:
+        ValueError: If the journal refers to a product not in the
+        snapshot, e.g. one added after the last checkpoint.
+    """
+    table = open_snapshot(snapshot_path, copy_on_write=True)
+    sequence = table.sequence
+    for sequence, lines in read_journal(journal_path, after=table.sequence):
+        for product_id, quantity, _, _ in lines:
+            table.find(product_id)._remove_stock(quantity)
+    return table, sequence
+
+
+def open_durable_store(snapshot_path, journal_path, checkpoint_every=None,
+                       **store_options):
+    """
+    Recovers a store from its snapshot and journal, and attaches the
+    journal so new orders are recorded. Catalog edits are not journaled,
+    so checkpoint the store after adding or removing products, see
+    recover().
+
+    Args:
+        snapshot_path (str): The last snapshot.
+        journal_path (str): The journal written since.
+        checkpoint_every (int, optional): Number of orders after which
+            the store writes a new snapshot and compacts the journal.
+        **store_options: Extra keyword arguments for Store().
+
+    Returns:
+        Store: The recovered store.
+
+    Raises:
+        ValueError: If the journal refers to a product not in the
+        snapshot.
+    """
+    table, sequence = recover(snapshot_path, journal_path)
+    journal = OrderJournal(journal_path, start_sequence=sequence,
+                           snapshot_path=snapshot_path,
+                           checkpoint_every=checkpoint_every)
+    return Store(list(table), journal=journal, **store_options)
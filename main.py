@@ -1,80 +1,158 @@
+import sys
 import store
 import products
 import promotions
 
+# Number of products listed at a time
+PAGE_SIZE = 20
+# Prompt of the main menu
+MENU_PROMPT = "Enter your choice (1-4): "
 
-def list_products(store_obj):
+
+class Console:
+    """
+    The terminal the store management system talks to. Pass another
+    object with the same input() and print() methods to drive the
+    system without a terminal, as replay.py does.
+    """
+
+    def input(self, prompt="") -> str:
+        """
+        Prompts the user and returns the line they entered.
+        """
+        return input(prompt)
+
+    def print(self, *values):
+        """
+        Shows values to the user.
+        """
+        print(*values)
+
+
+TERMINAL = Console()
+
+
+def list_products(store_obj, console=TERMINAL):
     """
-    Display all products currently available in the store.
+    Display all products currently available in the store,
+    one page at a time.
 
     Args:
         store_obj (Store): The Store object containing the products to display.
+        console (Console): Where to show the products. Defaults to the
+            terminal.
     """
-    print("\nProducts in store:")
-    store_obj.show_products()
+    console.print("\nProducts in store:")
+    cursor = None
+    while True:
+        page = store_obj.get_products_page(PAGE_SIZE, cursor)
+        for product in page.products:
+            console.print(product.show())
+        if page.next_cursor is None:
+            break
+        more = console.input("Press Enter for more products, or q to stop: ")
+        if more.strip().lower() == "q":
+            break
+        cursor = page.next_cursor
 
 
-def show_total_quantity(store_obj):
+def show_total_quantity(store_obj, console=TERMINAL):
     """
     Display the total quantity of all products in the store.
 
     Args:
         store_obj (Store): The Store object containing the products.
+        console (Console): Where to show the total. Defaults to the
+            terminal.
 
     Prints:
         The total quantity of all products in the store.
     """
     total_quantity = store_obj.get_total_quantity()
-    print(f"\nTotal quantity of all products in store: {total_quantity}")
+    console.print(f"\nTotal quantity of all products in store: "
+                  f"{total_quantity}")
 
 
-def make_order(store_obj):
+def make_order(store_obj, console=TERMINAL):
     """
     Allow the user to make an order by selecting products and quantities.
 
     Args:
         store_obj (Store): The Store object containing the products to order.
+        console (Console): Where to prompt the user. Defaults to the
+            terminal.
 
     Prompts the user to select products and their quantities,
     and prints the total price of the order.
     """
     shopping_list = []
-    print("\nSelect products to order:")
-    products = store_obj.get_all_products()
-    for idx, product in enumerate(products, start=1):
-        print(f"{idx}. {product.show()}")
-    print("0. Done ordering")
+    console.print("\nSelect products to order:")
+    products = []  # Every product listed so far, by number
+    cursor = _list_order_page(store_obj, products, None, console)
 
     while True:
-        selection = input("Enter product number "
-                          "to order (0 to finish): ").strip()
+        more = ", n for more products" if cursor is not None else ""
+        selection = console.input(f"Enter product number "
+                                  f"to order (0 to finish{more}): ").strip()
         if selection == "0":
             break
+        if selection.lower() == "n" and cursor is not None:
+            cursor = _list_order_page(store_obj, products, cursor, console)
+            continue
         try:
             selection = int(selection)
             if 1 <= selection <= len(products):
                 product_to_order = products[selection - 1]
-                qty_to_order = int(input(f"Enter quantity for '"
-                                         f"{product_to_order.name}': "
-                                         ).strip())
+                qty_to_order = int(console.input(
+                    f"Enter quantity for '{product_to_order.name}': "
+                ).strip())
                 shopping_list.append((product_to_order, qty_to_order))
             else:
-                print("Invalid selection. "
-                      "Please enter a valid product number.")
+                console.print("Invalid selection. "
+                              "Please enter a valid product number.")
         except ValueError:
-            print("Invalid input. Please enter a number.")
+            console.print("Invalid input. Please enter a number.")
 
     if shopping_list:
-        total_price = store_obj.order(shopping_list)
-        print(f"\nTotal price of the order: ${total_price:.2f}")
+        try:
+            total_price = store_obj.order(shopping_list)
+        except ValueError as error:
+            console.print(f"\nOrder failed: {error}")
+            return
+        console.print(f"\nTotal price of the order: ${total_price:.2f}")
+
+
+def _list_order_page(store_obj, products, cursor, console):
+    """
+    Print the next page of products that can be ordered, numbered after
+    the ones already listed.
+
+    Args:
+        store_obj (Store): The Store object containing the products.
+        products (List[Product]): The products listed so far, extended
+            with the ones on this page.
+        cursor (int): The cursor of the page, or None for the first one.
+        console (Console): Where to show the products.
+
+    Returns:
+        int: The cursor of the next page, or None if this was the last.
+    """
+    page = store_obj.get_products_page(PAGE_SIZE, cursor, active_only=True)
+    for idx, product in enumerate(page.products, start=len(products) + 1):
+        console.print(f"{idx}. {product.show()}")
+    products.extend(page.products)
+    console.print("0. Done ordering")
+    return page.next_cursor
 
 
-def start(store_obj):
+def start(store_obj, console=TERMINAL):
     """
     Function to start the store management system.
 
     Args:
         store_obj (Store): The Store object to manage.
+        console (Console): Where to interact with the user. Defaults to
+            the terminal.
 
     Displays a menu-driven interface for the user to interact with the store:
         1. List all products in store
@@ -89,26 +167,31 @@ def start(store_obj):
     }
 
     while True:
-        print("\n===== Welcome to the Store Management System =====")
-        print("1. List all products in store")
-        print("2. Show total quantity in store")
-        print("3. Make an order")
-        print("4. Quit")
+        console.print("\n===== Welcome to the Store Management System =====")
+        console.print("1. List all products in store")
+        console.print("2. Show total quantity in store")
+        console.print("3. Make an order")
+        console.print("4. Quit")
 
-        choice = input("Enter your choice (1-4): ").strip()
+        choice = console.input(MENU_PROMPT).strip()
 
         if choice == "4":
-            print("Thank you for using the Store Management System. Goodbye!")
+            console.print("Thank you for using the Store Management System. "
+                          "Goodbye!")
             break
 
         selected_option = menu_options.get(choice)
         if selected_option:
-            selected_option(store_obj)
+            selected_option(store_obj, console)
         else:
-            print("Invalid choice. Please enter a number between 1 and 4.")
+            console.print("Invalid choice. "
+                          "Please enter a number between 1 and 4.")
 
 
-if __name__ == "__main__":
+def build_demo_store():
+    """
+    Returns a store stocked with the demo inventory.
+    """
     # Setup initial stock of inventory
     product_list = [
         products.Product("MacBook Air M2", price=1450, quantity=100),
@@ -131,7 +214,39 @@ if __name__ == "__main__":
     product_list[3].set_promotion(thirty_percent)
 
     # Initialize store
-    best_buy = store.Store(product_list)
+    return store.Store(product_list)
+
+
+def load_store(catalog_path):
+    """
+    Returns a store of the products in a prebuilt catalog, a snapshot
+    written by snapshot.write_snapshot() with the products' promotions.
+
+    The catalog is memory-mapped copy-on-write: products are read from
+    it on demand, and orders change the session's stock without changing
+    the file. Indexes and aggregates are built on first use.
+
+    Args:
+        catalog_path (str): Path of the catalog snapshot.
+
+    Returns:
+        Store: The store, ready to take orders.
+
+    Raises:
+        ValueError: If the file is not a catalog snapshot.
+    """
+    from snapshot import open_snapshot
+    best_buy = store.Store()
+    best_buy.add_table(open_snapshot(catalog_path, copy_on_write=True))
+    return best_buy
+
+
+if __name__ == "__main__":
+    # A prebuilt catalog may be given as argument, else the demo is used
+    if len(sys.argv) > 1:
+        best_buy = load_store(sys.argv[1])
+    else:
+        best_buy = build_demo_store()
 
     # Start the user interface
     start(best_buy)
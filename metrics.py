@@ -0,0 +1,465 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4,
+                   1e-3, 1e-2, 0.1, 1.0)
+# Upper bounds of the lines per order histogram buckets
+LINE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class Counter:
+    """
+    A monotonically increasing count, optionally split by label values.
+    Updates are not atomic: recorders used from several threads
+    serialize them, like CheckoutMetrics does.
+
+    Attributes:
+        name (str): The metric name.
+        help_text (str): What is counted.
+        label_names (Tuple[str, ...]): Names of the labels.
+        values (Dict[Tuple[str, ...], float]): Count by label values.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, label_names=()):
+        """
+        Initializes a new instance of the Counter class.
+
+        Args:
+            name (str): The metric name.
+            help_text (str): What is counted.
+            label_names (Tuple[str, ...]): Names of the labels.
+                Defaults to none.
+        """
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.values = {}
+
+    def inc(self, amount=1, labels=()):
+        """
+        Adds to the count.
+
+        Args:
+            amount (float): The amount to add. Defaults to 1.
+            labels (Tuple[str, ...]): The label values, in the order
+                of label_names. Defaults to none.
+        """
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def get(self, labels=()) -> float:
+        """
+        Returns the count for the given label values.
+        """
+        return self.values.get(labels, 0)
+
+    def total(self) -> float:
+        """
+        Returns the count over all label values.
+        """
+        return sum(self.values.copy().values())
+
+    def to_dict(self) -> dict:
+        """
+        Returns the counter as JSON-compatible data.
+        """
+        return {
+            "type": self.kind,
+            "help": self.help_text,
+            "values": [{"labels": dict(zip(self.label_names, labels)),
+                        "value": value}
+                       for labels, value in self.values.copy().items()],
+        }
+
+    def to_prometheus(self) -> str:
+        """
+        Returns the counter in the Prometheus text format.
+        """
+        lines = [f"# HELP {self.name} {self.help_text}",
+                 f"# TYPE {self.name} {self.kind}"]
+        for labels, value in sorted(self.values.copy().items()):
+            lines.append(f"{self.name}"
+                         f"{_format_labels(zip(self.label_names, labels))} "
+                         f"{value}")
+        return "\n".join(lines)
+
+
+class Histogram:
+    """
+    A distribution of observed values over fixed buckets. Updates are
+    not atomic, see Counter.
+
+    Attributes:
+        name (str): The metric name.
+        help_text (str): What is observed.
+        buckets (Tuple[float, ...]): Ascending bucket upper bounds.
+        counts (List[int]): Observations per bucket, the last one
+            counting those above every bound.
+        sum (float): Sum of the observations.
+        count (int): Number of observations.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets):
+        """
+        Initializes a new instance of the Histogram class.
+
+        Args:
+            name (str): The metric name.
+            help_text (str): What is observed.
+            buckets (Iterable[float]): Ascending bucket upper bounds.
+        """
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        """
+        Records one observation.
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, fraction) -> float:
+        """
+        Returns the upper bound of the bucket holding the given quantile
+        of the observations, or infinity if it is above every bucket.
+
+        Args:
+            fraction (float): The quantile, e.g. 0.99.
+        """
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def to_dict(self) -> dict:
+        """
+        Returns the histogram as JSON-compatible data.
+        """
+        return {
+            "type": self.kind,
+            "help": self.help_text,
+            "buckets": list(self.buckets),
+            "counts": list(self.counts),
+            "sum": self.sum,
+            "count": self.count,
+        }
+
+    def to_prometheus(self) -> str:
+        """
+        Returns the histogram in the Prometheus text format.
+        """
+        lines = [f"# HELP {self.name} {self.help_text}",
+                 f"# TYPE {self.name} {self.kind}"]
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {self.sum}")
+        lines.append(f"{self.name}_count {self.count}")
+        return "\n".join(lines)
+
+
+class MetricsRegistry:
+    """
+    A set of named metrics that can be exported together.
+
+    Methods:
+        counter(name, help_text, label_names) -> Counter:
+            Creates and registers a counter.
+
+        histogram(name, help_text, buckets) -> Histogram:
+            Creates and registers a histogram.
+
+        to_prometheus() -> str / to_json() -> str:
+            Exports every metric.
+
+        write(path):
+            Saves every metric to a file.
+
+        serve(host, port) -> ThreadingHTTPServer:
+            Serves every metric over HTTP.
+    """
+
+    def __init__(self):
+        """
+        Initializes a new, empty instance of the MetricsRegistry class.
+        """
+        self._metrics = {}  # name -> Counter or Histogram
+        self._started = time.monotonic()
+
+    def __getitem__(self, name):
+        return self._metrics[name]
+
+    def _register(self, metric):
+        """
+        Adds a metric to the registry.
+
+        Raises:
+            ValueError: If a metric with the same name is registered.
+        """
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, label_names=()) -> Counter:
+        """
+        Creates and registers a counter, see Counter.
+
+        Raises:
+            ValueError: If a metric with the same name is registered.
+        """
+        return self._register(Counter(name, help_text, label_names))
+
+    def histogram(self, name, help_text, buckets) -> Histogram:
+        """
+        Creates and registers a histogram, see Histogram.
+
+        Raises:
+            ValueError: If a metric with the same name is registered.
+        """
+        return self._register(Histogram(name, help_text, buckets))
+
+    def uptime(self) -> float:
+        """
+        Returns the seconds since the registry was created.
+        """
+        return time.monotonic() - self._started
+
+    def to_dict(self) -> Dict[str, dict]:
+        """
+        Returns every metric as JSON-compatible data.
+        """
+        return {
+            "uptime_seconds": self.uptime(),
+            "metrics": {name: metric.to_dict()
+                        for name, metric in self._metrics.items()},
+        }
+
+    def to_json(self) -> str:
+        """
+        Returns every metric as a JSON document.
+        """
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """
+        Returns every metric in the Prometheus text format.
+        """
+        return "".join(metric.to_prometheus() + "\n"
+                       for metric in self._metrics.values())
+
+    def write(self, path):
+        """
+        Saves every metric to a file, replacing it atomically, as JSON
+        if the path ends in ".json" and as Prometheus text otherwise.
+
+        Args:
+            path (str): The file to write.
+        """
+        text = self.to_json() if path.endswith(".json") \
+            else self.to_prometheus()
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.write(text)
+        os.replace(temporary_path, path)
+
+    def serve(self, host="127.0.0.1", port=0) -> ThreadingHTTPServer:
+        """
+        Serves every metric over HTTP from a background thread: Prometheus
+        text at /metrics and JSON at /metrics.json.
+
+        Args:
+            host (str): The address to listen on. Defaults to localhost.
+            port (int): The port to listen on. Defaults to 0, any free one.
+
+        Returns:
+            ThreadingHTTPServer: The running server; its server_address
+            holds the port, and shutdown() stops it.
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body = registry.to_prometheus()
+                    content_type = "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body = registry.to_json()
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+class CheckoutMetrics:
+    """
+    The checkout metrics recorded by Store.order(), Store.order_many()
+    and Product.buy(): orders, lines per order, latency, rejections by
+    cause and the lines priced with each promotion.
+
+    Instrumentation is off unless a CheckoutMetrics is passed to a Store
+    or set as Product.metrics, and then costs one attribute check.
+
+    Methods:
+        record_order(shopping_list, seconds):
+            Records a placed order.
+
+        record_buy(product, seconds):
+            Records a Product.buy().
+
+        record_rejection(error):
+            Records a rejected order, line or buy by its cause.
+
+        orders_per_second() -> float:
+            Returns the average order rate since the registry started.
+
+        promotion_hit_rates() -> Dict[str, float]:
+            Returns the share of lines priced with each promotion.
+    """
+
+    def __init__(self, registry=None):
+        """
+        Initializes a new instance of the CheckoutMetrics class.
+
+        Args:
+            registry (MetricsRegistry, optional): The registry to add the
+                metrics to. A new one is created when omitted.
+        """
+        self.registry = registry if registry is not None \
+            else MetricsRegistry()
+        registry = self.registry
+        # One lock per recorded event serializes the metric updates
+        self._lock = threading.Lock()
+        self.orders = registry.counter("store_orders_total",
+                                       "Orders placed")
+        self.order_lines = registry.histogram(
+            "store_order_lines", "Lines per placed order", LINE_BUCKETS)
+        self.order_seconds = registry.histogram(
+            "store_order_seconds", "Latency of Store.order in seconds",
+            LATENCY_BUCKETS)
+        self.buys = registry.counter("product_buys_total",
+                                     "Calls of Product.buy that succeeded")
+        self.buy_seconds = registry.histogram(
+            "product_buy_seconds", "Latency of Product.buy in seconds",
+            LATENCY_BUCKETS)
+        self.lines = registry.counter(
+            "checkout_lines_total", "Lines of placed orders and buys")
+        self.promotion_lines = registry.counter(
+            "checkout_promotion_lines_total",
+            "Lines of placed orders and buys priced with each promotion",
+            ("promotion",))
+        self.rejections = registry.counter(
+            "checkout_rejections_total",
+            "Rejected orders, batch lines and buys by cause", ("cause",))
+
+    def record_order(self, shopping_list, seconds=None):
+        """
+        Records a placed order.
+
+        Args:
+            shopping_list (List[Tuple[Product, int]]): The order's lines.
+            seconds (float, optional): How long placing it took, or None
+                if it was placed as part of a batch.
+        """
+        line_count = len(shopping_list)
+        with self._lock:
+            self.orders.inc()
+            self.order_lines.observe(line_count)
+            if seconds is not None:
+                self.order_seconds.observe(seconds)
+            self.lines.inc(line_count)
+            for product, _ in shopping_list:
+                promotion = product.promotion
+                if promotion is not None:
+                    self.promotion_lines.inc(1, (promotion.name,))
+
+    def record_buy(self, product, seconds):
+        """
+        Records a successful Product.buy().
+
+        Args:
+            product (Product): The product bought.
+            seconds (float): How long the buy took.
+        """
+        promotion = product.promotion
+        with self._lock:
+            self.buys.inc()
+            self.buy_seconds.observe(seconds)
+            self.lines.inc()
+            if promotion is not None:
+                self.promotion_lines.inc(1, (promotion.name,))
+
+    def record_rejection(self, error):
+        """
+        Records a rejection by the cause of a PurchaseError, or "other"
+        for any other error.
+
+        Args:
+            error (Exception): The error that rejected the purchase.
+        """
+        cause = getattr(error, "cause", "other")
+        with self._lock:
+            self.rejections.inc(1, (cause,))
+
+    def orders_per_second(self) -> float:
+        """
+        Returns the average number of orders placed per second since
+        the registry was created.
+        """
+        uptime = self.registry.uptime()
+        return self.orders.total() / uptime if uptime else 0.0
+
+    def promotion_hit_rates(self) -> Dict[str, float]:
+        """
+        Returns the share of all lines priced with each promotion.
+        """
+        lines = self.lines.total()
+        return {labels[0]: count / lines for labels, count
+                in self.promotion_lines.values.copy().items()}
+
+
+def _format_labels(pairs) -> str:
+    """
+    Returns Prometheus label syntax for (name, value) pairs.
+    """
+    labels = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return f"{{{labels}}}" if labels else ""
+
+
+def _escape(value) -> str:
+    """
+    Escapes a Prometheus label value.
+    """
+    return str(value).replace("\\", "\\\\").replace('"', '\\"') \
+        .replace("\n", "\\n")
@@ -0,0 +1,118 @@
+from decimal import (Decimal, ROUND_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP,
+                     ROUND_UP)
+
+# Rounding policies, named like the decimal module's
+ROUNDING_POLICIES = (ROUND_DOWN, ROUND_UP, ROUND_HALF_UP, ROUND_HALF_EVEN)
+
+# Policy used when none is given: halves of a cent round up
+DEFAULT_ROUNDING = ROUND_HALF_UP
+
+
+def to_cents(amount, rounding=DEFAULT_ROUNDING) -> int:
+    """
+    Converts an amount of dollars to integer cents.
+
+    Floats are converted through their shortest decimal representation,
+    so 0.1 becomes exactly 10 cents.
+
+    Args:
+        amount (int, float, str or Decimal): The amount in dollars.
+        rounding (str): Policy for amounts with fractions of a cent.
+
+    Returns:
+        int: The amount in cents.
+    """
+    if isinstance(amount, int):
+        return amount * 100
+    cents = Decimal(str(amount)).scaleb(2)
+    return int(cents.to_integral_value(rounding=rounding))
+
+
+def from_cents(cents) -> float:
+    """
+    Converts integer cents to dollars.
+
+    Args:
+        cents (int): The amount in cents.
+
+    Returns:
+        float: The amount in dollars.
+    """
+    return cents / 100
+
+
+def format_cents(cents) -> str:
+    """
+    Formats integer cents as a dollar amount, e.g. "$12.34".
+
+    Args:
+        cents (int): The amount in cents.
+
+    Returns:
+        str: The formatted amount.
+    """
+    sign = "-" if cents < 0 else ""
+    dollars, cents = divmod(abs(cents), 100)
+    return f"{sign}${dollars}.{cents:02d}"
+
+
+def divide(numerator, denominator, rounding=DEFAULT_ROUNDING) -> int:
+    """
+    Divides two integers, rounding the quotient with integer arithmetic.
+
+    Args:
+        numerator (int): The dividend.
+        denominator (int): The divisor, which must be positive.
+        rounding (str): One of ROUNDING_POLICIES.
+
+    Returns:
+        int: The rounded quotient.
+
+    Raises:
+        ValueError: If the rounding policy is unknown.
+    """
+    negative = numerator < 0
+    quotient, remainder = divmod(-numerator if negative else numerator,
+                                 denominator)
+    if remainder:
+        if rounding == ROUND_HALF_EVEN:
+            twice = 2 * remainder
+            if twice > denominator or (twice == denominator and quotient & 1):
+                quotient += 1
+        elif rounding == ROUND_HALF_UP:
+            if 2 * remainder >= denominator:
+                quotient += 1
+        elif rounding == ROUND_UP:
+            quotient += 1
+        elif rounding != ROUND_DOWN:
+            raise ValueError(f"Unknown rounding policy {rounding}")
+    return -quotient if negative else quotient
+
+
+def divider(denominator, rounding=DEFAULT_ROUNDING):
+    """
+    Returns a function dividing non-negative integers by a fixed
+    denominator with the given rounding, specialized so the common
+    policies cost a single integer division.
+
+    Args:
+        denominator (int): The divisor, which must be positive.
+        rounding (str): One of ROUNDING_POLICIES.
+
+    Returns:
+        Callable[[int], int]: The rounded division.
+
+    Raises:
+        ValueError: If the rounding policy is unknown.
+    """
+    if rounding == ROUND_DOWN:
+        return lambda numerator: numerator // denominator
+    if rounding == ROUND_UP:
+        return lambda numerator: -(-numerator // denominator)
+    if rounding == ROUND_HALF_UP:
+        twice = 2 * denominator
+        return lambda numerator: (2 * numerator + denominator) // twice
+    if rounding == ROUND_HALF_EVEN:
+        return lambda numerator: divide(numerator, denominator,
+                                        ROUND_HALF_EVEN)
+    raise ValueError(f"Unknown rounding policy {rounding}")
@@ -0,0 +1,336 @@
+from array import array
+from types import FunctionType
+from products import (Product, NonStockedProduct, LimitedProduct,
+                      next_product_id)
+
+# Values of the ProductTable.kinds column
+KIND_PRODUCT = 0
+KIND_NON_STOCKED = 1
+KIND_LIMITED = 2
+
+
+class ProductTable:
+    """
+    A columnar store for large catalogs.
+
+    Prices, quantities and the other numeric fields are kept in typed
+    arrays, one per field, and names in a plain list. Rows are handed out
+    as lightweight views that behave like Product, NonStockedProduct or
+    LimitedProduct objects and read and write the table directly.
+
+    Attributes:
+        names (List[str]): The name of each product.
+        prices (array): The price of each product.
+        quantities (array): The quantity in stock of each product.
+        maximums (array): The purchase maximum of limited products.
+        kinds (array): The KIND_* constant of each product.
+        promotion_ids (array): Index into promotions, 0 for none.
+        active (array): 1 if the product is active, 0 otherwise.
+        product_ids (array): The stable product ID of each product.
+        promotions (List[Promotion]): The distinct promotions in use,
+            starting with None.
+        observers (Tuple[callable, ...]): Change callbacks of every row
+            that has none of its own, see Product.add_observer().
+
+    Methods:
+        append(name, price, quantity, ...) -> ProductView:
+            Adds a product row and returns a view of it.
+
+        add(product) -> ProductView:
+            Copies an existing product into the table.
+
+        view(row) -> ProductView:
+            Returns a view of the given row.
+
+        add_observer(observer) / remove_observer(observer):
+            Registers or unregisters a change callback of every row.
+    """
+
+    def __init__(self):
+        """
+        Initializes a new, empty instance of the ProductTable class.
+        """
+        self.names = []
+        self.prices = array("d")
+        self.quantities = array("q")
+        self.maximums = array("q")
+        self.kinds = array("B")
+        self.promotion_ids = array("l")
+        self.active = array("B")
+        self.product_ids = array("q")
+        self.promotions = [None]
+        self._promotion_index = {}  # id(promotion) -> index in promotions
+        self._init_row_state()
+
+    def _init_row_state(self):
+        """
+        Creates the dicts holding per-row state that is rarely set or
+        derived, kept out of the columns.
+        """
+        self.observers = ()
+        self._observers = {}
+        self._locks = {}
+        self._pricers = {}
+        self._cents_pricers = {}
+        self._show_caches = {}
+
+    def __len__(self) -> int:
+        """
+        Returns the number of rows in the table.
+        """
+        return len(self.product_ids)
+
+    def __iter__(self):
+        """
+        Yields a view of every row in the table.
+        """
+        view_classes = _VIEW_CLASSES
+        for row, kind in enumerate(self.kinds):
+            yield view_classes[kind](self, row)
+
+    def add_observer(self, observer):
+        """
+        Registers a callback that is notified after any row changes, like
+        calling add_observer() on every view but without touching the rows
+        that have no callbacks of their own.
+
+        Args:
+            observer (callable): Called as ``observer(view, field,
+                old_value)``, see Product.add_observer().
+        """
+        for row, observers in self._observers.items():
+            self._observers[row] = observers + (observer,)
+        self.observers = self.observers + (observer,)
+
+    def remove_observer(self, observer):
+        """
+        Unregisters a callback previously passed to add_observer().
+
+        Args:
+            observer (callable): The callback to remove.
+        """
+        self.observers = tuple(registered for registered in self.observers
+                               if registered != observer)
+        for row, observers in list(self._observers.items()):
+            observers = tuple(registered for registered in observers
+                              if registered != observer)
+            if observers == self.observers:
+                del self._observers[row]
+            else:
+                self._observers[row] = observers
+
+    def view(self, row):
+        """
+        Returns a view of the given row.
+
+        Args:
+            row (int): The row index.
+
+        Returns:
+            ProductView: A view of the matching kind.
+        """
+        return _VIEW_CLASSES[self.kinds[row]](self, row)
+
+    def append(self, name, price, quantity, kind=KIND_PRODUCT, maximum=0,
+               promotion=None, product_id=None):
+        """
+        Adds a product row, applying the same checks as Product().
+
+        Args:
+            name (str): The name of the product.
+            price (float): The price of the product.
+            quantity (int): The initial quantity of the product. Ignored
+                for non-stocked products, which always have 1.
+            kind (int): One of the KIND_* constants.
+            maximum (int): The purchase maximum of a limited product.
+            promotion (Promotion, optional): The promotion to apply.
+            product_id (int, optional): Stable identifier of the product.
+                A unique one is generated when omitted.
+
+        Returns:
+            ProductView: A view of the new row.
+
+        Raises:
+            ValueError: If the details are invalid or the kind unknown.
+        """
+        if kind == KIND_NON_STOCKED:
+            quantity = 1
+        elif kind not in (KIND_PRODUCT, KIND_LIMITED):
+            raise ValueError(f"Unknown product kind {kind}")
+        Product.validate(name, price, quantity)
+
+        self.names.append(name)
+        self.prices.append(price)
+        self.quantities.append(quantity)
+        self.maximums.append(maximum)
+        self.kinds.append(kind)
+        self.promotion_ids.append(self._get_promotion_id(promotion))
+        self.active.append(1)
+        self.product_ids.append(next_product_id()
+                                if product_id is None else product_id)
+        return self.view(len(self) - 1)
+
+    def add(self, product):
+        """
+        Copies an existing product into the table.
+
+        Args:
+            product (Product): The product to copy.
+
+        Returns:
+            ProductView: A view of the new row.
+        """
+        if isinstance(product, LimitedProduct):
+            kind, maximum = KIND_LIMITED, product.maximum
+        elif isinstance(product, NonStockedProduct):
+            kind, maximum = KIND_NON_STOCKED, 0
+        else:
+            kind, maximum = KIND_PRODUCT, 0
+        view = self.append(product.name, product.price, product.quantity,
+                           kind, maximum, product.promotion,
+                           product.product_id)
+        view.is_active = product.is_active
+        return view
+
+    def _get_promotion_id(self, promotion) -> int:
+        """
+        Returns the index of a promotion in promotions, adding it if new.
+        """
+        if promotion is None:
+            return 0
+        index = self._promotion_index.get(id(promotion))
+        if index is None:
+            index = self._promotion_index[id(promotion)] = \
+                len(self.promotions)
+            self.promotions.append(promotion)
+        return index
+
+
+def _column(column):
+    """
+    Returns a property reading and writing one column of the view's row.
+    """
+    def get_value(view):
+        return getattr(view._table, column)[view._row]
+
+    def set_value(view, value):
+        getattr(view._table, column)[view._row] = value
+
+    return property(get_value, set_value)
+
+
+def _row_state(attribute, default):
+    """
+    Returns a property for sparse per-row state kept in a table dict.
+    """
+    def get_value(view):
+        return getattr(view._table, attribute).get(view._row, default)
+
+    def set_value(view, value):
+        state = getattr(view._table, attribute)
+        if value == default:
+            state.pop(view._row, None)
+        else:
+            state[view._row] = value
+
+    return property(get_value, set_value)
+
+
+class ProductView:
+    """
+    A view of one ProductTable row that behaves like a Product.
+
+    Views are created on demand and hold nothing but the table and row,
+    so keep the view objects you hand to a Store: the store recognizes
+    its products by identity.
+    """
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table, row):
+        self._table = table
+        self._row = row
+
+    name = _column("names")
+    price = _column("prices")
+    quantity = _column("quantities")
+    maximum = _column("maximums")
+    product_id = _column("product_ids")
+    _lock = _row_state("_locks", None)
+    _pricer = _row_state("_pricers", None)
+    _cents_pricer = _row_state("_cents_pricers", None)
+    _show_cache = _row_state("_show_caches", None)
+
+    @property
+    def _observers(self):
+        table = self._table
+        return table._observers.get(self._row, table.observers)
+
+    @_observers.setter
+    def _observers(self, observers):
+        table = self._table
+        if observers == table.observers:
+            table._observers.pop(self._row, None)
+        else:
+            table._observers[self._row] = observers
+
+    @property
+    def is_active(self) -> bool:
+        return bool(self._table.active[self._row])
+
+    @is_active.setter
+    def is_active(self, value):
+        self._table.active[self._row] = bool(value)
+
+    @property
+    def promotion(self):
+        return self._table.promotions[self._table.promotion_ids[self._row]]
+
+    @promotion.setter
+    def promotion(self, promotion):
+        table = self._table
+        table.promotion_ids[self._row] = table._get_promotion_id(promotion)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} row {self._row}: {self.show()}>"
+
+
+class NonStockedProductView(ProductView):
+    """
+    A view of a ProductTable row that behaves like a NonStockedProduct.
+    """
+
+    __slots__ = ()
+
+
+class LimitedProductView(ProductView):
+    """
+    A view of a ProductTable row that behaves like a LimitedProduct.
+    """
+
+    __slots__ = ()
+
+
+def _borrow_methods(view_class, product_class):
+    """
+    Gives a view class the methods of a product class, and registers it
+    as a virtual subclass so isinstance() checks accept the views.
+    """
+    for klass in reversed(product_class.__mro__):
+        for name, value in vars(klass).items():
+            if isinstance(value, FunctionType) and not name.startswith("__"):
+                setattr(view_class, name, value)
+    # Read through, so setting Product.metrics instruments views too
+    view_class.metrics = property(lambda view: product_class.metrics)
+    product_class.register(view_class)
+
+
+_borrow_methods(ProductView, Product)
+_borrow_methods(NonStockedProductView, NonStockedProduct)
+_borrow_methods(LimitedProductView, LimitedProduct)
+
+_VIEW_CLASSES = {
+    KIND_PRODUCT: ProductView,
+    KIND_NON_STOCKED: NonStockedProductView,
+    KIND_LIMITED: LimitedProductView,
+}
@@ -1,6 +1,39 @@
 from abc import ABC, abstractmethod
+from itertools import count
+from time import perf_counter
+from money import to_cents
 from promotions import Promotion
 
+# Source of stable identifiers for products created without an explicit ID
+_product_ids = count(1)
+
+# Causes of a PurchaseError
+INVALID_QUANTITY = "invalid_quantity"
+OUT_OF_STOCK = "out_of_stock"
+OVER_MAXIMUM = "over_maximum"
+UNKNOWN_PRODUCT = "unknown_product"
+
+
+class PurchaseError(ValueError):
+    """
+    The ValueError raised when a purchase can't be filled.
+
+    Attributes:
+        cause (str): Why, one of INVALID_QUANTITY, OUT_OF_STOCK,
+            OVER_MAXIMUM and UNKNOWN_PRODUCT.
+    """
+
+    def __init__(self, message, cause):
+        super().__init__(message)
+        self.cause = cause
+
+
+def next_product_id() -> int:
+    """
+    Returns a new unique product ID.
+    """
+    return next(_product_ids)
+
 
 class Product(ABC):
     """
@@ -12,8 +45,17 @@ class Product(ABC):
         quantity (int): The quantity of the product in stock.
         promotion (Promotion): The promotion applied to the product (optional).
         is_active (bool): Whether the product is active or not.
+        product_id (int): Stable identifier used to index the product.
+        metrics (CheckoutMetrics): Class-wide recorder of every buy(),
+            or None, the default, to record nothing.
+
+    Products use __slots__ instead of a per-instance __dict__ to keep
+    large catalogs compact.
 
     Methods:
+        validate(name, price, quantity):
+            Checks product details, raising like the constructor does.
+
         get_quantity() -> int:
             Returns the current quantity of the product.
 
@@ -33,9 +75,21 @@ class Product(ABC):
 
         remove_promotion():
             Removes the promotion from the product.
+
+        set_quantity(quantity) / set_price(price):
+            Updates the stock or price, notifying observers.
+
+        add_observer(observer) / remove_observer(observer):
+            Registers or unregisters a change callback.
     """
 
-    def __init__(self, name, price, quantity):
+    __slots__ = ("name", "price", "quantity", "promotion", "is_active",
+                 "product_id", "_observers", "_lock", "_pricer",
+                 "_cents_pricer", "_show_cache")
+
+    metrics = None
+
+    def __init__(self, name, price, quantity, product_id=None):
         """
         Initializes a new instance of the Product class.
 
@@ -43,28 +97,70 @@ class Product(ABC):
             name (str): The name of the product.
             price (float): The price of the product.
             quantity (int): The initial quantity of the product.
+            product_id (int, optional): Stable identifier of the product.
+                A unique one is generated when omitted.
 
         Raises:
             ValueError: If name is empty, price or quantity is negative.
         """
-        if not name:
-            raise NameError("Name cannot be empty")
-        if price < 0:
-            raise ValueError("Price can't be negative")
-        if quantity < 0:
-            raise ValueError("Quantity can't be negative")
+        self.validate(name, price, quantity)
 
         self.name = name
         self.price = price
         self.quantity = quantity
         self.promotion = None  # No initial promotion
         self.is_active = True  # Product is active by default
+        self.product_id = next(_product_ids) \
+            if product_id is None else product_id
+        self._observers = ()  # Change callbacks, see add_observer()
+        self._lock = None  # Stock lock set by a thread-safe Store
+        self._pricer = None  # Compiled pricing function, see get_price()
+        self._cents_pricer = None  # Same in cents, see get_price_cents()
+        self._show_cache = None  # Formatted show() string
+
+    def __getstate__(self):
+        """
+        Returns the product's data for pickling, leaving out observers,
+        locks and cached pricers and strings, which belong to the
+        running process.
+        """
+        return {name: getattr(self, name)
+                for klass in type(self).__mro__
+                for name in getattr(klass, "__slots__", ())
+                if not name.startswith("_")}
 
-    def is_active(self) -> bool:
+    def __setstate__(self, state):
+        """
+        Restores a product unpickled from __getstate__() data.
         """
-        Returns the status of the product
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._observers = ()
+        self._lock = None
+        self._pricer = None
+        self._cents_pricer = None
+        self._show_cache = None
+
+    @staticmethod
+    def validate(name, price, quantity):
         """
-        return self.is_active
+        Checks the details of a product.
+
+        Args:
+            name (str): The name of the product.
+            price (float): The price of the product.
+            quantity (int): The quantity of the product.
+
+        Raises:
+            NameError: If name is empty.
+            ValueError: If price or quantity is negative.
+        """
+        if not name:
+            raise NameError("Name cannot be empty")
+        if price < 0:
+            raise ValueError("Price can't be negative")
+        if quantity < 0:
+            raise ValueError("Quantity can't be negative")
 
     def get_quantity(self) -> int:
         """
@@ -76,6 +172,18 @@ class Product(ABC):
         """
         Returns a string representation of the product's name,
         price, quantity, and active status.
+
+        The string is formatted once and cached until the product's
+        stock, price or promotion changes.
+        """
+        text = self._show_cache
+        if text is None:
+            text = self._show_cache = self._describe()
+        return text
+
+    def _describe(self) -> str:
+        """
+        Formats the string returned by show().
         """
         promotion_info = f" (Promotion: {self.promotion.name})" \
             if self.promotion else ""
@@ -84,6 +192,125 @@ class Product(ABC):
                 f"Quantity: {self.quantity}, "
                 f"Status: {active_status}{promotion_info}")
 
+    def check_purchase(self, quantity, already_taken=0):
+        """
+        Checks that a given quantity of the product can be bought,
+        without changing anything.
+
+        Args:
+            quantity (int): The quantity of the product to buy.
+            already_taken (int): Units of the product already claimed
+                by earlier lines of the same order or batch.
+
+        Raises:
+            ValueError: If the quantity is not positive or exceeds
+            the available stock.
+        """
+        if quantity <= 0:
+            raise PurchaseError("Purchase quantity must be positive",
+                                INVALID_QUANTITY)
+
+        if quantity + already_taken > self.quantity:
+            raise PurchaseError("Not enough stock available", OUT_OF_STOCK)
+
+    def get_price(self, quantity) -> float:
+        """
+        Returns the price of a given quantity of the product,
+        applying any promotion if set.
+
+        Args:
+            quantity (int): The quantity of the product.
+
+        Returns:
+            float: The total price for that quantity.
+        """
+        pricer = self._pricer
+        if pricer is None:
+            pricer = self._pricer = self._compile_pricer()
+        return pricer(quantity)
+
+    def get_base_price(self, quantity) -> float:
+        """
+        Returns the price of a given quantity of the product,
+        ignoring any promotion.
+
+        Args:
+            quantity (int): The quantity of the product.
+
+        Returns:
+            float: The undiscounted total price for that quantity.
+        """
+        return quantity * self.price
+
+    def _compile_pricer(self):
+        """
+        Returns a function pricing a quantity of the product, with the
+        current price and promotion built in. It's cached by get_price()
+        until the price or promotion changes.
+        """
+        if self.promotion:
+            return self.promotion.compile(self)
+        price = self.price
+        return lambda quantity: quantity * price
+
+    def _compile_cents_pricer(self):
+        """
+        Returns the pricing function of _compile_pricer() in integer
+        cents, cached by get_price_cents().
+        """
+        if self.promotion:
+            return self.promotion.compile_cents(self)
+        price_cents = to_cents(self.price)
+        return lambda quantity: quantity * price_cents
+
+    def get_price_cents(self, quantity) -> int:
+        """
+        Returns the price of a given quantity of the product in integer
+        cents, applying any promotion if set with its rounding policy.
+
+        Args:
+            quantity (int): The quantity of the product.
+
+        Returns:
+            int: The total price for that quantity, in cents.
+        """
+        pricer = self._cents_pricer
+        if pricer is None:
+            pricer = self._cents_pricer = self._compile_cents_pricer()
+        return pricer(quantity)
+
+    def get_prices_cents(self, quantities) -> list:
+        """
+        Returns the price in integer cents of each of several quantities
+        of the product.
+
+        Args:
+            quantities (List[int]): The quantities to price.
+
+        Returns:
+            List[int]: The total price for each quantity, in cents.
+        """
+        pricer = self._cents_pricer
+        if pricer is None:
+            pricer = self._cents_pricer = self._compile_cents_pricer()
+        return [pricer(quantity) for quantity in quantities]
+
+    def get_prices(self, quantities) -> list:
+        """
+        Returns the price of each of several quantities of the product
+        in one pass, applying any promotion if set.
+
+        Args:
+            quantities (List[int]): The quantities to price.
+
+        Returns:
+            List[float]: The total price for each quantity.
+        """
+        if self.promotion:
+            return self.promotion.apply_promotion_many(self, quantities)
+        price = self.price
+        return [quantity * price for quantity in quantities]
+
     def buy(self, quantity) -> float:
         """
         Buys a given quantity of the product, updates the quantity,
@@ -96,25 +323,93 @@ class Product(ABC):
         Returns:
             float: The total price of the purchase.
         """
-        if quantity <= 0:
-            raise ValueError("Purchase quantity must be positive")
+        metrics = self.metrics
+        if metrics is not None:
+            started = perf_counter()
+        lock = self._lock
+        try:
+            if lock is not None:
+                # Check and decrement must not interleave with other buyers
+                with lock:
+                    total_price = self._buy(quantity)
+            else:
+                total_price = self._buy(quantity)
+        except ValueError as error:
+            if metrics is not None:
+                metrics.record_rejection(error)
+            raise
+        if metrics is not None:
+            metrics.record_buy(self, perf_counter() - started)
+        return total_price
 
-        if quantity > self.quantity:
-            raise ValueError("Not enough stock available")
+    def _buy(self, quantity) -> float:
+        """
+        Buys a given quantity of the product without any locking.
+        """
+        self.check_purchase(quantity)
 
         # Calculate the total price with promotion if applicable
-        if self.promotion:
-            total_price = self.promotion.apply_promotion(self, quantity)
-        else:
-            total_price = quantity * self.price
+        total_price = self.get_price(quantity)
 
+        self._remove_stock(quantity)
+
+        return total_price
+
+    def _remove_stock(self, quantity):
+        """
+        Takes an already checked quantity out of stock, deactivating
+        the product when none is left.
+        """
+        old_quantity = self.quantity
         self.quantity -= quantity
+        self._show_cache = None
 
         # Deactivate the product if quantity becomes zero
         if self.quantity == 0:
             self.is_active = False
 
-        return total_price
+        if self._observers:
+            self._notify("quantity", old_quantity)
+
+    def set_quantity(self, quantity):
+        """
+        Sets the quantity in stock, e.g. after a restock, activating the
+        product when it has stock and deactivating it when it has none.
+
+        Args:
+            quantity (int): The new quantity.
+
+        Raises:
+            ValueError: If the quantity is negative.
+        """
+        if quantity < 0:
+            raise ValueError("Quantity can't be negative")
+        old_quantity = self.quantity
+        self.quantity = quantity
+        self.is_active = quantity > 0
+        self._show_cache = None
+        if self._observers:
+            self._notify("quantity", old_quantity)
+
+    def set_price(self, price):
+        """
+        Sets the price of the product.
+
+        Args:
+            price (float): The new price.
+
+        Raises:
+            ValueError: If the price is negative.
+        """
+        if price < 0:
+            raise ValueError("Price can't be negative")
+        old_price = self.price
+        self.price = price
+        self._pricer = None
+        self._cents_pricer = None
+        self._show_cache = None
+        if self._observers:
+            self._notify("price", old_price)
 
     def set_promotion(self, promotion: Promotion):
         """
@@ -123,13 +418,53 @@ class Product(ABC):
         Args:
             promotion (Promotion): The promotion to apply to the product.
         """
+        old_promotion = self.promotion
         self.promotion = promotion
+        self._pricer = self._compile_pricer()
+        self._cents_pricer = None
+        self._show_cache = None
+        if self._observers:
+            self._notify("promotion", old_promotion)
 
     def remove_promotion(self):
         """
         Removes the promotion from the product.
         """
+        old_promotion = self.promotion
         self.promotion = None
+        self._pricer = None
+        self._cents_pricer = None
+        self._show_cache = None
+        if self._observers:
+            self._notify("promotion", old_promotion)
+
+    def add_observer(self, observer):
+        """
+        Registers a callback that is notified after the product changes.
+
+        Args:
+            observer (callable): Called as ``observer(product, field,
+                old_value)`` where field is "quantity", "price" or
+                "promotion".
+        """
+        self._observers = self._observers + (observer,)
+
+    def remove_observer(self, observer):
+        """
+        Unregisters a callback previously passed to add_observer().
+
+        Args:
+            observer (callable): The callback to remove.
+        """
+        self._observers = tuple(registered for registered in self._observers
+                                if registered != observer)
+
+    def _notify(self, field, old_value):
+        """
+        Calls every registered observer with the changed field.
+        """
+        for observer in self._observers:
+            observer(self, field, old_value)
 
 
 class NonStockedProduct(Product):
@@ -138,20 +473,84 @@ class NonStockedProduct(Product):
     Non-stocked products have a fixed price and quantity of 1.
     """
 
-    def __init__(self, name, price):
+    __slots__ = ()
+
+    def __init__(self, name, price, product_id=None):
         """
         Initializes a new instance of NonStockedProduct.
 
         Args:
             name (str): The name of the non-stocked product.
             price (float): The price of the non-stocked product.
+            product_id (int, optional): Stable identifier of the product.
         """
-        super().__init__(name, price, quantity=1)
+        super().__init__(name, price, quantity=1, product_id=product_id)
 
-    def buy(self, quantity) -> float:
+    def check_purchase(self, quantity, already_taken=0):
+        """
+        Override the purchase check for non-stocked products, which
+        are never out of stock.
+
+        Args:
+            quantity (int): The quantity of the non-stocked product to "buy".
+            already_taken (int): Ignored, non-stocked products have
+                no stock to claim.
+
+        Raises:
+            ValueError: If the quantity is not positive.
+        """
+        if quantity <= 0:
+            raise PurchaseError("Purchase quantity must be positive",
+                                INVALID_QUANTITY)
+
+    def get_base_price(self, quantity) -> float:
+        """
+        Override the undiscounted price for non-stocked products to
+        always return the fixed price.
+        """
+        return self.price
+
+    def _compile_pricer(self):
+        """
+        Override the pricing function for non-stocked products to always
+        return the fixed price.
+        Applies any promotion if set.
+        """
+        # Apply promotion if set
+        if self.promotion:
+            return self.promotion.compile(self)
+        price = self.price
+        return lambda quantity: price
+
+    def _compile_cents_pricer(self):
+        """
+        Override the pricing function in cents for non-stocked products
+        to always return the fixed price.
+        """
+        if self.promotion:
+            return self.promotion.compile_cents(self)
+        price_cents = to_cents(self.price)
+        return lambda quantity: price_cents
+
+    def get_prices(self, quantities) -> list:
         """
-        Override the buy method for non-stocked products to always
+        Override the batch price for non-stocked products to always
         return the fixed price.
+
+        Args:
+            quantities (List[int]): The quantities to price.
+
+        Returns:
+            List[float]: The price for each quantity.
+        """
+        if self.promotion:
+            return self.promotion.apply_promotion_many(self, quantities)
+        return [self.price] * len(quantities)
+
+    def _buy(self, quantity) -> float:
+        """
+        Override the purchase for non-stocked products to always
+        return the fixed price, without touching stock.
         Applies any promotion if set.
 
         Args:
@@ -160,20 +559,25 @@ class NonStockedProduct(Product):
         Returns:
             float: The fixed price of the non-stocked product.
         """
-        if quantity <= 0:
-            raise ValueError("Purchase quantity must be positive")
+        self.check_purchase(quantity)
+        return self.get_price(quantity)
 
-        # Apply promotion if set
-        if self.promotion:
-            total_price = self.promotion.apply_promotion(self, quantity)
-        else:
-            return self.price
+    def _remove_stock(self, quantity):
+        """
+        Non-stocked products have no stock to take.
+        """
 
-        return total_price
+    def set_quantity(self, quantity):
+        """
+        Non-stocked products always have a quantity of 1, so this only
+        checks the value.
+        """
+        if quantity < 0:
+            raise ValueError("Quantity can't be negative")
 
-    def show(self) -> str:
+    def _describe(self) -> str:
         """
-        Override the show method to include the price.
+        Override the show string to include the price.
         """
         promotion_info = f" (Promotion: {self.promotion.name})" \
             if self.promotion else ""
@@ -188,7 +592,9 @@ class LimitedProduct(Product):
     Limited products have a maximum quantity that can be purchased.
     """
 
-    def __init__(self, name, price, quantity, maximum):
+    __slots__ = ("maximum",)
+
+    def __init__(self, name, price, quantity, maximum, product_id=None):
         """
         Initializes a new instance of LimitedProduct.
 
@@ -198,46 +604,39 @@ class LimitedProduct(Product):
             quantity (int): The initial quantity of the limited product.
             maximum (int): The maximum quantity of the limited product
              that can be purchased.
+            product_id (int, optional): Stable identifier of the product.
         """
-        super().__init__(name, price, quantity)
+        super().__init__(name, price, quantity, product_id=product_id)
         self.maximum = maximum
 
-    def buy(self, quantity) -> float:
+    def check_purchase(self, quantity, already_taken=0):
         """
-        Override the buy method for limited products to check against
-         the maximum quantity.
-        Applies any promotion if set.
+        Override the purchase check for limited products to check
+         against the maximum quantity per purchase.
 
         Args:
             quantity (int): The quantity of the limited product to buy.
+            already_taken (int): Units of the product already claimed
+                by earlier lines of the same order or batch.
 
-        Returns:
-            float: The total price of the purchase.
+        Raises:
+            ValueError: If the quantity is not positive, exceeds the
+            maximum or exceeds the available stock.
         """
         if quantity <= 0:
-            raise ValueError("Purchase quantity must be positive")
+            raise PurchaseError("Purchase quantity must be positive",
+                                INVALID_QUANTITY)
 
         if quantity > self.maximum:
-            raise ValueError(f"Maximum purchase quantity exceeded. "
-                             f"Maximum is {self.maximum}")
-
-        # Apply promotion if set
-        if self.promotion:
-            total_price = self.promotion.apply_promotion(self, quantity)
-        else:
-            total_price = quantity * self.price
-
-        self.quantity -= quantity
+            raise PurchaseError(f"Maximum purchase quantity exceeded. "
+                                f"Maximum is {self.maximum}", OVER_MAXIMUM)
 
-        # Deactivate the product if quantity becomes zero
-        if self.quantity == 0:
-            self.is_active = False
+        if quantity + already_taken > self.quantity:
+            raise PurchaseError("Not enough stock available", OUT_OF_STOCK)
 
-        return total_price
-
-    def show(self) -> str:
+    def _describe(self) -> str:
         """
-        Override the show method to include the maximum quantity and price.
+        Override the show string to include the maximum quantity and price.
         """
         promotion_info = f" (Promotion: {self.promotion.name})" if self.promotion else ""
         active_status = "Active" if self.is_active else "Inactive"
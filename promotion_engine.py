@@ -0,0 +1,352 @@
+from abc import ABC, abstractmethod
+from typing import List, NamedTuple, Tuple
+from products import Product
+
+
+class ProductRule:
+    """
+    A rule applying a Promotion to the lines of some products.
+
+    Rules that aren't exclusive stack: at most one rule of each group is
+    applied to a line, together with the rules of the other groups, in
+    order of decreasing priority. An exclusive rule is only ever applied
+    on its own. Rules without a group form a group of their own.
+
+    Attributes:
+        promotion (Promotion): The promotion to apply.
+        product_ids (Set[int]): IDs of the products the rule applies to.
+        categories (Set[str]): Categories the rule applies to.
+        priority (int): Higher priorities are applied first and win ties.
+        exclusive (bool): Whether the rule can't be combined with others.
+        group (str): Rules of the same group can't be combined.
+    """
+
+    def __init__(self, promotion, products=(), categories=(), priority=0,
+                 exclusive=False, group=None):
+        """
+        Initializes a new instance of the ProductRule class.
+
+        Args:
+            promotion (Promotion): The promotion to apply.
+            products (Iterable[Product]): Products the rule applies to.
+            categories (Iterable[str]): Categories the rule applies to.
+            priority (int): Application order and tie-breaker.
+            exclusive (bool): Whether the rule must be applied alone.
+            group (str, optional): Name of a set of mutually exclusive
+                rules.
+        """
+        self.promotion = promotion
+        self.product_ids = {product.product_id for product in products}
+        self.categories = set(categories)
+        self.priority = priority
+        self.exclusive = exclusive
+        self.group = group
+
+    @property
+    def name(self) -> str:
+        return self.promotion.name
+
+
+class CartRule(ABC):
+    """
+    Abstract base class for rules discounting the total of a whole order.
+
+    Attributes:
+        name (str): The name of the rule.
+        minimum_total (float): Order total needed for the rule to apply.
+        priority (int): Higher priorities are applied first and win ties.
+        exclusive (bool): Whether the rule can't be combined with others.
+    """
+
+    def __init__(self, name, minimum_total=0, priority=0, exclusive=False):
+        self.name = name
+        self.minimum_total = minimum_total
+        self.priority = priority
+        self.exclusive = exclusive
+
+    @abstractmethod
+    def apply(self, total) -> float:
+        """
+        Returns the order total after the rule's discount.
+
+        Args:
+            total (float): The order total before the discount.
+        """
+        pass
+
+
+class CartPercentDiscount(CartRule):
+    """
+    A cart rule taking a percentage off the order total.
+    """
+
+    def __init__(self, name, percent, minimum_total=0, priority=0,
+                 exclusive=False):
+        super().__init__(name, minimum_total, priority, exclusive)
+        self.percent = percent
+
+    def apply(self, total) -> float:
+        return total - total * (self.percent / 100)
+
+
+class CartAmountDiscount(CartRule):
+    """
+    A cart rule taking a fixed amount off the order total.
+    """
+
+    def __init__(self, name, amount, minimum_total=0, priority=0,
+                 exclusive=False):
+        super().__init__(name, minimum_total, priority, exclusive)
+        self.amount = amount
+
+    def apply(self, total) -> float:
+        return max(total - self.amount, 0.0)
+
+
+class PricedLine(NamedTuple):
+    """
+    One line of a priced cart.
+
+    Attributes:
+        product (Product): The product ordered.
+        quantity (int): The quantity ordered.
+        price (float): The line total after product rules.
+        rules (Tuple[str, ...]): Names of the rules applied, in order.
+    """
+    product: Product
+    quantity: int
+    price: float
+    rules: Tuple[str, ...]
+
+
+class CartPrice(NamedTuple):
+    """
+    The price of a whole shopping list.
+
+    Attributes:
+        lines (List[PricedLine]): The priced lines.
+        subtotal (float): The sum of the line prices.
+        total (float): The price after cart rules.
+        cart_rules (Tuple[str, ...]): Names of the cart rules applied.
+    """
+    lines: List[PricedLine]
+    subtotal: float
+    total: float
+    cart_rules: Tuple[str, ...]
+
+
+class _PricedAt:
+    """
+    Stands in for a product at an already discounted unit price, so a
+    promotion can be applied on top of another.
+    """
+
+    __slots__ = ("price",)
+
+    def __init__(self, price):
+        self.price = price
+
+
+class PromotionEngine:
+    """
+    Prices shopping lists with stackable promotion rules.
+
+    Product rules are indexed by product ID and by category, so pricing a
+    line only looks at the rules that can apply to it. A product's own
+    promotion, if set, takes part as a stackable rule. Each line gets the
+    cheapest valid combination of its rules, then the cheapest valid
+    combination of cart rules is applied to the order total.
+
+    Methods:
+        set_category(product, category):
+            Assigns a product to a category.
+
+        add_rule(rule) / remove_rule(rule):
+            Adds or removes a ProductRule or CartRule.
+
+        price_cart(shopping_list) -> CartPrice:
+            Prices a shopping list without buying anything.
+    """
+
+    def __init__(self):
+        """
+        Initializes a new instance of PromotionEngine without rules.
+        """
+        self._categories = {}  # product_id -> category
+        self._by_product = {}  # product_id -> [ProductRule]
+        self._by_category = {}  # category -> [ProductRule]
+        self._cart_rules = []
+
+    def set_category(self, product, category):
+        """
+        Assigns a product to a category, for rules targeting categories.
+
+        Args:
+            product (Product): The product.
+            category (str): Its category, or None to clear it.
+        """
+        if category is None:
+            self._categories.pop(product.product_id, None)
+        else:
+            self._categories[product.product_id] = category
+
+    def add_rule(self, rule):
+        """
+        Adds a rule to the engine.
+
+        Args:
+            rule (ProductRule or CartRule): The rule to add.
+
+        Raises:
+            ValueError: If the rule is of an unknown type, or a product
+            rule targets nothing.
+        """
+        if isinstance(rule, CartRule):
+            self._cart_rules.append(rule)
+        elif isinstance(rule, ProductRule):
+            if not rule.product_ids and not rule.categories:
+                raise ValueError("Rule applies to no product or category")
+            for product_id in rule.product_ids:
+                self._by_product.setdefault(product_id, []).append(rule)
+            for category in rule.categories:
+                self._by_category.setdefault(category, []).append(rule)
+        else:
+            raise ValueError("Not a ProductRule or CartRule")
+
+    def remove_rule(self, rule):
+        """
+        Removes a rule from the engine.
+
+        Args:
+            rule (ProductRule or CartRule): The rule to remove.
+
+        Raises:
+            ValueError: If the rule is not in the engine.
+        """
+        if isinstance(rule, CartRule):
+            self._cart_rules.remove(rule)
+            return
+        if not isinstance(rule, ProductRule):
+            raise ValueError("Not a ProductRule or CartRule")
+        for index, targets in ((self._by_product, rule.product_ids),
+                               (self._by_category, rule.categories)):
+            for value in targets:
+                rules = index[value]
+                rules.remove(rule)
+                if not rules:
+                    del index[value]
+
+    def price_cart(self, shopping_list) -> CartPrice:
+        """
+        Prices a shopping list without buying anything.
+
+        Args:
+            shopping_list (List[Tuple[Product, int]]): A list of tuples,
+                where each tuple contains a Product and an integer quantity.
+
+        Returns:
+            CartPrice: The priced lines and the order total.
+        """
+        lines = [self.price_line(product, quantity)
+                 for product, quantity in shopping_list]
+        subtotal = sum(line.price for line in lines)
+        total, cart_rules = self._apply_cart_rules(subtotal)
+        return CartPrice(lines, subtotal, total, cart_rules)
+
+    def price_line(self, product, quantity) -> PricedLine:
+        """
+        Prices one line with the cheapest valid combination of the rules
+        that apply to its product.
+
+        Args:
+            product (Product): The product ordered.
+            quantity (int): The quantity ordered.
+
+        Returns:
+            PricedLine: The priced line.
+        """
+        rules = self._get_rules(product)
+        if not rules:
+            return PricedLine(product, quantity, product.get_price(quantity),
+                              (product.promotion.name,)
+                              if product.promotion else ())
+
+        # The cheapest rule of each group, then the stack of them all
+        best_in_group = {}
+        exclusive = []
+        for rule in rules:
+            if rule.exclusive:
+                exclusive.append(rule)
+                continue
+            key = rule.group if rule.group is not None else id(rule)
+            price = self._apply([rule], product, quantity)
+            current = best_in_group.get(key)
+            if current is None or (price, -rule.priority) < current[0]:
+                best_in_group[key] = ((price, -rule.priority), rule)
+        options = []
+        if best_in_group:
+            stack = sorted((rule for _, rule in best_in_group.values()),
+                           key=lambda rule: -rule.priority)
+            options.append((self._apply(stack, product, quantity),
+                            -sum(rule.priority for rule in stack), stack))
+        for rule in exclusive:
+            options.append((self._apply([rule], product, quantity),
+                            -rule.priority, [rule]))
+        options.append((product.get_base_price(quantity), 0, []))
+
+        price, _, applied = min(options, key=lambda option: option[:2])
+        return PricedLine(product, quantity, price,
+                          tuple(rule.name for rule in applied))
+
+    def _get_rules(self, product) -> List[ProductRule]:
+        """
+        Returns the rules applying to a product, its own promotion
+        included.
+        """
+        rules = list(self._by_product.get(product.product_id, ()))
+        category = self._categories.get(product.product_id)
+        if category is not None:
+            for rule in self._by_category.get(category, ()):
+                if rule not in rules:
+                    rules.append(rule)
+        if rules and product.promotion:
+            rules.append(ProductRule(product.promotion, [product]))
+        return rules
+
+    @staticmethod
+    def _apply(rules, product, quantity) -> float:
+        """
+        Applies promotions one after the other, each to the unit price
+        left by the previous one.
+        """
+        target = product
+        price = 0.0
+        for rule in rules:
+            price = rule.promotion.apply_promotion(target, quantity)
+            if quantity > 0:
+                target = _PricedAt(price / quantity)
+        return price
+
+    def _apply_cart_rules(self, subtotal) -> Tuple[float, Tuple[str, ...]]:
+        """
+        Returns the order total after the cheapest valid combination of
+        cart rules, and the names of the rules applied.
+        """
+        eligible = [rule for rule in self._cart_rules
+                    if subtotal >= rule.minimum_total]
+        if not eligible:
+            return subtotal, ()
+        options = [(subtotal, 0, [])]
+        stackable = sorted((rule for rule in eligible if not rule.exclusive),
+                           key=lambda rule: -rule.priority)
+        if stackable:
+            total = subtotal
+            for rule in stackable:
+                total = rule.apply(total)
+            options.append((total, -sum(rule.priority for rule in stackable),
+                            stackable))
+        for rule in eligible:
+            if rule.exclusive:
+                options.append((rule.apply(subtotal), -rule.priority, [rule]))
+        total, _, applied = min(options, key=lambda option: option[:2])
+        return total, tuple(rule.name for rule in applied)
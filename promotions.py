@@ -1,11 +1,18 @@
 from abc import ABC, abstractmethod
+from money import DEFAULT_ROUNDING, divider, to_cents
 
 
 class Promotion(ABC):
     """
     Abstract base class for promotions.
+
+    Attributes:
+        rounding (str): Rounding policy for prices in integer cents,
+            applied once per line. Defaults to money.DEFAULT_ROUNDING.
     """
 
+    rounding = DEFAULT_ROUNDING
+
     def __init__(self, name):
         self.name = name
 
@@ -24,6 +31,56 @@ class Promotion(ABC):
         """
         pass
 
+    def compile(self, product):
+        """
+        Returns a function pricing quantities of a product under the
+        promotion. Products cache it until their price or promotion
+        changes, so the promotion's settings shouldn't change once it's
+        attached. Subclasses override this with a closed form that has
+        the product's price built in.
+
+        Args:
+            product (Product): The product on which the promotion is applied.
+
+        Returns:
+            Callable[[int], float]: The price of a quantity of the product.
+        """
+        apply_promotion = self.apply_promotion
+        return lambda quantity: apply_promotion(product, quantity)
+
+    def compile_cents(self, product):
+        """
+        Returns a function pricing quantities of a product under the
+        promotion in integer cents, rounded once per line with the
+        promotion's rounding policy. Subclasses override this with
+        exact integer arithmetic.
+
+        Args:
+            product (Product): The product on which the promotion is applied.
+
+        Returns:
+            Callable[[int], int]: The price of a quantity, in cents.
+        """
+        apply_promotion = self.apply_promotion
+        rounding = self.rounding
+        return lambda quantity: to_cents(apply_promotion(product, quantity),
+                                         rounding)
+
+    def apply_promotion_many(self, product, quantities):
+        """
+        Apply the promotion to several quantities of the same product.
+        Subclasses override this with a closed form evaluated in one pass.
+
+        Args:
+            product (Product): The product on which the promotion is applied.
+            quantities (List[int]): The quantities to price.
+
+        Returns:
+            List[float]: The discounted price for each quantity.
+        """
+        return [self.apply_promotion(product, quantity)
+                for quantity in quantities]
+
 
 class PercentDiscount(Promotion):
     """
@@ -58,6 +115,38 @@ class PercentDiscount(Promotion):
         discounted_price = original_price - discount_amount
         return discounted_price
 
+    def compile(self, product):
+        """
+        Returns the percentage discount as a function of quantity.
+        """
+        price = product.price
+        factor = self.percent / 100
+
+        def price_of(quantity):
+            original_price = price * quantity
+            return original_price - original_price * factor
+        return price_of
+
+    def compile_cents(self, product):
+        """
+        Returns the percentage discount in cents as a function of
+        quantity. The percentage is kept in basis points.
+        """
+        price_cents = to_cents(product.price)
+        kept_basis_points = 10000 - to_cents(self.percent)
+        scale = divider(10000, self.rounding)
+        return lambda quantity: scale(
+            quantity * price_cents * kept_basis_points)
+
+    def apply_promotion_many(self, product, quantities):
+        """
+        Apply the percentage discount to several quantities at once.
+        """
+        price = product.price
+        factor = self.percent / 100
+        return [price * quantity - price * quantity * factor
+                for quantity in quantities]
+
 
 class SecondHalfPrice(Promotion):
     """
@@ -94,6 +183,49 @@ class SecondHalfPrice(Promotion):
                             half_price_items * (product.price / 2))
         return discounted_price
 
+    def compile(self, product):
+        """
+        Returns the second item at half price promotion
+        as a function of quantity.
+        """
+        price = product.price
+        half_price = price / 2
+
+        def price_of(quantity):
+            if quantity < 2:
+                return price * quantity
+            full_price_items = quantity // 2
+            return (full_price_items * price +
+                    (quantity - full_price_items) * half_price)
+        return price_of
+
+    def compile_cents(self, product):
+        """
+        Returns the second item at half price promotion in cents
+        as a function of quantity.
+        """
+        price_cents = to_cents(product.price)
+        halve = divider(2, self.rounding)
+
+        def price_of(quantity):
+            if quantity < 2:
+                return price_cents * quantity
+            full_price_items = quantity // 2
+            return (full_price_items * price_cents +
+                    halve((quantity - full_price_items) * price_cents))
+        return price_of
+
+    def apply_promotion_many(self, product, quantities):
+        """
+        Apply the second item at half price promotion
+        to several quantities at once.
+        """
+        price = product.price
+        half_price = price / 2
+        return [price * quantity if quantity < 2 else
+                quantity // 2 * price + (quantity - quantity // 2) * half_price
+                for quantity in quantities]
+
 
 class ThirdOneFree(Promotion):
     """
@@ -125,3 +257,25 @@ class ThirdOneFree(Promotion):
         free_items = quantity - full_price_items
         discounted_price = full_price_items * product.price
         return discounted_price
+
+    def compile(self, product):
+        """
+        Returns the buy 2, get 1 free promotion as a function of quantity.
+        """
+        price = product.price
+        return lambda quantity: quantity // 3 * 2 * price
+
+    def compile_cents(self, product):
+        """
+        Returns the buy 2, get 1 free promotion in cents
+        as a function of quantity.
+        """
+        price_cents = to_cents(product.price)
+        return lambda quantity: quantity // 3 * 2 * price_cents
+
+    def apply_promotion_many(self, product, quantities):
+        """
+        Apply the buy 2, get 1 free promotion to several quantities at once.
+        """
+        price = product.price
+        return [quantity // 3 * 2 * price for quantity in quantities]
@@ -0,0 +1,308 @@
+import argparse
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
+from typing import Dict, List
+import main
+import products
+import promotions
+import store
+
+# Menu choice of each scripted action
+ACTIONS = {"list": "1", "total": "2", "order": "3"}
+
+
+class ScriptedConsole:
+    """
+    A console answering the prompts of main.start() from a session
+    script instead of a user, so the real CLI flow runs headlessly. Each
+    menu action is timed from choosing it until the menu is shown again.
+
+    A script is a list of actions, after which the session quits:
+        ["list"]: List the products, paging through all of them.
+        ["total"]: Show the total quantity.
+        ["order", [[number, quantity], ...]]: Order products by their
+            number in the order listing, paging until it is listed.
+            Numbers past the end of the listing are skipped.
+
+    Attributes:
+        timings (Dict[str, List[float]]): Seconds taken by each run of
+            each action.
+        output_lines (int): Number of lines printed by the CLI.
+    """
+
+    def __init__(self, actions):
+        """
+        Initializes a new instance of the ScriptedConsole class.
+
+        Args:
+            actions (List[list]): The session script.
+
+        Raises:
+            ValueError: If an action is unknown.
+        """
+        actions = list(actions)
+        for action in actions:
+            if action[0] not in ACTIONS:
+                raise ValueError(f"Unknown action {action[0]}")
+        self._actions = iter(actions)
+        self._action = None  # Name of the running action
+        self._started = None
+        self._lines = iter(())  # Order lines left to enter
+        self._line = None  # Order line being entered
+        self._listed = 0  # Products listed so far by make_order()
+        self.timings = {}
+        self.output_lines = 0
+
+    def input(self, prompt="") -> str:
+        """
+        Returns the scripted answer to a prompt.
+
+        Raises:
+            EOFError: If the prompt is not one of the CLI's, like input()
+            does when a piped script runs out.
+        """
+        if prompt == main.MENU_PROMPT:
+            return self._next_action()
+        if prompt.startswith("Press Enter for more"):
+            return ""
+        if prompt.startswith("Enter product number"):
+            return self._next_selection(prompt)
+        if prompt.startswith("Enter quantity") and self._line is not None:
+            quantity = self._line[1]
+            self._line = None
+            return str(quantity)
+        raise EOFError(f"No scripted answer to {prompt!r}")
+
+    def print(self, *values):
+        """
+        Counts printed lines, tracking how many products are listed.
+        """
+        self.output_lines += 1
+        if self._action == "order" and values:
+            number = str(values[0]).split(".", 1)[0]
+            if number.isdigit():
+                self._listed = max(self._listed, int(number))
+
+    def _next_action(self) -> str:
+        """
+        Ends the timing of the running action and chooses the next one.
+        """
+        if self._action is not None:
+            self.timings.setdefault(self._action, []).append(
+                time.perf_counter() - self._started)
+        action = next(self._actions, None)
+        if action is None:
+            self._action = None
+            return "4"
+        self._action = action[0]
+        if self._action == "order":
+            self._lines = iter(action[1])
+            self._listed = 0
+        self._started = time.perf_counter()
+        return ACTIONS[self._action]
+
+    def _next_selection(self, prompt) -> str:
+        """
+        Answers the product number prompt of make_order().
+        """
+        if self._line is None:
+            self._line = next(self._lines, None)
+        while self._line is not None:
+            if self._line[0] <= self._listed:
+                return str(self._line[0])
+            if "n for more" in prompt:
+                return "n"
+            self._line = next(self._lines, None)
+        return "0"
+
+
+def run_session(store_obj, actions) -> ScriptedConsole:
+    """
+    Runs main.start() against a store from a session script.
+
+    Args:
+        store_obj (Store): The store to use.
+        actions (List[list]): The session script, see ScriptedConsole.
+
+    Returns:
+        ScriptedConsole: The console, holding the session's timings.
+    """
+    console = ScriptedConsole(actions)
+    main.start(store_obj, console)
+    return console
+
+
+def run_sessions(store_obj, sessions, workers=8) -> dict:
+    """
+    Runs many sessions in parallel threads against one store.
+
+    Args:
+        store_obj (Store): The store to use, thread-safe if workers > 1.
+        sessions (List[List[list]]): The session scripts.
+        workers (int): Number of sessions run at once. Defaults to 8.
+
+    Returns:
+        dict: The number of sessions, the latency of each menu action in
+        milliseconds (count, mean, p50, p99, max) and the final stock
+        by product_id.
+    """
+    started = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        consoles = list(pool.map(
+            lambda actions: run_session(store_obj, actions), sessions))
+    seconds = time.perf_counter() - started
+    timings = {}
+    for console in consoles:
+        for action, durations in console.timings.items():
+            timings.setdefault(action, []).extend(durations)
+    return {
+        "sessions": len(sessions),
+        "workers": workers,
+        "seconds": seconds,
+        "actions": {action: _summarize(durations)
+                    for action, durations in sorted(timings.items())},
+        "total_quantity": store_obj.get_total_quantity(),
+        "stock": {product.product_id: product.get_quantity()
+                  for product in store_obj.products},
+    }
+
+
+def _summarize(durations) -> Dict[str, float]:
+    """
+    Returns the count and latency percentiles of action durations.
+    """
+    durations = sorted(durations)
+    count = len(durations)
+    return {
+        "count": count,
+        "mean_ms": sum(durations) / count * 1e3,
+        "p50_ms": durations[count // 2] * 1e3,
+        "p99_ms": durations[min(count - 1, count * 99 // 100)] * 1e3,
+        "max_ms": durations[-1] * 1e3,
+    }
+
+
+def generate_sessions(session_count, product_count, actions_per_session=5,
+                      max_lines=3, max_quantity=3, exponent=1.1,
+                      seed=42) -> List[List[list]]:
+    """
+    Returns session scripts mixing listings, totals and orders. Ordered
+    product numbers follow a Zipf distribution, so most orders pick from
+    the first page of the listing and a few page far into it.
+
+    Args:
+        session_count (int): Number of sessions.
+        product_count (int): Number of products that can be listed.
+        actions_per_session (int): Actions per session.
+        max_lines (int): Maximum number of lines per order.
+        max_quantity (int): Maximum quantity per line.
+        exponent (float): Skew of the product numbers, 0 for uniform.
+        seed (int): Seed of the random choices.
+    """
+    rng = random.Random(seed)
+    numbers = range(1, product_count + 1)
+    cumulative = list(accumulate(1 / number ** exponent
+                                 for number in numbers))
+    sessions = []
+    for _ in range(session_count):
+        actions = []
+        for name in rng.choices(["list", "total", "order"], [2, 1, 7],
+                                k=actions_per_session):
+            if name == "order":
+                picks = rng.choices(numbers, cum_weights=cumulative,
+                                    k=rng.randint(1, max_lines))
+                actions.append([name, [[number, rng.randint(1, max_quantity)]
+                                       for number in picks]])
+            else:
+                actions.append([name])
+        sessions.append(actions)
+    return sessions
+
+
+def load_sessions(path) -> List[List[list]]:
+    """
+    Reads session scripts saved by save_sessions(), one per line.
+    """
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def save_sessions(path, sessions):
+    """
+    Writes session scripts as JSON lines, one session per line.
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        for actions in sessions:
+            file.write(json.dumps(actions) + "\n")
+
+
+def build_store(product_count, quantity=1000) -> store.Store:
+    """
+    Returns a thread-safe store of product_count products, cycling
+    through the product types and promotions of main.py's catalog.
+    """
+    catalog_promotions = [promotions.SecondHalfPrice("Second Half price!"),
+                          promotions.ThirdOneFree("Third One Free!"),
+                          None, promotions.PercentDiscount("30% off!",
+                                                           percent=30),
+                          None]
+    catalog = []
+    for index in range(product_count):
+        kind = index % 5
+        if kind == 3:
+            product = products.NonStockedProduct(f"License {index}",
+                                                 price=125)
+        elif kind == 4:
+            product = products.LimitedProduct(f"Shipping {index}", price=10,
+                                              quantity=quantity, maximum=1)
+        else:
+            product = products.Product(f"Product {index}",
+                                       price=10 + index % 1490,
+                                       quantity=quantity)
+        promotion = catalog_promotions[index % len(catalog_promotions)]
+        if promotion:
+            product.set_promotion(promotion)
+        catalog.append(product)
+    return store.Store(catalog, thread_safe=True)
+
+
+def run():
+    parser = argparse.ArgumentParser(
+        description="Replays scripted sessions through the main.py menu "
+                    "against one store and reports latency per action.")
+    parser.add_argument("--products", type=int, default=1000,
+                        help="catalog size")
+    parser.add_argument("--sessions", type=int, default=1000,
+                        help="sessions to generate")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="sessions run at once")
+    parser.add_argument("--script", help="replay sessions from this file "
+                                         "instead of generating them")
+    parser.add_argument("--save", help="save the sessions to this file")
+    parser.add_argument("--output", help="save the report to this file")
+    args = parser.parse_args()
+
+    sessions = load_sessions(args.script) if args.script \
+        else generate_sessions(args.sessions, args.products)
+    if args.save:
+        save_sessions(args.save, sessions)
+    report = run_sessions(build_store(args.products), sessions, args.workers)
+    print(f"{report['sessions']} sessions on {report['workers']} workers "
+          f"in {report['seconds']:.2f}s")
+    for action, summary in report["actions"].items():
+        print(f"{action:<6} x{summary['count']:<7} "
+              f"mean {summary['mean_ms']:.3f} ms, "
+              f"p50 {summary['p50_ms']:.3f} ms, "
+              f"p99 {summary['p99_ms']:.3f} ms, "
+              f"max {summary['max_ms']:.3f} ms")
+    print(f"Final total quantity: {report['total_quantity']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    run()
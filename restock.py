@@ -0,0 +1,231 @@
+import math
+import threading
+import time
+from array import array
+from typing import List, NamedTuple, Tuple
+from products import NonStockedProduct, Product
+
+
+class Forecast(NamedTuple):
+    """
+    The projected stock of a product at its current sales rate.
+
+    Attributes:
+        product (Product): The product.
+        stock (int): Its quantity in stock.
+        rate (float): Units sold per second, exponentially decayed.
+        seconds_to_stockout (float): Seconds until the stock runs out,
+            infinity if the product is not selling.
+    """
+    product: Product
+    stock: int
+    rate: float
+    seconds_to_stockout: float
+
+
+class RestockSuggestion(NamedTuple):
+    """
+    A product to reorder, see RestockPlanner.plan().
+
+    Attributes:
+        forecast (Forecast): The product's projected stock.
+        reorder_quantity (int): Units to order to cover the horizon.
+    """
+    forecast: Forecast
+    reorder_quantity: int
+
+
+class RestockPlanner:
+    """
+    Tracks the sales rate of every product from committed orders and
+    suggests restocks before products sell out.
+
+    Rates are exponentially decayed counters, one float per product sold.
+    They are forward-decayed: a sale at time t adds quantity * e^((t -
+    landmark) / tau) to the product's score, so recording an order costs
+    O(lines) with no decay of other products, and the rate of every
+    product at time t is its score times the same factor e^(-(t -
+    landmark) / tau) / tau. The landmark moves forward, rescaling every
+    score once, before the weights could overflow.
+
+    Methods:
+        attach(store) / detach(store):
+            Starts or stops recording a store's committed orders.
+
+        record_order(shopping_list):
+            Records the lines of a committed order.
+
+        get_rate(product) -> float:
+            Returns a product's units sold per second.
+
+        forecast(products) -> List[Forecast]:
+            Projects when each selling product runs out.
+
+        plan(products, lead_time, coverage) -> List[RestockSuggestion]:
+            Suggests reorders for the products running out soon.
+    """
+
+    # Largest weight exponent before the landmark is moved
+    MAX_EXPONENT = 100.0
+
+    def __init__(self, half_life=86400.0, clock=time.monotonic):
+        """
+        Initializes a new instance of the RestockPlanner class.
+
+        Args:
+            half_life (float): Seconds after which a sale counts half as
+                much towards the rate. Defaults to one day.
+            clock (callable): Returns the current time in seconds.
+                Defaults to time.monotonic.
+
+        Raises:
+            ValueError: If the half-life is not positive.
+        """
+        if half_life <= 0:
+            raise ValueError("Half-life must be positive")
+        self._tau = half_life / math.log(2)
+        self._clock = clock
+        self._landmark = clock()
+        self._slots = {}  # product_id -> index in _scores
+        self._scores = array("d")
+        self._lock = threading.Lock()
+
+    def attach(self, store):
+        """
+        Records every order committed by a store from now on.
+        """
+        store.add_order_listener(self.record_order)
+
+    def detach(self, store):
+        """
+        Stops recording the orders of a store.
+        """
+        store.remove_order_listener(self.record_order)
+
+    def record_order(self, shopping_list):
+        """
+        Records the lines of a committed order.
+
+        Args:
+            shopping_list (List[Tuple[Product, int]]): The lines bought.
+        """
+        now = self._clock()
+        slots = self._slots
+        with self._lock:
+            exponent = (now - self._landmark) / self._tau
+            if exponent > self.MAX_EXPONENT:
+                self._move_landmark(now)
+                exponent = 0.0
+            weight = math.exp(exponent)
+            scores = self._scores
+            for product, quantity in shopping_list:
+                slot = slots.get(product.product_id)
+                if slot is None:
+                    slot = slots[product.product_id] = len(scores)
+                    scores.append(0.0)
+                scores[slot] += quantity * weight
+
+    def _move_landmark(self, now):
+        """
+        Rescales every score to a landmark at now, with the lock held.
+        """
+        factor = math.exp((self._landmark - now) / self._tau)
+        self._scores = array("d", [score * factor for score in self._scores])
+        self._landmark = now
+
+    def _get_scores(self) -> Tuple[array, float]:
+        """
+        Returns the scores and the factor turning them into rates at the
+        current time. Both are read under the lock, so they refer to the
+        same landmark: moving it replaces the scores instead of rescaling
+        them in place.
+        """
+        now = self._clock()
+        with self._lock:
+            scores = self._scores
+            landmark = self._landmark
+        return scores, math.exp((landmark - now) / self._tau) / self._tau
+
+    def get_rate(self, product) -> float:
+        """
+        Returns the decayed number of units of a product sold per second.
+
+        Args:
+            product (Product): The product to look up.
+
+        Returns:
+            float: The sales rate, 0.0 if it never sold.
+        """
+        slot = self._slots.get(product.product_id)
+        if slot is None:
+            return 0.0
+        scores, scale = self._get_scores()
+        return scores[slot] * scale
+
+    def forecast(self, products) -> List[Forecast]:
+        """
+        Projects when each product that has sold runs out at its current
+        rate, in one pass over the products. Non-stocked products never
+        run out and are left out.
+
+        Args:
+            products (Iterable[Product]): The products, e.g. store.products.
+
+        Returns:
+            List[Forecast]: The projections, soonest stock-out first.
+        """
+        scores, scale = self._get_scores()
+        slots = self._slots
+        forecasts = []
+        for product in products:
+            slot = slots.get(product.product_id)
+            if slot is None or isinstance(product, NonStockedProduct):
+                continue
+            rate = scores[slot] * scale
+            stock = product.get_quantity()
+            forecasts.append(Forecast(
+                product, stock, rate, stock / rate if rate else math.inf))
+        forecasts.sort(key=lambda forecast: forecast.seconds_to_stockout)
+        return forecasts
+
+    def plan(self, products, lead_time, coverage) -> List[RestockSuggestion]:
+        """
+        Suggests reorders for the products projected to run out before a
+        reorder placed now, arriving after lead_time, could cover them
+        for coverage seconds more.
+
+        Args:
+            products (Iterable[Product]): The products, e.g. store.products.
+            lead_time (float): Seconds a reorder takes to arrive.
+            coverage (float): Seconds of sales a reorder should cover
+                after it arrives.
+
+        Returns:
+            List[RestockSuggestion]: The suggestions, soonest stock-out
+            first, each reordering enough to last lead_time + coverage.
+
+        Raises:
+            ValueError: If lead_time or coverage is negative.
+        """
+        if lead_time < 0 or coverage < 0:
+            raise ValueError("Lead time and coverage can't be negative")
+        horizon = lead_time + coverage
+        scores, scale = self._get_scores()
+        slots = self._slots
+        suggestions = []
+        for product in products:
+            slot = slots.get(product.product_id)
+            if slot is None:
+                continue
+            demand = scores[slot] * scale * horizon
+            stock = product.get_quantity()
+            # Cheap test first, most products are not running out
+            if stock >= demand or isinstance(product, NonStockedProduct):
+                continue
+            rate = demand / horizon
+            suggestions.append(RestockSuggestion(
+                Forecast(product, stock, rate, stock / rate),
+                math.ceil(demand - stock)))
+        suggestions.sort(
+            key=lambda suggestion: suggestion.forecast.seconds_to_stockout)
+        return suggestions
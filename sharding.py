@@ -0,0 +1,301 @@
+import math
+import multiprocessing
+import os
+from itertools import count
+from typing import List, Tuple, Union
+from products import Product
+from store import Store
+
+
+class ShardedStore:
+    """
+    A store whose catalog is partitioned across worker processes by
+    product ID hash, so checkouts on different shards run on different
+    cores instead of sharing one interpreter lock.
+
+    Each worker process owns a Store holding its shard's products, which
+    is the authority for their stock: the Product objects given to the
+    constructor are copied into the workers and only used for routing
+    afterwards, so their own quantity no longer changes.
+
+    An order touching one shard is placed there directly. An order
+    spanning several shards is placed with two-phase commit: every shard
+    holds its part with Store.reserve(), and the holds are committed only
+    if all shards accepted theirs, otherwise the accepted ones are
+    released. Orders thus stay all-or-nothing.
+
+    Methods:
+        order(shopping_list) -> float:
+            Processes an order and returns its total price.
+
+        order_batch(orders) -> List[Union[float, ValueError]]:
+            Processes many orders with one round trip per shard.
+
+        get_total_quantity() -> int:
+            Returns the total quantity of all products.
+
+        get_quantity(product) -> int:
+            Returns the current quantity of a product.
+
+        close():
+            Stops the worker processes.
+    """
+
+    def __init__(self, products, shards=None, **store_options):
+        """
+        Initializes a new instance of the ShardedStore class and starts
+        its worker processes.
+
+        Args:
+            products (Iterable[Product]): The products of the store.
+            shards (int, optional): Number of worker processes.
+                Defaults to the number of CPUs.
+            **store_options: Options of each shard's Store, such as money.
+
+        Raises:
+            ValueError: If the number of shards is not positive, or a
+            product is not of type Product or its product_id is repeated.
+        """
+        shard_count = (os.cpu_count() or 1) if shards is None else shards
+        if shard_count <= 0:
+            raise ValueError("Number of shards must be positive")
+        self._products = {}  # product_id -> Product
+        partitions = [[] for _ in range(shard_count)]
+        for product in products:
+            if not isinstance(product, Product):
+                raise ValueError("Not of type Product")
+            if product.product_id in self._products:
+                raise ValueError(f"Product ID {product.product_id} "
+                                 f"repeated")
+            self._products[product.product_id] = product
+            partitions[hash(product.product_id) % shard_count].append(product)
+
+        self._transaction_ids = count(1)
+        self._connections = []
+        self._processes = []
+        for partition in partitions:
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_run_shard, daemon=True,
+                args=(worker_connection, partition, store_options))
+            process.start()
+            worker_connection.close()
+            self._connections.append(connection)
+            self._processes.append(process)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _get_shard(self, product) -> int:
+        """
+        Returns the index of the shard owning a product.
+
+        Raises:
+            ValueError: If the product does not belong to the store.
+        """
+        product_id = getattr(product, "product_id", None)
+        if self._products.get(product_id) is not product:
+            raise ValueError("Product not found in store")
+        return hash(product_id) % len(self._connections)
+
+    def order(self, shopping_list: List[Tuple[Product, int]]) -> float:
+        """
+        Processes an order for a list of products and their quantities,
+        and returns the total price. Nothing is bought if any line
+        cannot be filled.
+
+        Args:
+            shopping_list (List[Tuple[Product, int]]): A list of tuples
+                containing products and their quantities.
+
+        Returns:
+            float: The total price of the order.
+
+        Raises:
+            ValueError: If a product is not in the store, or any line of
+            the order can't be filled.
+        """
+        result = self.order_batch([shopping_list])[0]
+        if isinstance(result, ValueError):
+            raise result
+        return result
+
+    def order_batch(self, orders: List[List[Tuple[Product, int]]]) \
+            -> List[Union[float, ValueError]]:
+        """
+        Processes many orders, each all-or-nothing, sending every shard
+        its share of the batch at once so the shards work in parallel.
+
+        Args:
+            orders (List[List[Tuple[Product, int]]]): The shopping lists.
+
+        Returns:
+            List[Union[float, ValueError]]: For each order, its total
+            price, or the error that rejected it.
+        """
+        shard_count = len(self._connections)
+        results = [None] * len(orders)
+        # Per shard: [(order index, lines)] placed directly, and
+        # [(transaction ID, lines)] to reserve
+        direct = [[] for _ in range(shard_count)]
+        reserve = [[] for _ in range(shard_count)]
+        transactions = {}  # transaction ID -> (order index, shards)
+        for order_index, shopping_list in enumerate(orders):
+            parts = {}
+            try:
+                for product, quantity in shopping_list:
+                    parts.setdefault(self._get_shard(product), []).append(
+                        (product.product_id, quantity))
+            except ValueError as error:
+                results[order_index] = error
+                continue
+            if len(parts) == 1:
+                (shard, lines), = parts.items()
+                direct[shard].append((order_index, lines))
+            elif parts:
+                transaction_id = next(self._transaction_ids)
+                transactions[transaction_id] = (order_index, list(parts))
+                for shard, lines in parts.items():
+                    reserve[shard].append((transaction_id, lines))
+            else:
+                results[order_index] = 0
+
+        shards = [shard for shard in range(shard_count)
+                  if direct[shard] or reserve[shard]]
+        for shard in shards:
+            self._connections[shard].send(
+                ("batch", direct[shard], reserve[shard]))
+        reserved = {}  # transaction ID -> [total or error message]
+        for shard in shards:
+            placed, held = self._connections[shard].recv()
+            for order_index, outcome in placed:
+                results[order_index] = _to_result(outcome)
+            for transaction_id, outcome in held:
+                reserved.setdefault(transaction_id, []).append(outcome)
+
+        commit = [[] for _ in range(shard_count)]
+        release = [[] for _ in range(shard_count)]
+        for transaction_id, (order_index, parts) in transactions.items():
+            outcomes = reserved[transaction_id]
+            errors = [outcome for outcome in outcomes
+                      if isinstance(outcome, str)]
+            decision = release if errors else commit
+            for shard in parts:
+                decision[shard].append(transaction_id)
+            results[order_index] = _to_result(errors[0]) if errors \
+                else sum(outcomes)
+        for shard in range(shard_count):
+            if commit[shard] or release[shard]:
+                # Shards handle messages in order, so a later batch
+                # always sees the outcome without waiting for it here
+                self._connections[shard].send(
+                    ("finish", commit[shard], release[shard]))
+        return results
+
+    def get_total_quantity(self) -> int:
+        """
+        Returns the total quantity of all products in the store.
+
+        Returns:
+            int: The total quantity over all shards.
+        """
+        for connection in self._connections:
+            connection.send(("total_quantity",))
+        return sum(connection.recv() for connection in self._connections)
+
+    def get_quantity(self, product) -> int:
+        """
+        Returns the current quantity of a product.
+
+        Args:
+            product (Product): The product to look up.
+
+        Returns:
+            int: The quantity in stock in the product's shard.
+
+        Raises:
+            ValueError: If the product does not belong to the store.
+        """
+        connection = self._connections[self._get_shard(product)]
+        connection.send(("quantity", product.product_id))
+        return connection.recv()
+
+    def close(self):
+        """
+        Stops the worker processes. The store can't be used afterwards.
+        """
+        for connection in self._connections:
+            try:
+                connection.send(("close",))
+            except OSError:
+                pass
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections = []
+        self._processes = []
+
+
+def _to_result(outcome):
+    """
+    Returns a shard's order outcome, turning error messages into errors.
+    """
+    return ValueError(outcome) if isinstance(outcome, str) else outcome
+
+
+def _run_shard(connection, products, store_options):
+    """
+    Serves the requests of a ShardedStore for one shard's products,
+    until told to close.
+    """
+    store = Store(products, **store_options)
+    held = {}  # transaction ID -> hold token
+
+    def place(lines):
+        try:
+            return store.order([(store.get_product(product_id), quantity)
+                                for product_id, quantity in lines])
+        except ValueError as error:
+            return str(error)
+
+    def hold(transaction_id, lines):
+        try:
+            shopping_list = [(store.get_product(product_id), quantity)
+                             for product_id, quantity in lines]
+            # Priced first, as a quote counts held stock as taken. Nothing
+            # else changes the shard's stock until the hold is committed.
+            total = store.quote(shopping_list).total
+            # Ended by the coordinator's "finish", which always follows
+            held[transaction_id] = store.reserve(shopping_list, math.inf)
+            return total
+        except ValueError as error:
+            return str(error)
+
+    while True:
+        request = connection.recv()
+        command = request[0]
+        if command == "batch":
+            _, direct, reserve = request
+            placed = [(order_index, place(lines))
+                      for order_index, lines in direct]
+            reserved = [(transaction_id, hold(transaction_id, lines))
+                        for transaction_id, lines in reserve]
+            connection.send((placed, reserved))
+        elif command == "finish":
+            _, commit, release = request
+            for transaction_id in commit:
+                store.commit(held.pop(transaction_id))
+            for transaction_id in release:
+                token = held.pop(transaction_id, None)
+                if token is not None:
+                    store.release(token)
+        elif command == "total_quantity":
+            connection.send(store.get_total_quantity())
+        elif command == "quantity":
+            connection.send(store.get_product(request[1]).get_quantity())
+        elif command == "close":
+            break
+    connection.close()
@@ -0,0 +1,330 @@
+import json
+import mmap
+import os
+import struct
+from bisect import bisect_left
+import promotions
+from products import NonStockedProduct, LimitedProduct
+from product_table import (ProductTable, KIND_PRODUCT, KIND_NON_STOCKED,
+                           KIND_LIMITED)
+
+MAGIC = b"BBSNAP\x00\x01"
+
+# magic, record size, product count, sequence, records offset,
+# name heap offset, promotion table offset, promotion table length
+_HEADER = struct.Struct("<8sIxxxxQQQQQQ")
+
+# product_id, price, quantity, maximum, name offset, name length,
+# promotion id, kind, active
+_RECORD = struct.Struct("<qdqqQIiBB6x")
+
+# Column name -> (offset within a record, struct format), see _RECORD
+_FIELDS = {
+    "product_ids": (0, "<q"),
+    "prices": (8, "<d"),
+    "quantities": (16, "<q"),
+    "maximums": (24, "<q"),
+    "promotion_ids": (44, "<i"),
+    "kinds": (48, "<B"),
+    "active": (49, "<B"),
+}
+
+# Promotion classes that can be stored in a snapshot
+_PROMOTION_TYPES = {
+    cls.__name__: cls for cls in (promotions.PercentDiscount,
+                                  promotions.SecondHalfPrice,
+                                  promotions.ThirdOneFree)
+}
+
+
+def write_snapshot(products, path, sequence=0):
+    """
+    Writes products to a binary snapshot file.
+
+    The file holds a header, a table of fixed-width records sorted by
+    product ID, a heap of UTF-8 names and a JSON table of promotions.
+    It is written to a temporary file first and then renamed over path,
+    so readers never see a partial snapshot.
+
+    Args:
+        products (Iterable[Product]): The products to save.
+        path (str): The snapshot file to write.
+        sequence (int): Position of the snapshot in the order journal.
+
+    Raises:
+        ValueError: If a product has a promotion of an unknown type.
+    """
+    products = sorted(products, key=lambda product: product.product_id)
+    promotion_list = []
+    promotion_ids = {}  # id(promotion) -> promotion id, 0 for none
+    records = bytearray(_RECORD.size * len(products))
+    heap = bytearray()
+    for index, product in enumerate(products):
+        promotion = product.promotion
+        if promotion is None:
+            promotion_id = 0
+        else:
+            promotion_id = promotion_ids.get(id(promotion))
+            if promotion_id is None:
+                promotion_list.append(_dump_promotion(promotion))
+                promotion_id = promotion_ids[id(promotion)] = \
+                    len(promotion_list)
+        if isinstance(product, LimitedProduct):
+            kind, maximum = KIND_LIMITED, product.maximum
+        elif isinstance(product, NonStockedProduct):
+            kind, maximum = KIND_NON_STOCKED, 0
+        else:
+            kind, maximum = KIND_PRODUCT, 0
+        name = product.name.encode("utf-8")
+        _RECORD.pack_into(records, index * _RECORD.size, product.product_id,
+                          product.price, product.quantity, maximum,
+                          len(heap), len(name), promotion_id, kind,
+                          product.is_active)
+        heap += name
+
+    promotion_table = json.dumps(promotion_list).encode("utf-8")
+    records_offset = _HEADER.size
+    heap_offset = records_offset + len(records)
+    promotions_offset = heap_offset + len(heap)
+    header = _HEADER.pack(MAGIC, _RECORD.size, len(products), sequence,
+                          records_offset, heap_offset, promotions_offset,
+                          len(promotion_table))
+
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as snapshot_file:
+        snapshot_file.write(header)
+        snapshot_file.write(records)
+        snapshot_file.write(heap)
+        snapshot_file.write(promotion_table)
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(temporary_path, path)
+
+
+def open_snapshot(path, writable=True, copy_on_write=False):
+    """
+    Opens a snapshot file through mmap without reading its records.
+
+    Args:
+        path (str): The snapshot file to open.
+        writable (bool): Whether stock changes are written back to the
+            file. Defaults to True.
+        copy_on_write (bool): Whether stock changes are kept in memory
+            only, leaving the file untouched. Defaults to False.
+
+    Returns:
+        MappedProductTable: A table backed by the file.
+
+    Raises:
+        ValueError: If the file is not a snapshot.
+    """
+    return MappedProductTable(path, writable, copy_on_write)
+
+
+def _dump_promotion(promotion):
+    """
+    Returns a JSON-compatible description of a promotion.
+    """
+    type_name = type(promotion).__name__
+    if _PROMOTION_TYPES.get(type_name) is not type(promotion):
+        raise ValueError(f"Can't save promotion of type {type_name}")
+    return {"type": type_name, "attributes": vars(promotion)}
+
+
+def _load_promotion(description):
+    """
+    Rebuilds a promotion saved by _dump_promotion().
+    """
+    promotion = object.__new__(_PROMOTION_TYPES[description["type"]])
+    vars(promotion).update(description["attributes"])
+    return promotion
+
+
+class _RecordColumn:
+    """
+    One field of every record, read and written in place.
+    """
+
+    def __init__(self, buffer, records_offset, count, field):
+        offset, format_ = _FIELDS[field]
+        self._buffer = buffer
+        self._records_offset = records_offset
+        self._start = records_offset + offset
+        self._count = count
+        self._field = struct.Struct(format_)
+        # The field padded to a whole record, to unpack rows in bulk
+        self._record_field = struct.Struct(
+            f"<{offset}x{format_[1:]}"
+            f"{_RECORD.size - offset - self._field.size}x")
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, row):
+        if not 0 <= row < self._count:
+            raise IndexError("Snapshot row out of range")
+        return self._field.unpack_from(
+            self._buffer, self._start + row * _RECORD.size)[0]
+
+    def __iter__(self):
+        # One unpack call for every row, instead of one per row
+        end = self._records_offset + self._count * _RECORD.size
+        with memoryview(self._buffer) as buffer, \
+                buffer[self._records_offset:end] as records:
+            values = [value for value, in
+                      self._record_field.iter_unpack(records)]
+        return iter(values)
+
+    def __setitem__(self, row, value):
+        if not 0 <= row < self._count:
+            raise IndexError("Snapshot row out of range")
+        self._field.pack_into(self._buffer,
+                              self._start + row * _RECORD.size, value)
+
+
+class _NameColumn:
+    """
+    The product names, decoded from the name heap on access.
+    """
+
+    _LOCATION = struct.Struct("<QI")
+
+    def __init__(self, buffer, records_offset, heap_offset, count):
+        self._buffer = buffer
+        self._records_offset = records_offset + 32
+        self._heap_offset = heap_offset
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, row):
+        if not 0 <= row < self._count:
+            raise IndexError("Snapshot row out of range")
+        offset, length = self._LOCATION.unpack_from(
+            self._buffer, self._records_offset + row * _RECORD.size)
+        start = self._heap_offset + offset
+        return bytes(self._buffer[start:start + length]).decode("utf-8")
+
+    def __setitem__(self, row, value):
+        raise ValueError("Product names in a snapshot are read-only")
+
+
+class MappedProductTable(ProductTable):
+    """
+    A ProductTable whose rows live in a memory-mapped snapshot file.
+
+    Records are only read when a view touches them, so opening even a
+    very large snapshot is cheap. Changes to stock, activity and price
+    are written straight into the file. Rows can't be added, and only
+    promotions already in the snapshot can be set on its products.
+
+    Attributes:
+        sequence (int): Position of the snapshot in the order journal.
+
+    Methods:
+        find(product_id) -> ProductView:
+            Returns the view of a product, by binary search on its ID.
+
+        flush():
+            Writes changes made through the views to disk.
+
+        close():
+            Unmaps the file.
+    """
+
+    def __init__(self, path, writable=True, copy_on_write=False):
+        """
+        Initializes a new instance of MappedProductTable.
+
+        Args:
+            path (str): The snapshot file to map.
+            writable (bool): Whether changes are written back to the file.
+            copy_on_write (bool): Whether changes are kept in memory only.
+
+        Raises:
+            ValueError: If the file is not a snapshot.
+        """
+        if copy_on_write:
+            access = mmap.ACCESS_COPY
+        elif writable:
+            access = mmap.ACCESS_WRITE
+        else:
+            access = mmap.ACCESS_READ
+        with open(path, "r+b" if writable and not copy_on_write
+                  else "rb") as snapshot_file:
+            self._mmap = mmap.mmap(snapshot_file.fileno(), 0, access=access)
+        if len(self._mmap) < _HEADER.size:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a snapshot")
+        (magic, record_size, count, self.sequence, records_offset,
+         heap_offset, promotions_offset, promotions_length) = \
+            _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or record_size != _RECORD.size:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a snapshot")
+
+        for field in _FIELDS:
+            setattr(self, field, _RecordColumn(self._mmap, records_offset,
+                                               count, field))
+        self.names = _NameColumn(self._mmap, records_offset, heap_offset,
+                                 count)
+        promotion_table = self._mmap[
+            promotions_offset:promotions_offset + promotions_length]
+        self.promotions = [None] + [
+            _load_promotion(description)
+            for description in json.loads(promotion_table)]
+        self._promotion_index = {id(promotion): index for index, promotion
+                                 in enumerate(self.promotions) if index}
+        self._init_row_state()
+
+    def find(self, product_id):
+        """
+        Returns the view of the product with the given ID.
+
+        Args:
+            product_id (int): The ID of the product.
+
+        Returns:
+            ProductView: A view of the product's row.
+
+        Raises:
+            ValueError: If no product with that ID is in the snapshot.
+        """
+        row = bisect_left(self.product_ids, product_id)
+        if row == len(self) or self.product_ids[row] != product_id:
+            raise ValueError(f"Product ID {product_id} not in snapshot")
+        return self.view(row)
+
+    def append(self, *args, **kwargs):
+        raise ValueError("Can't add products to a snapshot")
+
+    def flush(self):
+        """
+        Writes changes made through the views to disk.
+        """
+        self._mmap.flush()
+
+    def close(self):
+        """
+        Unmaps the snapshot file.
+        """
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _get_promotion_id(self, promotion) -> int:
+        """
+        Returns the index of a promotion stored in the snapshot.
+        """
+        if promotion is None:
+            return 0
+        index = self._promotion_index.get(id(promotion))
+        if index is None:
+            raise ValueError("Only promotions saved in the snapshot "
+                             "can be set on its products")
+        return index
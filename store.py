@@ -1,11 +1,126 @@
-from typing import List, Tuple
-from products import Product
+import threading
+import time
+import warnings
+from contextlib import nullcontext
+from heapq import heappop, heappush
+from itertools import count, islice
+from typing import (Callable, Iterator, List, NamedTuple, Optional, Tuple,
+                    Union)
+from money import to_cents
+from products import UNKNOWN_PRODUCT, Product, PurchaseError
+
+# Default of Store.get_product() meaning "raise if missing"
+_RAISE = object()
+
+
+class BatchResult(NamedTuple):
+    """
+    The outcome of Store.order_many().
+
+    Attributes:
+        totals (List[float]): The total price charged for each order,
+            in int cents in "cents" money mode.
+        failures (List[Tuple[int, int, str]]): One (order index, line index,
+            reason) tuple for every line that could not be filled.
+    """
+    totals: List[float]
+    failures: List[Tuple[int, int, str]]
+
+
+class ProductPage(NamedTuple):
+    """
+    One page of Store.get_products_page().
+
+    Attributes:
+        products (List[Product]): The products on the page.
+        next_cursor (Optional[int]): The product_id to pass as cursor for
+            the next page, or None if this is the last page.
+    """
+    products: List[Product]
+    next_cursor: Optional[int]
+
+
+class QuoteLine(NamedTuple):
+    """
+    One line of a Quote.
+
+    Attributes:
+        product (Product): The product.
+        quantity (int): The quantity quoted.
+        list_price (float): The price of the line before promotions.
+        price (float): The price order() would charge for the line.
+        promotion (Optional[str]): The promotion applied, or None.
+        error (Optional[str]): Why the line can't be bought, or None.
+            Such lines are priced 0 and left out of the total.
+    """
+    product: Product
+    quantity: int
+    list_price: float
+    price: float
+    promotion: Optional[str]
+    error: Optional[str]
+
+
+class Quote(NamedTuple):
+    """
+    The price of a shopping list, see Store.quote(). Prices are int
+    cents in "cents" money mode.
+
+    Attributes:
+        total (float): The total price of the lines that can be bought.
+        lines (List[QuoteLine]): The breakdown of every line.
+    """
+    total: float
+    lines: List[QuoteLine]
+
+    @property
+    def can_order(self) -> bool:
+        """
+        Returns whether every line can be bought, so order() would
+        charge the total.
+        """
+        return all(line.error is None for line in self.lines)
 
 
 class Store:
     """
     A class that represents a store containing products.
 
+    Products are indexed by their product_id, with a secondary index by
+    name and a maintained set of in-stock products, so lookups, membership
+    checks and removals don't scan the catalog. Inventory totals are kept
+    as running aggregates updated whenever a product's stock or promotion
+    changes. Range queries by price, stock, promotion and name prefix use
+    sorted and inverted indexes. Everything but the product_id index is
+    built on first use and kept up to date from then on, so a large
+    catalog is ready to take orders as soon as its products are added.
+
+    A thread-safe store guards product stock with lock striping over the
+    product index: each product maps to one of a fixed set of locks, and
+    an order takes the locks of its products in ascending stripe order,
+    so checkouts on disjoint products run without blocking each other.
+
+    In "cents" money mode, order prices are exact integer cents.
+
+    A store with a promotion engine prices orders with its stackable
+    rules instead of each product's single promotion.
+
+    Stock can be held for a shopping list with reserve(), e.g. while a
+    cart is checked out. Held units are unavailable to other orders until
+    the hold is committed as an order, released, or expires; expired holds
+    are reclaimed in bulk from a heap ordered by expiry time.
+
+    Order listeners registered with add_order_listener() are called
+    with the lines of every committed order, e.g. to track sales.
+    Product listeners registered with add_product_listener() are called
+    whenever a product is added, removed or changed.
+
+    A store with checkout metrics records every order and rejection in
+    them; without, instrumentation costs one attribute check per order.
+
+    A store with an order journal records every committed order in it
+    before order() returns, and can checkpoint its stock into a snapshot.
+
     Attributes:
         products (List[Product]): A list of products in the store.
 
@@ -13,36 +128,208 @@ class Store:
         add_product(product):
             Adds a product to the store's inventory.
 
+        add_products(products):
+            Adds several products to the store's inventory at once.
+
+        add_table(table):
+            Adds every row of a ProductTable to the store's inventory.
+
         remove_product(product):
             Removes a product from the store's inventory.
 
+        get_product(product_id) -> Product:
+            Returns the product with the given ID.
+
+        find_products(name) -> List[Product]:
+            Returns all products with the given name.
+
+        find_products_by_price(min_price, max_price) -> List[Product]:
+            Returns the products priced in a range, cheapest first.
+
+        find_low_stock(threshold) -> List[Product]:
+            Returns the products with fewer units than a threshold.
+
+        find_products_on_promotion(promotion) -> List[Product]:
+            Returns the products with the given promotion.
+
+        find_products_by_prefix(prefix) -> List[Product]:
+            Returns the products whose name starts with a prefix.
+
+        iter_products(active_only, where, after) -> Iterator[Product]:
+            Lazily yields the products in insertion order, filtered.
+
+        get_products_page(page_size, cursor, offset, active_only, where)
+         -> ProductPage:
+            Returns one page of products and the cursor of the next one.
+
         show_products():
             Displays details of all products in the store.
 
         get_total_quantity() -> int:
             Returns the total quantity of all products in the store.
 
+        get_active_count() -> int:
+            Returns the number of products currently in stock.
+
+        get_stock_value() -> float:
+            Returns the value of all stock at list price.
+
+        get_promoted_stock_value() -> float:
+            Returns the value of all stock after promotions.
+
         get_all_products() -> List[Product]:
             Returns a list of all active products in the store.
 
-        order(shopping_list: List[Tuple[Product, int]]) -> float:
+        order(shopping_list) -> float:
             Processes an order for a list of products and their quantities,
-            and returns the total price.
-            Raises ValueError if any product in the shopping list is not
-            found in the store.
+             and returns the total price.
+
+        order_many(orders) -> BatchResult:
+            Processes many shopping lists at once, pricing each product's
+             lines together and deducting its stock in one step.
+
+        order_batch(orders) -> List[Union[float, ValueError]]:
+            Processes many orders, each all-or-nothing, taking the locks
+             and waiting for the journal once for the batch.
+
+        quote(shopping_list) -> Quote:
+            Prices a shopping list line by line without buying it.
+
+        quote_many(carts) -> List[Quote]:
+            Prices many shopping lists at once without buying them.
+
+        reserve(shopping_list, ttl) -> int:
+            Holds stock for a shopping list and returns the hold's token.
+
+        commit(token) -> float:
+            Places the order of a hold and returns the total price.
+
+        release(token):
+            Gives the stock of a hold back.
+
+        get_available_quantity(product) -> int:
+            Returns a product's stock minus the units held.
+
+        add_order_listener(listener) / remove_order_listener(listener):
+            Registers or unregisters a callback for committed orders.
+
+        add_product_listener(listener) / remove_product_listener(listener):
+            Registers or unregisters a callback for catalog changes.
+
+        checkpoint():
+            Saves the stock to the journal's snapshot and compacts the
+             journal.
     """
 
-    def __init__(self, products=None):
+    def __init__(self, products=None, thread_safe=False, lock_stripes=64,
+                 journal=None, promotion_engine=None, money="float",
+                 clock=time.monotonic, metrics=None):
         """
         Initializes a new instance of the Store class.
 
         Args:
             products (List[Product], optional): The initial
             list of products in the store. Defaults to None.
+            thread_safe (bool): Whether orders may be placed from several
+                threads at once. Defaults to False.
+            lock_stripes (int): Number of stock locks shared by the
+                products of a thread-safe store. Defaults to 64.
+            journal (OrderJournal, optional): Journal recording every
+                committed order. Defaults to None.
+            promotion_engine (PromotionEngine, optional): Engine pricing
+                orders with stackable rules instead of each product's
+                single promotion. Defaults to None.
+            money (str): "float" to price orders in float dollars, or
+                "cents" for exact integer cents rounded once per line
+                by each promotion's rounding policy. Defaults to "float".
+            clock (callable): Returns the current time in seconds, for
+                hold expiry. Defaults to time.monotonic.
+            metrics (CheckoutMetrics, optional): Recorder of orders and
+                rejections. Defaults to None.
+
+        Raises:
+            ValueError: If the money mode is unknown, or combined with
+            a promotion engine, which prices in float dollars only.
+        """
+        if money == "cents":
+            if promotion_engine is not None:
+                raise ValueError("A promotion engine prices in float "
+                                 "dollars, not cents")
+            # A plain function, so the order loop calls it without a lookup;
+            # subclasses customize pricing through _compile_cents_pricer()
+            self._get_price = Product.get_price_cents
+            self._prices_method = "get_prices_cents"
+            self._zero = 0
+        elif money == "float":
+            self._get_price = Product.get_price
+            self._prices_method = "get_prices"
+            self._zero = 0.0
+        else:
+            raise ValueError(f"Unknown money mode {money}")
+        self._journal = journal
+        self._metrics = metrics
+        self._order_listeners = ()  # See add_order_listener()
+        self._product_listeners = ()  # See add_product_listener()
+        self._promotion_engine = promotion_engine
+        if thread_safe:
+            self._stripes = [threading.RLock() for _ in range(lock_stripes)]
+            # Guards the indexes and aggregates, held only briefly
+            self._catalog_lock = threading.Lock()
+            # Guards the holds, see reserve()
+            self._holds_lock = threading.Lock()
+        else:
+            self._stripes = None
+            self._catalog_lock = nullcontext()
+            self._holds_lock = nullcontext()
+        self._clock = clock
+        self._hold_tokens = count(1)
+        self._holds = {}  # token -> (shopping list, expiry time)
+        self._held = {}  # product_id -> units held
+        self._expiry = []  # Heap of (expiry time, token)
+        self._products = {}  # product_id -> Product
+        # Built on first use: name -> {product_id: Product}, see
+        # _get_by_name()
+        self._by_name = None
+        # Running aggregates, see _product_changed(), built on first use by
+        # _count_stock() along with product_id -> Product for in-stock
+        # products
+        self._active = None
+        self._total_quantity = 0
+        self._stock_value = 0.0
+        # Built on first use by _count_promoted_value(): product_id -> value
+        # after promotion, and their sum
+        self._promoted_values = None
+        self._promoted_value = 0.0
+        self._index = None  # CatalogIndex, see _get_index()
+        # Built on first use by _get_positions(): product_id -> insertion
+        # sequence, and a SortedList of (sequence, product_id) to resume
+        # iterating from a cursor
+        self._positions = None
+        self._by_position = None
+        self._next_position = 0
+        if products is not None:
+            for product in products:
+                self.add_product(product)
+
+    @property
+    def products(self) -> List[Product]:
+        """
+        Returns all products in the store, in insertion order.
+        """
+        return list(self._products.values())
+
+    def __contains__(self, product) -> bool:
         """
-        if products is None:
-            products = []
-        self.products = products
+        Returns whether the given product object belongs to the store.
+        """
+        product_id = getattr(product, "product_id", None)
+        return self._products.get(product_id) is product
+
+    def __len__(self) -> int:
+        """
+        Returns the number of products in the store.
+        """
+        return len(self._products)
 
     def add_product(self, product):
         """
@@ -52,11 +339,121 @@ class Store:
             product (Product): The product to add.
 
         Raises:
-            ValueError: If the product is not of type Product.
+            ValueError: If the product is not of type Product, or another
+            product with the same product_id is already in the store.
         """
         if not isinstance(product, Product):
             raise ValueError("Not of type Product")
-        self.products.append(product)
+        with self._catalog_lock:
+            self._add_product(product)
+        for listener in self._product_listeners:
+            listener(product, "added", None)
+
+    def _add_product(self, product):
+        """
+        Indexes a product, with the catalog lock held.
+        """
+        product_id = product.product_id
+        if product_id in self._products:
+            raise ValueError(f"Product ID {product_id} already in store")
+        self._index_product(product_id, product)
+        product.add_observer(self._product_changed)
+
+    def _index_product(self, product_id, product):
+        """
+        Adds a product to the indexes and aggregates built so far, with
+        the catalog lock held.
+        """
+        self._products[product_id] = product
+        if self._by_name is not None:
+            self._by_name.setdefault(product.name, {})[product_id] = product
+        if self._active is not None:
+            quantity = product.get_quantity()
+            if quantity > 0:
+                self._active[product_id] = product
+            self._total_quantity += quantity
+            self._stock_value += quantity * product.price
+        if self._promoted_values is not None:
+            promoted_value = self._get_promoted_value(product)
+            self._promoted_values[product_id] = promoted_value
+            self._promoted_value += promoted_value
+        if self._index is not None:
+            self._index.add(product)
+        if self._positions is not None:
+            position = self._next_position
+            self._next_position = position + 1
+            self._positions[product_id] = position
+            self._by_position.add((position, product_id))
+        if self._stripes is not None:
+            product._lock = self._get_stripe(product_id)
+
+    def add_products(self, products):
+        """
+        Adds several products to the store's inventory at once.
+        Nothing is added if any of them is rejected.
+
+        Args:
+            products (Iterable[Product]): The products to add.
+
+        Raises:
+            ValueError: If a product is not of type Product, or its
+            product_id is already in the store or repeated.
+        """
+        products = list(products)
+        product_ids = set()
+        for product in products:
+            if not isinstance(product, Product):
+                raise ValueError("Not of type Product")
+            product_ids.add(product.product_id)
+        if len(product_ids) != len(products):
+            raise ValueError("Product IDs repeated")
+        with self._catalog_lock:
+            if not product_ids.isdisjoint(self._products):
+                raise ValueError("Product ID already in store")
+            for product in products:
+                self._add_product(product)
+        self._notify_added(products)
+
+    def add_table(self, table):
+        """
+        Adds every row of a ProductTable, e.g. a catalog snapshot opened
+        with open_snapshot(), to the store's inventory. The store observes
+        the whole table instead of each row, so adding costs little more
+        than creating the row views. Nothing is added if any row is
+        rejected.
+
+        Args:
+            table (ProductTable): The table to add.
+
+        Returns:
+            List[ProductView]: The views of the rows, in table order. The
+            store recognizes its products by identity, so use these.
+
+        Raises:
+            ValueError: If a product_id is already in the store or
+            repeated.
+        """
+        products = list(table)
+        product_ids = list(table.product_ids)
+        unique_ids = set(product_ids)
+        if len(unique_ids) != len(product_ids):
+            raise ValueError("Product IDs repeated")
+        with self._catalog_lock:
+            if not unique_ids.isdisjoint(self._products):
+                raise ValueError("Product ID already in store")
+            for product_id, product in zip(product_ids, products):
+                self._index_product(product_id, product)
+            table.add_observer(self._product_changed)
+        self._notify_added(products)
+        return products
+
+    def _notify_added(self, products):
+        """
+        Calls the product listeners for each of several added products.
+        """
+        for listener in self._product_listeners:
+            for product in products:
+                listener(product, "added", None)
 
     def remove_product(self, product):
         """
@@ -68,16 +465,364 @@ class Store:
         Raises:
             ValueError: If the product is not found in the store.
         """
-        if product in self.products:
-            self.products.remove(product)
-        else:
+        with self._catalog_lock:
+            self._remove_product(product)
+        for listener in self._product_listeners:
+            listener(product, "removed", None)
+
+    def _remove_product(self, product):
+        """
+        Unindexes a product, with the catalog lock held.
+        """
+        if product not in self:
             raise ValueError("Product not found in store")
 
+        product_id = product.product_id
+        del self._products[product_id]
+        if self._by_name is not None:
+            same_name = self._by_name[product.name]
+            del same_name[product_id]
+            if not same_name:
+                del self._by_name[product.name]
+        if self._active is not None:
+            self._active.pop(product_id, None)
+            quantity = product.get_quantity()
+            self._total_quantity -= quantity
+            self._stock_value -= quantity * product.price
+        if self._promoted_values is not None:
+            self._promoted_value -= self._promoted_values.pop(product_id)
+        if self._index is not None:
+            self._index.remove(product)
+        if self._positions is not None:
+            self._by_position.remove(
+                (self._positions.pop(product_id), product_id))
+        product._lock = None
+        product.remove_observer(self._product_changed)
+
+    def get_product(self, product_id, default=_RAISE) -> Product:
+        """
+        Returns the product with the given ID.
+
+        Args:
+            product_id (int): The ID of the product.
+            default (optional): Value returned when no product has that
+                ID. Without it, a ValueError is raised instead.
+
+        Returns:
+            Product: The product with the given ID.
+
+        Raises:
+            ValueError: If no product with that ID is in the store
+            and no default is given.
+        """
+        product = self._products.get(product_id)
+        if product is None:
+            if default is _RAISE:
+                raise ValueError(f"Product ID {product_id} "
+                                 f"not found in store")
+            return default
+        return product
+
+    def find_products(self, name) -> List[Product]:
+        """
+        Returns all products with the given name.
+
+        Args:
+            name (str): The exact name to look up.
+
+        Returns:
+            List[Product]: The matching products, possibly empty.
+        """
+        return list(self._get_by_name().get(name, {}).values())
+
+    def _get_by_name(self) -> dict:
+        """
+        Returns the name index, building it on first use.
+        """
+        by_name = self._by_name
+        if by_name is None:
+            with self._catalog_lock:
+                if self._by_name is None:
+                    by_name = {}
+                    for product_id, product in self._products.items():
+                        by_name.setdefault(product.name, {})[product_id] = \
+                            product
+                    self._by_name = by_name
+                by_name = self._by_name
+        return by_name
+
+    def _count_stock(self):
+        """
+        Builds the in-stock products and the stock aggregates on first use,
+        with orders stopped so none is missed by the counts.
+        """
+        locks = self._acquire_all_stripes()
+        try:
+            with self._catalog_lock:
+                if self._active is not None:
+                    return
+                active = {}
+                total_quantity = 0
+                stock_value = 0.0
+                for product_id, product in self._products.items():
+                    quantity = product.get_quantity()
+                    if quantity > 0:
+                        active[product_id] = product
+                    total_quantity += quantity
+                    stock_value += quantity * product.price
+                self._total_quantity = total_quantity
+                self._stock_value = stock_value
+                self._active = active
+        finally:
+            for lock in locks:
+                lock.release()
+
+    def _count_promoted_value(self):
+        """
+        Builds the promoted stock value aggregate on first use, with
+        orders stopped.
+        """
+        locks = self._acquire_all_stripes()
+        try:
+            with self._catalog_lock:
+                if self._promoted_values is not None:
+                    return
+                promoted_values = {
+                    product_id: self._get_promoted_value(product)
+                    for product_id, product in self._products.items()}
+                self._promoted_value = sum(promoted_values.values())
+                self._promoted_values = promoted_values
+        finally:
+            for lock in locks:
+                lock.release()
+
+    @staticmethod
+    def _get_promoted_value(product) -> float:
+        """
+        Returns the price of a product's whole stock after its promotion.
+        """
+        quantity = product.get_quantity()
+        if quantity <= 0:
+            return 0.0
+        return product.get_price(quantity)
+
+    def _product_changed(self, product, field, old_value):
+        """
+        Keeps the indexes and aggregates in sync with changes made
+        to a product.
+        """
+        with self._catalog_lock:
+            self._update_product(product, field, old_value)
+        for listener in self._product_listeners:
+            listener(product, field, old_value)
+
+    def _update_product(self, product, field, old_value):
+        """
+        Updates the indexes and aggregates, with the catalog lock held.
+        """
+        product_id = product.product_id
+        if self._active is not None:
+            if field == "quantity":
+                quantity = product.get_quantity()
+                if quantity > 0:
+                    self._active[product_id] = product
+                else:
+                    self._active.pop(product_id, None)
+                self._total_quantity += quantity - old_value
+                self._stock_value += (quantity - old_value) * product.price
+            elif field == "price":
+                self._stock_value += \
+                    (product.price - old_value) * product.get_quantity()
+
+        if self._promoted_values is not None:
+            promoted_value = self._get_promoted_value(product)
+            self._promoted_value += \
+                promoted_value - self._promoted_values[product_id]
+            self._promoted_values[product_id] = promoted_value
+        if self._index is not None:
+            self._index.update(product, field, old_value)
+
+    def _get_index(self):
+        """
+        Returns the range query indexes, building them on first use.
+        Orders are stopped while building, so no quantity changes
+        between being read and the index being installed.
+        """
+        index = self._index
+        if index is None:
+            from catalog_index import CatalogIndex
+            locks = self._acquire_all_stripes()
+            try:
+                with self._catalog_lock:
+                    if self._index is None:
+                        self._index = CatalogIndex(self._products)
+                    index = self._index
+            finally:
+                for lock in locks:
+                    lock.release()
+        return index
+
+    def find_products_by_price(self, min_price, max_price) -> List[Product]:
+        """
+        Returns the products priced from min_price up to, but not
+        including, max_price.
+
+        Args:
+            min_price (float): The lowest price included.
+            max_price (float): The price above the range.
+
+        Returns:
+            List[Product]: The matching products, cheapest first.
+        """
+        index = self._get_index()
+        with self._catalog_lock:
+            return index.by_price(min_price, max_price)
+
+    def find_low_stock(self, threshold) -> List[Product]:
+        """
+        Returns the stocked products with fewer units than threshold,
+        including the sold out ones.
+
+        Args:
+            threshold (int): The quantity above the range.
+
+        Returns:
+            List[Product]: The matching products, lowest stock first.
+        """
+        index = self._get_index()
+        with self._catalog_lock:
+            return index.by_quantity(0, threshold)
+
+    def find_products_on_promotion(self, promotion) -> List[Product]:
+        """
+        Returns the products with the given promotion.
+
+        Args:
+            promotion (Promotion): The promotion object to look up.
+
+        Returns:
+            List[Product]: The matching products, possibly empty.
+        """
+        index = self._get_index()
+        with self._catalog_lock:
+            return index.by_promotion(promotion)
+
+    def find_products_by_prefix(self, prefix) -> List[Product]:
+        """
+        Returns the products whose name starts with prefix,
+        ignoring case.
+
+        Args:
+            prefix (str): The start of the name.
+
+        Returns:
+            List[Product]: The matching products, possibly empty.
+        """
+        index = self._get_index()
+        with self._catalog_lock:
+            return index.by_name_prefix(prefix)
+
+    def iter_products(self, active_only=False,
+                      where: Optional[Callable[[Product], bool]] = None,
+                      after=None) -> Iterator[Product]:
+        """
+        Lazily yields the products in the store, in insertion order.
+        Products must not be added or removed while iterating.
+
+        Args:
+            active_only (bool): Whether to skip products out of stock.
+                Defaults to False.
+            where (callable, optional): Predicate a product must satisfy
+                to be yielded. Defaults to None.
+            after (int, optional): Only yield the products added after
+                the one with this product_id, found in O(log n) from the
+                insertion positions built on first use. Defaults to None.
+
+        Raises:
+            ValueError: If no product has the product_id given as after.
+        """
+        if after is None:
+            products = iter(self._products.values())
+        else:
+            positions, by_position = self._get_positions()
+            position = positions.get(after)
+            if position is None:
+                raise ValueError(f"Product ID {after} not found in store")
+            by_id = self._products
+            products = (by_id[product_id] for _, product_id in
+                        by_position.irange((position + 1,),
+                                           (self._next_position,)))
+        for product in products:
+            if active_only and not product.is_active:
+                continue
+            if where is None or where(product):
+                yield product
+
+    def _get_positions(self):
+        """
+        Returns the insertion sequence of each product and the products
+        by sequence, building them on first use, so a cursor is found in
+        O(log n) instead of walking the catalog up to it.
+        """
+        positions = self._positions
+        if positions is None:
+            from catalog_index import SortedList
+            with self._catalog_lock:
+                if self._positions is None:
+                    positions = {product_id: position for position, product_id
+                                 in enumerate(self._products)}
+                    self._by_position = SortedList(
+                        (position, product_id)
+                        for product_id, position in positions.items())
+                    self._next_position = len(positions)
+                    self._positions = positions
+                positions = self._positions
+        return positions, self._by_position
+
+    def get_products_page(self, page_size=20, cursor=None, offset=0,
+                          active_only=False,
+                          where: Optional[Callable[[Product], bool]] = None) \
+            -> ProductPage:
+        """
+        Returns one page of the products in the store, in insertion
+        order, looking at no more products than needed to fill it.
+
+        Args:
+            page_size (int): The maximum number of products on the page.
+                Defaults to 20.
+            cursor (int, optional): The next_cursor of the previous page,
+                to continue after it. Defaults to None, the first page.
+            offset (int): Number of matching products to skip before the
+                page starts. Defaults to 0.
+            active_only (bool): Whether to skip products out of stock.
+                Defaults to False.
+            where (callable, optional): Predicate a product must satisfy
+                to be listed. Defaults to None.
+
+        Returns:
+            ProductPage: The products and the cursor of the next page.
+
+        Raises:
+            ValueError: If the page size is not positive, the offset is
+            negative or the cursor is unknown.
+        """
+        if page_size <= 0:
+            raise ValueError("Page size must be positive")
+        if offset < 0:
+            raise ValueError("Offset can't be negative")
+        products = list(islice(
+            self.iter_products(active_only, where, after=cursor),
+            offset, offset + page_size + 1))
+        if len(products) > page_size:
+            del products[page_size:]
+            return ProductPage(products, products[-1].product_id)
+        return ProductPage(products, None)
+
     def show_products(self):
         """
         Displays details of all products in the store.
         """
-        for product in self.products:
+        for product in self._products.values():
             print(product.show())
 
     def get_total_quantity(self) -> int:
@@ -87,10 +832,42 @@ class Store:
         Returns:
             int: The total quantity of all products in the store.
         """
-        total_quantity = 0
-        for product in self.products:
-            total_quantity += product.get_quantity()
-        return total_quantity
+        if self._active is None:
+            self._count_stock()
+        return self._total_quantity
+
+    def get_active_count(self) -> int:
+        """
+        Returns the number of products currently in stock.
+
+        Returns:
+            int: The number of active products in the store.
+        """
+        if self._active is None:
+            self._count_stock()
+        return len(self._active)
+
+    def get_stock_value(self) -> float:
+        """
+        Returns the value of all stock in the store at list price.
+
+        Returns:
+            float: The sum of price times quantity over all products.
+        """
+        if self._active is None:
+            self._count_stock()
+        return self._stock_value
+
+    def get_promoted_stock_value(self) -> float:
+        """
+        Returns the value of all stock in the store after promotions.
+
+        Returns:
+            float: The price of buying every product's whole stock.
+        """
+        if self._promoted_values is None:
+            self._count_promoted_value()
+        return self._promoted_value
 
     def get_all_products(self) -> List[Product]:
         """
@@ -99,31 +876,725 @@ class Store:
         Returns:
             List[Product]: A list of all active products in the store.
         """
-        active_products = []
-        for product in self.products:
-            if isinstance(product, Product) and product.get_quantity() > 0:
-                active_products.append(product)
-        return active_products
+        if self._active is None:
+            self._count_stock()
+        return list(self._active.values())
 
     def order(self, shopping_list: List[Tuple[Product, int]]) -> float:
         """
         Processes an order for a list of products and their quantities,
         and returns the total price.
 
+        The order is all-or-nothing: every line is checked before any
+        stock is taken, so a rejected order leaves the store untouched.
+
         Args:
             shopping_list (List[Tuple[Product, int]]): A list of tuples,
                 where each tuple contains a Product and an integer quantity.
 
         Returns:
-            float: The total price of the order.
+            float: The total price of the order, or int cents in
+            "cents" money mode.
 
         Raises:
             ValueError: If any product in the shopping
-            list is not found in the store.
+            list is not found in the store, or any line can't be bought.
         """
-        total_price = 0.0
-        for product, quantity in shopping_list:
-            if product not in self.products:
-                raise ValueError(f"Product {product.name} not found in store")
-            total_price += product.buy(quantity)
+        metrics = self._metrics
+        if metrics is not None:
+            started = time.perf_counter()
+        try:
+            if self._stripes is None:
+                total_price, sequence = self._order(shopping_list)
+            else:
+                locks = self._acquire_stripes(
+                    product for product, _ in shopping_list)
+                try:
+                    total_price, sequence = self._order(shopping_list)
+                finally:
+                    for lock in locks:
+                        lock.release()
+        except ValueError as error:
+            if metrics is not None:
+                metrics.record_rejection(error)
+            raise
+        if sequence is not None:
+            self._wait_for_journal(sequence)
+        if metrics is not None:
+            metrics.record_order(shopping_list, time.perf_counter() - started)
+        for listener in self._order_listeners:
+            listener(shopping_list)
         return total_price
+
+    def _order(self, shopping_list) -> Tuple[float, int]:
+        """
+        Checks and commits an order, with the stock locks held.
+
+        Returns:
+            Tuple[float, int]: The total price, and the journal sequence
+            number of the order or None without a journal.
+        """
+        self._expire_holds()
+        self._check_order(shopping_list)
+
+        journal = self._journal
+        if journal is None and self._promotion_engine is None:
+            get_price = self._get_price
+            total_price = self._zero
+            for product, quantity in shopping_list:
+                total_price += get_price(product, quantity)
+                product._remove_stock(quantity)
+            return total_price, None
+
+        total_price, priced_lines = self._price_lines(shopping_list)
+        for product, quantity, _, _ in priced_lines:
+            product._remove_stock(quantity)
+        if journal is None:
+            return total_price, None
+        # Buffered while the locks are held, so a checkpoint taken under
+        # all the locks covers exactly the orders it has sequence numbers for
+        return total_price, journal.write(
+            [(product.product_id, quantity, price, promotion)
+             for product, quantity, price, promotion in priced_lines])
+
+    def _price_lines(self, shopping_list) -> Tuple[float, list]:
+        """
+        Prices every line of an order, through the promotion engine when
+        the store has one.
+
+        Returns:
+            Tuple[float, list]: The order total, and a (product, quantity,
+            price, promotion name) tuple per line. With an engine, the
+            cart discount is spread over the line prices in proportion.
+        """
+        engine = self._promotion_engine
+        if engine is None:
+            get_price = self._get_price
+            priced_lines = []
+            total_price = self._zero
+            for product, quantity in shopping_list:
+                price = get_price(product, quantity)
+                total_price += price
+                promotion = product.promotion
+                priced_lines.append((product, quantity, price,
+                                     promotion.name if promotion else None))
+            return total_price, priced_lines
+
+        cart = engine.price_cart(shopping_list)
+        scale = cart.total / cart.subtotal if cart.subtotal else 0.0
+        return cart.total, [(line.product, line.quantity, line.price * scale,
+                             " + ".join(line.rules) or None)
+                            for line in cart.lines]
+
+    def quote(self, shopping_list: List[Tuple[Product, int]]) -> Quote:
+        """
+        Prices a shopping list the way order() would, without buying it
+        or changing anything.
+
+        Lines are checked like order() checks them, counting held stock
+        as taken, but a line that can't be bought is reported in its
+        breakdown instead of rejecting the whole list.
+
+        Args:
+            shopping_list (List[Tuple[Product, int]]): A list of tuples,
+                where each tuple contains a Product and an integer quantity.
+
+        Returns:
+            Quote: The total price and the breakdown of every line.
+        """
+        return self.quote_many([shopping_list])[0]
+
+    def quote_many(self, carts: List[List[Tuple[Product, int]]]) \
+            -> List[Quote]:
+        """
+        Prices many shopping lists in one pass, without buying them or
+        changing anything. Each list is checked on its own against the
+        current stock, as quote() does, and priced with the same cached
+        pricing functions order() uses.
+
+        Stock locks are not taken, so under concurrent orders a quote
+        reflects the stock at some point during the call.
+
+        Args:
+            carts (List[List[Tuple[Product, int]]]): The shopping lists.
+
+        Returns:
+            List[Quote]: The quote of each shopping list, in order.
+        """
+        self._expire_holds()
+        products = self._products
+        held = self._held
+        get_price = self._get_price
+        engine = self._promotion_engine
+        zero = self._zero
+        in_cents = isinstance(zero, int)
+        quotes = []
+        for shopping_list in carts:
+            total = zero
+            lines = []
+            taken = {}  # product_id -> units claimed by earlier lines
+            for product, quantity in shopping_list:
+                product_id = product.product_id
+                if products.get(product_id) is not product:
+                    lines.append(QuoteLine(
+                        product, quantity, zero, zero, None,
+                        f"Product {product.name} not found in store"))
+                    continue
+                already_taken = taken.get(product_id, 0)
+                try:
+                    product.check_purchase(
+                        quantity, already_taken + held.get(product_id, 0))
+                except ValueError as error:
+                    lines.append(QuoteLine(product, quantity, zero, zero,
+                                           None, str(error)))
+                    continue
+                taken[product_id] = already_taken + quantity
+                list_price = product.get_base_price(quantity)
+                if in_cents:
+                    list_price = to_cents(list_price)
+                if engine is not None:
+                    # Priced with the whole cart below
+                    lines.append(QuoteLine(product, quantity, list_price,
+                                           zero, None, None))
+                    continue
+                price = get_price(product, quantity)
+                total += price
+                promotion = product.promotion
+                lines.append(QuoteLine(product, quantity, list_price, price,
+                                       promotion.name if promotion else None,
+                                       None))
+            if engine is not None:
+                total, lines = self._quote_cart(lines)
+            quotes.append(Quote(total, lines))
+        return quotes
+
+    def _quote_cart(self, lines) -> Tuple[float, List[QuoteLine]]:
+        """
+        Prices the lines of a quote that can be bought through the
+        promotion engine, which prices whole carts.
+        """
+        total, priced_lines = self._price_lines(
+            [(line.product, line.quantity) for line in lines
+             if line.error is None])
+        priced_lines = iter(priced_lines)
+        quoted = []
+        for line in lines:
+            if line.error is None:
+                _, _, price, promotion = next(priced_lines)
+                line = line._replace(price=price, promotion=promotion)
+            quoted.append(line)
+        return total, quoted
+
+    def reserve(self, shopping_list: List[Tuple[Product, int]], ttl) -> int:
+        """
+        Holds stock for a shopping list, e.g. a cart being checked out,
+        so other orders and holds can't take it. The hold ends when it is
+        committed, released or ttl seconds have passed.
+
+        Args:
+            shopping_list (List[Tuple[Product, int]]): A list of tuples,
+                where each tuple contains a Product and an integer quantity.
+            ttl (float): Seconds until the hold expires.
+
+        Returns:
+            int: The token identifying the hold.
+
+        Raises:
+            ValueError: If the TTL is not positive, a product is not found
+            in the store, or any line can't be filled from the stock
+            that isn't held already.
+        """
+        if ttl <= 0:
+            raise ValueError("Hold TTL must be positive")
+        shopping_list = list(shopping_list)
+        if self._stripes is None:
+            return self._reserve(shopping_list, ttl)
+        locks = self._acquire_stripes(
+            product for product, _ in shopping_list)
+        try:
+            return self._reserve(shopping_list, ttl)
+        finally:
+            for lock in locks:
+                lock.release()
+
+    def _reserve(self, shopping_list, ttl) -> int:
+        """
+        Checks and records a hold, with the stock locks held.
+        """
+        self._expire_holds()
+        self._check_order(shopping_list)
+        held = self._held
+        with self._holds_lock:
+            token = next(self._hold_tokens)
+            expires_at = self._clock() + ttl
+            self._holds[token] = (shopping_list, expires_at)
+            heappush(self._expiry, (expires_at, token))
+            for product, quantity in shopping_list:
+                held[product.product_id] = \
+                    held.get(product.product_id, 0) + quantity
+        return token
+
+    def commit(self, token) -> float:
+        """
+        Places the order of a hold, buying the held stock.
+
+        Args:
+            token (int): The token returned by reserve().
+
+        Returns:
+            float: The total price of the order, or int cents in
+            "cents" money mode.
+
+        Raises:
+            ValueError: If the hold was committed, released or has
+            expired, or its products were removed or restocked below
+            the held quantity since. The hold ends either way.
+        """
+        metrics = self._metrics
+        if metrics is not None:
+            started = time.perf_counter()
+        try:
+            hold = self._holds.get(token)
+            if hold is None:
+                raise ValueError("Hold not found or expired")
+            if self._stripes is None:
+                total_price, sequence = self._commit(token)
+            else:
+                locks = self._acquire_stripes(
+                    product for product, _ in hold[0])
+                try:
+                    total_price, sequence = self._commit(token)
+                finally:
+                    for lock in locks:
+                        lock.release()
+        except ValueError as error:
+            if metrics is not None:
+                metrics.record_rejection(error)
+            raise
+        if sequence is not None:
+            self._wait_for_journal(sequence)
+        if metrics is not None:
+            metrics.record_order(hold[0], time.perf_counter() - started)
+        for listener in self._order_listeners:
+            listener(hold[0])
+        return total_price
+
+    def _commit(self, token) -> Tuple[float, int]:
+        """
+        Ends a hold and places its order, with the stock locks held.
+        """
+        self._expire_holds()
+        with self._holds_lock:
+            hold = self._holds.pop(token, None)
+            if hold is None:
+                raise ValueError("Hold not found or expired")
+            self._unhold(hold[0])
+        return self._order(hold[0])
+
+    def release(self, token):
+        """
+        Ends a hold without buying, making its stock available again.
+
+        Args:
+            token (int): The token returned by reserve().
+
+        Raises:
+            ValueError: If the hold was committed, released or has expired.
+        """
+        with self._holds_lock:
+            hold = self._holds.pop(token, None)
+            if hold is None:
+                raise ValueError("Hold not found or expired")
+            self._unhold(hold[0])
+
+    def get_available_quantity(self, product) -> int:
+        """
+        Returns the stock of a product that is not held.
+
+        Args:
+            product (Product): The product to look up.
+
+        Returns:
+            int: The product's quantity minus the units held.
+        """
+        self._expire_holds()
+        return product.get_quantity() - \
+            self._held.get(product.product_id, 0)
+
+    def add_order_listener(self, listener):
+        """
+        Registers a callback that is called after every committed order,
+        from order(), order_many() and commit(), outside the stock locks.
+
+        Args:
+            listener (callable): Called as ``listener(shopping_list)``
+                with the (product, quantity) lines that were bought.
+        """
+        self._order_listeners = self._order_listeners + (listener,)
+
+    def remove_order_listener(self, listener):
+        """
+        Unregisters a callback previously passed to add_order_listener().
+
+        Args:
+            listener (callable): The callback to remove.
+        """
+        self._order_listeners = tuple(
+            registered for registered in self._order_listeners
+            if registered != listener)
+
+    def add_product_listener(self, listener):
+        """
+        Registers a callback that is called after a product is added to
+        or removed from the store, and after a product of the store
+        changes, e.g. when its stock is bought. Stock changes are reported
+        with the stock locks of the order held, so listeners must be quick
+        and must not place orders.
+
+        Args:
+            listener (callable): Called as ``listener(product, field,
+                old_value)``, with field "added" or "removed" and old_value
+                None for catalog changes, or the product field that
+                changed and its old value, as for Product.add_observer().
+        """
+        self._product_listeners = self._product_listeners + (listener,)
+
+    def remove_product_listener(self, listener):
+        """
+        Unregisters a callback previously passed to add_product_listener().
+
+        Args:
+            listener (callable): The callback to remove.
+        """
+        self._product_listeners = tuple(
+            registered for registered in self._product_listeners
+            if registered != listener)
+
+    def _expire_holds(self):
+        """
+        Ends every hold whose TTL has passed. Costs one heap peek when
+        none has, so it runs before every check of available stock.
+        """
+        expiry = self._expiry
+        try:
+            if expiry[0][0] > self._clock():
+                return
+        except IndexError:
+            return
+        with self._holds_lock:
+            now = self._clock()
+            while expiry and expiry[0][0] <= now:
+                _, token = heappop(expiry)
+                # Committed and released holds are already gone
+                hold = self._holds.pop(token, None)
+                if hold is not None:
+                    self._unhold(hold[0])
+
+    def _unhold(self, shopping_list):
+        """
+        Takes a shopping list's units out of the held counts, with the
+        holds lock held.
+        """
+        held = self._held
+        for product, quantity in shopping_list:
+            remaining = held[product.product_id] - quantity
+            if remaining:
+                held[product.product_id] = remaining
+            else:
+                del held[product.product_id]
+
+    def _wait_for_journal(self, sequence):
+        """
+        Waits until an order is durable in the journal, then checkpoints
+        if the journal has grown enough. The order is committed by then,
+        so a failed checkpoint is reported as a RuntimeWarning instead of
+        failing it.
+        """
+        journal = self._journal
+        journal.wait(sequence)
+        if journal.checkpoint_due():
+            try:
+                self.checkpoint()
+            except Exception as error:
+                # The next due checkpoint retries
+                warnings.warn(f"Checkpoint failed: {error}", RuntimeWarning)
+            finally:
+                journal.end_checkpoint()
+
+    def checkpoint(self):
+        """
+        Saves the stock of every product to the journal's snapshot and
+        drops the journal records the snapshot covers, so recovery only
+        replays the orders placed since.
+
+        Raises:
+            ValueError: If the store has no journal with a snapshot path.
+        """
+        journal = self._journal
+        if journal is None or journal.snapshot_path is None:
+            raise ValueError("Store has no journal with a snapshot path")
+        from snapshot import write_snapshot
+        locks = self._acquire_all_stripes()
+        try:
+            sequence = journal.sequence
+            write_snapshot(self._products.values(), journal.snapshot_path,
+                           sequence)
+        finally:
+            for lock in locks:
+                lock.release()
+        journal.compact(sequence)
+
+    def _get_stripe(self, product_id):
+        """
+        Returns the stock lock shared by products hashing like product_id.
+        """
+        return self._stripes[hash(product_id) % len(self._stripes)]
+
+    def _acquire_stripes(self, products):
+        """
+        Acquires the stock locks of the given products in ascending
+        stripe order, so concurrent orders can never deadlock.
+
+        Returns:
+            List[threading.RLock]: The acquired locks, to be released
+            by the caller.
+        """
+        stripe_count = len(self._stripes)
+        indexes = sorted({hash(product.product_id) % stripe_count
+                          for product in products})
+        locks = [self._stripes[index] for index in indexes]
+        for lock in locks:
+            lock.acquire()
+        return locks
+
+    def _acquire_all_stripes(self):
+        """
+        Acquires every stock lock, stopping all orders.
+
+        Returns:
+            List[threading.RLock]: The acquired locks, to be released
+            by the caller.
+        """
+        if self._stripes is None:
+            return []
+        for lock in self._stripes:
+            lock.acquire()
+        return self._stripes
+
+    def _check_order(self, shopping_list):
+        """
+        Checks every line of an order against the store without
+        changing anything, counting repeated products together and
+        held units as taken.
+
+        Raises:
+            ValueError: If any line of the order can't be filled.
+        """
+        products = self._products
+        held = self._held
+        taken = {}  # product_id -> units claimed by earlier lines
+        for product, quantity in shopping_list:
+            product_id = product.product_id
+            if products.get(product_id) is not product:
+                raise PurchaseError(f"Product {product.name} "
+                                    f"not found in store", UNKNOWN_PRODUCT)
+            already_taken = taken.get(product_id, 0)
+            product.check_purchase(
+                quantity, already_taken + held.get(product_id, 0))
+            taken[product_id] = already_taken + quantity
+
+    def order_many(self, orders: List[List[Tuple[Product, int]]]) \
+            -> BatchResult:
+        """
+        Processes many orders at once. Lines are grouped by product, each
+        group is priced in a single pass of its promotion, and the stock
+        of every product is deducted once for the whole batch.
+
+        Lines are filled in order of arrival. A line that can't be filled
+        (unknown product, invalid quantity, not enough stock left, above a
+        LimitedProduct's maximum) is reported in the failures and the
+        rest of its order is still processed.
+
+        Args:
+            orders (List[List[Tuple[Product, int]]]): The shopping lists.
+
+        Returns:
+            BatchResult: The total of each order and the failed lines.
+        """
+        if self._stripes is None:
+            result, sequence = self._order_many(orders)
+        else:
+            locks = self._acquire_stripes(product for shopping_list in orders
+                                          for product, _ in shopping_list)
+            try:
+                result, sequence = self._order_many(orders)
+            finally:
+                for lock in locks:
+                    lock.release()
+        if sequence is not None:
+            self._wait_for_journal(sequence)
+        metrics = self._metrics
+        listeners = self._order_listeners
+        if metrics is not None or listeners:
+            failed = {(order_index, line_index)
+                      for order_index, line_index, _ in result.failures}
+            for order_index, shopping_list in enumerate(orders):
+                filled = [line for line_index, line in enumerate(shopping_list)
+                          if (order_index, line_index) not in failed]
+                if not filled:
+                    continue
+                if metrics is not None:
+                    metrics.record_order(filled)
+                for listener in listeners:
+                    listener(filled)
+        return result
+
+    def order_batch(self, orders: List[List[Tuple[Product, int]]]) \
+            -> List[Union[float, ValueError]]:
+        """
+        Processes many orders, each all-or-nothing like order(), in one
+        critical section: the stock locks of the batch are taken once,
+        and the journal is waited for once, so all the orders share a
+        group commit.
+
+        Args:
+            orders (List[List[Tuple[Product, int]]]): The shopping lists.
+
+        Returns:
+            List[Union[float, ValueError]]: For each order, its total
+            price, or the error that rejected it.
+        """
+        orders = [list(shopping_list) for shopping_list in orders]
+        if self._stripes is None:
+            results, sequence = self._order_batch(orders)
+        else:
+            locks = self._acquire_stripes(product for shopping_list in orders
+                                          for product, _ in shopping_list)
+            try:
+                results, sequence = self._order_batch(orders)
+            finally:
+                for lock in locks:
+                    lock.release()
+        if sequence is not None:
+            self._wait_for_journal(sequence)
+        metrics = self._metrics
+        listeners = self._order_listeners
+        for shopping_list, result in zip(orders, results):
+            if isinstance(result, ValueError):
+                if metrics is not None:
+                    metrics.record_rejection(result)
+                continue
+            if metrics is not None:
+                metrics.record_order(shopping_list)
+            for listener in listeners:
+                listener(shopping_list)
+        return results
+
+    def _order_batch(self, orders) -> Tuple[list, int]:
+        """
+        Places each order of a batch or records why it was rejected, with
+        the stock locks held.
+
+        Returns:
+            Tuple[list, int]: The total or error of each order, and the
+            journal sequence number of the last order placed or None if
+            nothing was journaled.
+        """
+        results = []
+        sequence = None
+        for shopping_list in orders:
+            try:
+                total_price, order_sequence = self._order(shopping_list)
+            except ValueError as error:
+                results.append(error)
+                continue
+            results.append(total_price)
+            if order_sequence is not None:
+                sequence = order_sequence
+        return results, sequence
+
+    def _order_many(self, orders) -> Tuple[BatchResult, int]:
+        """
+        Fills a batch of orders, with the stock locks held.
+
+        Returns:
+            Tuple[BatchResult, int]: The result, and the journal sequence
+            number of the last order or None if nothing was journaled.
+        """
+        self._expire_holds()
+        metrics = self._metrics
+        products = self._products
+        held = self._held
+        taken = {}  # product_id -> units claimed by the batch so far
+        groups = {}  # product_id -> (product, quantities, order indexes)
+        failures = []
+        # An engine prices whole orders, so it needs each order's lines
+        accepted = [[] for _ in orders] \
+            if self._promotion_engine is not None else None
+        for order_index, shopping_list in enumerate(orders):
+            for line_index, (product, quantity) in enumerate(shopping_list):
+                product_id = product.product_id
+                if products.get(product_id) is not product:
+                    failures.append((order_index, line_index,
+                                     f"Product {product.name} "
+                                     f"not found in store"))
+                    if metrics is not None:
+                        metrics.record_rejection(PurchaseError(
+                            failures[-1][2], UNKNOWN_PRODUCT))
+                    continue
+                already_taken = taken.get(product_id, 0)
+                try:
+                    product.check_purchase(
+                        quantity, already_taken + held.get(product_id, 0))
+                except ValueError as error:
+                    failures.append((order_index, line_index, str(error)))
+                    if metrics is not None:
+                        metrics.record_rejection(error)
+                    continue
+                taken[product_id] = already_taken + quantity
+                group = groups.get(product_id)
+                if group is None:
+                    group = groups[product_id] = (product, [], [])
+                group[1].append(quantity)
+                group[2].append(order_index)
+                if accepted is not None:
+                    accepted[order_index].append((product, quantity))
+
+        journal = self._journal
+        if accepted is not None:
+            totals = []
+            priced_orders = []
+            for shopping_list in accepted:
+                total_price, priced_lines = self._price_lines(shopping_list)
+                totals.append(total_price)
+                priced_orders.append(priced_lines)
+            for product_id, (product, _, _) in groups.items():
+                product._remove_stock(taken[product_id])
+        else:
+            get_prices = self._prices_method  # A name, see __init__()
+            totals = [self._zero] * len(orders)
+            priced_orders = [[] for _ in orders] \
+                if journal is not None else None
+            for product_id, (product, quantities, order_indexes) \
+                    in groups.items():
+                prices = getattr(product, get_prices)(quantities)
+                for order_index, price in zip(order_indexes, prices):
+                    totals[order_index] += price
+                product._remove_stock(taken[product_id])
+                if priced_orders is not None:
+                    promotion = product.promotion.name \
+                        if product.promotion else None
+                    for order_index, quantity, price in zip(
+                            order_indexes, quantities, prices):
+                        priced_orders[order_index].append(
+                            (product, quantity, price, promotion))
+
+        sequence = None
+        if journal is not None:
+            for priced_lines in priced_orders:
+                if priced_lines:
+                    sequence = journal.write(
+                        [(product.product_id, quantity, price, promotion)
+                         for product, quantity, price, promotion
+                         in priced_lines])
+        return BatchResult(totals, failures), sequence
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import pytest
+from products import Product
+from store import Store
+from async_store import AsyncStore
+from journal import open_durable_store
+from snapshot import write_snapshot
+
+
+def test_concurrent_orders_are_batched_without_overselling():
+    store = Store([Product("Google Pixel 7", price=500, quantity=100)])
+    pixel = store.products[0]
+
+    async def scenario():
+        async with AsyncStore(store, max_batch=16, max_pending=8) as shop:
+            results = await asyncio.gather(
+                *(shop.order([(pixel, 1)]) for _ in range(150)),
+                return_exceptions=True)
+            return results, await shop.get_total_quantity()
+
+    results, remaining = asyncio.run(scenario())
+    assert results.count(500) == 100
+    assert sum(isinstance(result, ValueError) for result in results) == 50
+    assert remaining == 0
+
+
+def test_rejected_order_raises_in_caller():
+    store = Store([Product("Google Pixel 7", price=500, quantity=1)])
+    pixel = store.products[0]
+
+    async def scenario():
+        async with AsyncStore(store) as shop:
+            with pytest.raises(ValueError):
+                await shop.order([(pixel, 2)])
+            return await shop.get_all_products()
+
+    assert asyncio.run(scenario()) == [pixel]
+
+
+def test_batch_shares_one_journal_sync_off_the_event_loop(tmp_path):
+    snapshot_path = str(tmp_path / "store.snap")
+    write_snapshot([Product("Google Pixel 7", price=500, quantity=10,
+                            product_id=1)], snapshot_path)
+    store = open_durable_store(snapshot_path, str(tmp_path / "orders.journal"))
+    pixel = store.get_product(1)
+    journal = store._journal
+    write_batch = journal._write_batch
+    syncs = []
+
+    def counting_write_batch(batch):
+        syncs.append(threading.current_thread())
+        write_batch(batch)
+
+    journal._write_batch = counting_write_batch
+
+    async def scenario():
+        async with AsyncStore(store, batch_window=0.05) as shop:
+            return await asyncio.gather(
+                *(shop.order([(pixel, 1)]) for _ in range(12)),
+                return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert results.count(500) == 10
+    assert sum(isinstance(result, ValueError) for result in results) == 2
+    assert len(syncs) == 1
+    assert syncs[0] is not threading.main_thread()
@@ -0,0 +1,129 @@
+import random
+import sys
+import threading
+from catalog_index import CatalogIndex, NameTrie, SortedList
+from products import Product, NonStockedProduct
+from promotions import ThirdOneFree, PercentDiscount
+from store import Store
+
+
+def test_sorted_list_matches_sorted_builtin():
+    SmallSortedList = type("SmallSortedList", (SortedList,), {"LOAD": 4})
+    rng = random.Random(7)
+    items = SmallSortedList(rng.sample(range(1000), 50))
+    expected = sorted(items)
+    for _ in range(500):
+        if expected and rng.random() < 0.4:
+            item = rng.choice(expected)
+            items.remove(item)
+            expected.remove(item)
+        else:
+            item = rng.randrange(1000)
+            items.add(item)
+            expected.append(item)
+            expected.sort()
+    assert list(items) == expected
+    assert len(items) == len(expected)
+    assert list(items.irange(200, 600)) == \
+        [item for item in expected if 200 <= item < 600]
+
+
+def test_name_trie_prefix_search_and_pruning():
+    trie = NameTrie()
+    trie.add("MacBook Air", 1)
+    trie.add("Mac Mini", 2)
+    trie.add("Magic Mouse", 3)
+    assert sorted(trie.search("mac")) == [1, 2]
+    assert sorted(trie.search("")) == [1, 2, 3]
+    trie.remove("Mac Mini", 2)
+    trie.remove("MacBook Air", 1)
+    assert list(trie.search("mac")) == []
+    assert list(trie.search("Ma")) == [3]
+
+
+def make_store():
+    third_one_free = ThirdOneFree("Third One Free!")
+    macbook = Product("MacBook Air M2", price=1450, quantity=100)
+    pixel = Product("Google Pixel 7", price=250, quantity=5)
+    earbuds = Product("Bose QuietComfort Earbuds", price=250, quantity=500)
+    license = NonStockedProduct("Windows License", price=125)
+    earbuds.set_promotion(third_one_free)
+    store = Store([macbook, pixel, earbuds, license])
+    return store, third_one_free, (macbook, pixel, earbuds, license)
+
+
+def test_range_queries():
+    store, third_one_free, (macbook, pixel, earbuds, license) = make_store()
+    assert store.find_products_by_price(0, 300) == [license, pixel, earbuds]
+    assert store.find_low_stock(10) == [pixel]
+    assert store.find_products_on_promotion(third_one_free) == [earbuds]
+    assert store.find_products_by_prefix("ma") == [macbook]
+
+
+def test_indexes_follow_orders_and_catalog_changes():
+    store, third_one_free, (macbook, pixel, earbuds, license) = make_store()
+    store.find_low_stock(10)
+
+    store.order([(macbook, 96)])
+    assert store.find_low_stock(10) == [macbook, pixel]
+    macbook.set_price(200)
+    assert store.find_products_by_price(0, 300) == \
+        [license, macbook, pixel, earbuds]
+
+    earbuds.remove_promotion()
+    macbook.set_promotion(third_one_free)
+    assert store.find_products_on_promotion(third_one_free) == [macbook]
+    pixel.set_promotion(PercentDiscount("30% off!", percent=30))
+    assert store.find_products_on_promotion(third_one_free) == [macbook]
+
+    store.remove_product(pixel)
+    store.add_product(Product("Google Pixel 8", price=700, quantity=3))
+    assert [product.name for product in store.find_low_stock(10)] == \
+        ["Google Pixel 8", "MacBook Air M2"]
+    assert [product.name for product in
+            store.find_products_by_prefix("GOOGLE")] == ["Google Pixel 8"]
+
+
+def test_index_update_tolerates_a_stale_old_value():
+    macbook = Product("MacBook Air M2", price=1450, quantity=5, product_id=1)
+    index = CatalogIndex({1: macbook})
+    # Changed before the index was built, then reported late
+    macbook.set_quantity(3)
+    index.update(macbook, "quantity", 5)
+    assert index.by_quantity(0, 4) == [macbook]
+    macbook.set_quantity(8)
+    index.update(macbook, "quantity", 99)
+    assert index.by_quantity(0, 4) == []
+    assert index.by_quantity(8, 9) == [macbook]
+    index.remove(macbook)
+    assert index.by_price(0, 2000) == []
+
+
+def test_index_built_during_orders_matches_stock():
+    store = Store([Product(f"Item {number}", price=1, quantity=500)
+                   for number in range(8)], thread_safe=True, lock_stripes=4)
+    products = store.products
+
+    def buyer(offset):
+        for turn in range(200):
+            product = products[(offset + turn) % len(products)]
+            store.order([(product, 1)])
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=buyer, args=(offset,))
+                   for offset in range(4)]
+        for thread in threads:
+            thread.start()
+        store.find_low_stock(1000)
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    for product in products:
+        quantity = product.get_quantity()
+        assert product in store.find_low_stock(quantity + 1)
+        assert product not in store.find_low_stock(quantity)
+    assert sum(product.get_quantity() for product in products) == \
+        8 * 500 - 4 * 200
@@ -0,0 +1,71 @@
+import threading
+import pytest
+from changefeed import ChangeFeed, OffsetExpired
+from products import Product
+from promotions import PercentDiscount
+from store import Store
+
+
+def make_store():
+    return Store([Product("MacBook Air M2", price=1450, quantity=3,
+                          product_id=1),
+                  Product("Google Pixel 7", price=500, quantity=2,
+                          product_id=2)])
+
+
+def test_feed_publishes_catalog_changes_in_order():
+    store = make_store()
+    feed = ChangeFeed()
+    feed.attach(store)
+    macbook, pixel = store.products
+    store.order([(macbook, 1), (pixel, 2)])
+    macbook.set_promotion(PercentDiscount("30% off!", percent=30))
+    pixel.set_quantity(5)
+    store.remove_product(macbook)
+    store.add_product(Product("Bose Earbuds", price=250, quantity=1,
+                              product_id=3))
+
+    batch = feed.read(0)
+    assert [(event.product_id, event.kind, event.value)
+            for event in batch.events[:-1]] == [
+        (1, "quantity", 2), (2, "quantity", 0), (2, "active", False),
+        (1, "promotion", "30% off!"), (2, "quantity", 5), (2, "active", True),
+        (1, "removed", None)]
+    assert batch.events[-1].kind == "added"
+    assert [event.sequence for event in batch.events] == list(range(8))
+    assert batch.next_offset == feed.next_offset == 8
+    assert feed.read(batch.next_offset).events == []
+
+    feed.detach(store)
+    pixel.set_quantity(1)
+    assert feed.next_offset == 8
+
+
+def test_consumers_read_in_batches_from_a_bounded_buffer():
+    store = make_store()
+    feed = ChangeFeed(capacity=4)
+    feed.attach(store)
+    pixel = store.get_product(2)
+    for quantity in range(10, 16):
+        pixel.set_quantity(quantity)
+    assert feed.oldest_offset == 2
+    with pytest.raises(OffsetExpired) as error:
+        feed.read(0)
+    assert error.value.oldest_offset == 2
+    batch = feed.read(2, max_events=3)
+    assert [event.value for event in batch.events] == [12, 13, 14]
+    assert feed.read(batch.next_offset).next_offset == 6
+    with pytest.raises(ValueError):
+        feed.read(7)
+
+
+def test_read_waits_for_events():
+    store = make_store()
+    feed = ChangeFeed()
+    feed.attach(store)
+    timer = threading.Timer(0.05, store.get_product(1).set_quantity, [9])
+    timer.start()
+    batch = feed.read(0, timeout=5)
+    timer.join()
+    assert [event.value for event in batch.events] == [9]
+    assert feed.read(1, timeout=0.01).events == []
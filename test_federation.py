@@ -0,0 +1,106 @@
+import pytest
+from federation import Federation, PartialOrderError
+from products import Product, LimitedProduct
+from store import Store
+
+
+def make_federation():
+    stores = {}
+    for name, stock in (("north", 5), ("south", 3), ("east", 0)):
+        stores[name] = Store([
+            Product("MacBook Air M2", price=1450, quantity=stock,
+                    product_id=1),
+            LimitedProduct("Shipping", price=10, quantity=stock, maximum=1,
+                           product_id=2),
+        ])
+    return Federation(stores), stores
+
+
+def test_index_follows_orders_and_catalog_changes():
+    federation, stores = make_federation()
+    assert federation.find_stores(1) == [("north", 5), ("south", 3)]
+    assert federation.find_stores(1, quantity=4) == [("north", 5)]
+
+    south_macbook = stores["south"].get_product(1)
+    stores["south"].order([(south_macbook, 3)])
+    assert federation.find_stores(1) == [("north", 5)]
+    stores["east"].get_product(1).set_quantity(2)
+    assert federation.get_available_quantity(1) == 7
+
+    stores["north"].remove_product(stores["north"].get_product(1))
+    stores["south"].add_product(Product("Pixel 7", price=500, quantity=4,
+                                        product_id=3))
+    assert federation.find_stores(1) == [("east", 2)]
+    assert federation.find_stores(3) == [("south", 4)]
+
+    federation.remove_store("south")
+    assert federation.find_stores(3) == []
+    with pytest.raises(ValueError):
+        federation.add_store("north", Store())
+
+
+def test_order_goes_to_one_store_when_possible():
+    federation, stores = make_federation()
+    result = federation.order([(1, 2), (2, 1)])
+    assert result.total == 2910
+    assert [shipment.store_name for shipment in result.shipments] == \
+        ["north"]
+    assert stores["north"].get_product(1).get_quantity() == 3
+    with pytest.raises(ValueError):
+        federation.order([(1, 1), (99, 1)])
+
+
+def test_split_order_buys_nothing_unless_all_stores_hold_their_part():
+    federation, stores = make_federation()
+    result = federation.order([(1, 7)])
+    assert result.total == 7 * 1450
+    assert [(shipment.store_name, shipment.shopping_list[0][1])
+            for shipment in result.shipments] == [("north", 5), ("south", 2)]
+    assert federation.get_available_quantity(1) == 1
+
+    with pytest.raises(ValueError):
+        federation.order([(1, 2)], split=False)
+    with pytest.raises(ValueError):
+        federation.order([(1, 1), (2, 2)])
+    assert federation.get_available_quantity(1) == 1
+    assert federation.get_available_quantity(2) == 8
+
+
+def test_failed_commit_reports_the_parts_placed():
+    federation, stores = make_federation()
+
+    def expired(token):
+        stores["south"].release(token)
+        raise ValueError("Hold not found or expired")
+
+    stores["south"].commit = expired
+    with pytest.raises(PartialOrderError) as error:
+        federation.order([(1, 7)])
+    assert [(shipment.store_name, shipment.shopping_list[0][1])
+            for shipment in error.value.shipments] == [("north", 5)]
+    assert stores["north"].get_product(1).get_quantity() == 0
+    assert federation.get_available_quantity(1) == 3
+
+
+def test_expired_holds_dont_hide_the_parts_placed():
+    now = [0.0]
+    stores = {name: Store([Product("MacBook Air M2", price=1450,
+                                   quantity=stock, product_id=1)],
+                          clock=lambda: now[0])
+              for name, stock in (("north", 5), ("south", 3), ("east", 2))}
+    federation = Federation(stores, hold_ttl=10)
+    commit = stores["north"].commit
+
+    def slow_commit(token):
+        total = commit(token)
+        now[0] += 60  # The other holds expire, and are reclaimed
+        for name in ("south", "east"):
+            stores[name].get_available_quantity(stores[name].get_product(1))
+        return total
+
+    stores["north"].commit = slow_commit
+    with pytest.raises(PartialOrderError) as error:
+        federation.order([(1, 9)])
+    assert [shipment.store_name for shipment in error.value.shipments] == \
+        ["north"]
+    assert federation.get_available_quantity(1) == 5
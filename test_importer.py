@@ -0,0 +1,68 @@
+import json
+from products import Product, NonStockedProduct, LimitedProduct
+from promotions import ThirdOneFree
+from store import Store
+from importer import import_feed
+
+
+def test_csv_feed_creates_products_and_reports_bad_rows(tmp_path):
+    feed = tmp_path / "feed.csv"
+    feed.write_text(
+        "product_id,name,price,quantity,type,maximum,promotion\n"
+        "1,MacBook Air M2,1450,100,,,\n"
+        "2,Windows License,125,,non_stocked,,\n"
+        "3,Shipping,10,250,limited,1,\n"
+        "4,,10,5,,,\n"
+        "5,Pixel,-1,5,,,\n"
+        "6,Earbuds,250,500,,,Third One Free!\n"
+        "7,Broken,abc,5,,,\n")
+    store = Store()
+    report = import_feed(store, feed, chunk_size=2,
+                         promotions={"Third One Free!":
+                                     ThirdOneFree("Third One Free!")})
+    assert (report.rows, report.created, report.updated) == (7, 4, 0)
+    assert [row for row, _ in report.errors] == [4, 5, 7]
+    assert isinstance(store.get_product(2), NonStockedProduct)
+    assert store.get_product(3).maximum == 1
+    assert store.get_product(6).promotion.name == "Third One Free!"
+    assert store.get_total_quantity() == 100 + 1 + 250 + 500
+
+
+def test_jsonl_feed_upserts_existing_products(tmp_path):
+    store = Store([Product("MacBook Air M2", price=1450, quantity=0,
+                           product_id=1),
+                   LimitedProduct("Shipping", price=10, quantity=250,
+                                  maximum=1)])
+    feed = tmp_path / "feed.jsonl"
+    rows = [{"product_id": 1, "name": "MacBook Air M2", "price": 1350,
+             "quantity": 40},
+            {"name": "Shipping", "price": 12, "quantity": 300,
+             "type": "limited", "maximum": 1},
+            {"product_id": 9, "name": "Google Pixel 7", "price": 500,
+             "quantity": 250}]
+    feed.write_text("\n".join(json.dumps(row) for row in rows) + "\nnot json\n")
+    report = import_feed(store, feed)
+    assert (report.created, report.updated) == (1, 2)
+    assert report.errors == [(4, "Row is not an object")]
+    macbook = store.get_product(1)
+    assert (macbook.price, macbook.quantity, macbook.is_active) == \
+        (1350, 40, True)
+    assert store.find_products("Shipping")[0].price == 12
+    assert store.get_total_quantity() == 40 + 300 + 250
+    assert store.get_stock_value() == 40 * 1350 + 300 * 12 + 250 * 500
+
+
+def test_jsonl_rows_with_non_text_fields_are_rejected(tmp_path):
+    feed = tmp_path / "feed.jsonl"
+    rows = [{"name": "MacBook Air M2", "price": 1450, "quantity": 100},
+            {"name": 5, "price": 1, "quantity": 1},
+            {"name": "Pixel", "price": 500, "quantity": 3, "type": 1},
+            {"name": "Earbuds", "price": 250, "quantity": 5,
+             "promotion": ["Third One Free!"]}]
+    feed.write_text("\n".join(json.dumps(row) for row in rows) + "\n")
+    store = Store()
+    report = import_feed(store, feed, chunk_size=1)
+    assert report.created == 1
+    assert report.errors == [(2, "Invalid name: 5"), (3, "Invalid type: 1"),
+                             (4, "Invalid promotion: ['Third One Free!']")]
+    assert [product.name for product in store.products] == ["MacBook Air M2"]
@@ -0,0 +1,162 @@
+import pytest
+import threading
+from products import Product, LimitedProduct
+from promotions import SecondHalfPrice
+from snapshot import write_snapshot
+from journal import OrderJournal, read_journal, open_durable_store
+
+
+def make_files(tmp_path):
+    macbook = Product("MacBook Air M2", price=1450, quantity=100,
+                      product_id=1)
+    macbook.set_promotion(SecondHalfPrice("Second Half price!"))
+    shipping = LimitedProduct("Shipping", price=10, quantity=250, maximum=1,
+                              product_id=2)
+    snapshot_path = str(tmp_path / "store.snap")
+    journal_path = str(tmp_path / "orders.journal")
+    write_snapshot([macbook, shipping], snapshot_path)
+    return snapshot_path, journal_path
+
+
+def test_orders_survive_a_crash(tmp_path):
+    snapshot_path, journal_path = make_files(tmp_path)
+    store = open_durable_store(snapshot_path, journal_path)
+    assert store.order([(store.get_product(1), 2),
+                        (store.get_product(2), 1)]) == 2185
+    store.order([(store.get_product(1), 1)])
+    # No close(): committed orders must already be on disk
+    assert [sequence for sequence, _ in read_journal(journal_path)] == [1, 2]
+    assert list(read_journal(journal_path))[0][1] == [
+        [1, 2, 2175.0, "Second Half price!"], [2, 1, 10, None]]
+
+    recovered = open_durable_store(snapshot_path, journal_path)
+    assert recovered.get_product(1).get_quantity() == 97
+    assert recovered.get_product(2).get_quantity() == 249
+    recovered.order([(recovered.get_product(1), 1)])
+    assert [sequence for sequence, _ in read_journal(journal_path)] == \
+        [1, 2, 3]
+
+
+def test_checkpoint_compacts_the_journal(tmp_path):
+    snapshot_path, journal_path = make_files(tmp_path)
+    store = open_durable_store(snapshot_path, journal_path,
+                               checkpoint_every=2)
+    for _ in range(3):
+        store.order([(store.get_product(1), 1)])
+    assert [sequence for sequence, _ in read_journal(journal_path)] == [3]
+
+    recovered = open_durable_store(snapshot_path, journal_path)
+    assert recovered.get_product(1).get_quantity() == 97
+    recovered.order([(recovered.get_product(1), 1)])
+    assert [sequence for sequence, _ in read_journal(journal_path)] == [3, 4]
+
+
+def test_torn_record_is_ignored(tmp_path):
+    snapshot_path, journal_path = make_files(tmp_path)
+    journal = OrderJournal(journal_path)
+    journal.append([[1, 5, 7250.0, None]])
+    journal.close()
+    with open(journal_path, "ab") as journal_file:
+        journal_file.write(b'{"seq":2,"lines":[[1,')
+    store = open_durable_store(snapshot_path, journal_path)
+    assert store.get_product(1).get_quantity() == 95
+
+
+def test_group_commit_keeps_every_concurrent_order(tmp_path):
+    snapshot_path, journal_path = make_files(tmp_path)
+    store = open_durable_store(snapshot_path, journal_path, thread_safe=True)
+    macbook = store.get_product(1)
+
+    def buyer():
+        for _ in range(20):
+            store.order([(macbook, 1)])
+
+    threads = [threading.Thread(target=buyer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sequences = [sequence for sequence, _ in read_journal(journal_path)]
+    assert sorted(sequences) == list(range(1, 81))
+    recovered = open_durable_store(snapshot_path, journal_path)
+    assert recovered.get_product(1).get_quantity() == 20
+
+
+def test_orders_after_a_torn_record_survive_recovery(tmp_path):
+    snapshot_path, journal_path = make_files(tmp_path)
+    journal = OrderJournal(journal_path)
+    journal.append([[1, 5, 7250.0, None]])
+    journal.close()
+    with open(journal_path, "ab") as journal_file:
+        journal_file.write(b'{"seq":2,"lines":[[1,')
+    store = open_durable_store(snapshot_path, journal_path)
+    assert store.get_product(1).get_quantity() == 95
+    for _ in range(3):
+        store.order([(store.get_product(1), 1)])
+    recovered = open_durable_store(snapshot_path, journal_path)
+    assert recovered.get_product(1).get_quantity() == 92
+    assert [sequence for sequence, _ in read_journal(journal_path)] == \
+        [1, 2, 3, 4]
+
+
+def test_failed_checkpoint_does_not_fail_the_order(tmp_path, monkeypatch):
+    snapshot_path, journal_path = make_files(tmp_path)
+    with pytest.raises(ValueError):
+        OrderJournal(journal_path, checkpoint_every=1)
+    store = open_durable_store(snapshot_path, journal_path,
+                               checkpoint_every=1)
+    macbook = store.get_product(1)
+
+    def fail(*args):
+        raise OSError("Disk full")
+
+    monkeypatch.setattr("snapshot.write_snapshot", fail)
+    with pytest.warns(RuntimeWarning):
+        store.order([(macbook, 1)])
+    assert macbook.get_quantity() == 99
+    monkeypatch.undo()
+    store.order([(macbook, 1)])
+    assert [sequence for sequence, _ in read_journal(journal_path)] == []
+
+
+def test_failed_write_raises_to_every_waiter_and_is_retried(tmp_path,
+                                                            monkeypatch):
+    import os
+    _, journal_path = make_files(tmp_path)
+    journal = OrderJournal(journal_path)
+    first = journal.write([[1, 1, 1450.0, None]])
+    second = journal.write([[2, 1, 10, None]])
+    syncing = threading.Event()
+    fail_now = threading.Event()
+
+    def failing_fsync(descriptor):
+        syncing.set()
+        fail_now.wait(5)
+        raise OSError("Disk full")
+
+    monkeypatch.setattr(os, "fsync", failing_fsync)
+    errors = []
+
+    def waiter(sequence):
+        try:
+            journal.wait(sequence)
+        except OSError:
+            errors.append(sequence)
+
+    flusher = threading.Thread(target=waiter, args=(first,))
+    flusher.start()
+    syncing.wait(5)
+    other = threading.Thread(target=waiter, args=(second,))
+    other.start()
+    other.join(0.1)
+    fail_now.set()
+    flusher.join()
+    other.join()
+    assert sorted(errors) == [first, second]
+    assert list(read_journal(journal_path)) == []
+
+    monkeypatch.undo()
+    journal.wait(second)
+    assert [sequence for sequence, _ in read_journal(journal_path)] == \
+        [first, second]
+    journal.close()
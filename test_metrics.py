@@ -0,0 +1,101 @@
+import json
+import urllib.request
+import pytest
+from metrics import CheckoutMetrics, MetricsRegistry
+from products import Product, LimitedProduct, PurchaseError, OVER_MAXIMUM
+from promotions import PercentDiscount
+from store import Store
+
+
+def make_store(metrics):
+    macbook = Product("MacBook Air M2", price=1450, quantity=10)
+    macbook.set_promotion(PercentDiscount("30% off!", percent=30))
+    shipping = LimitedProduct("Shipping", price=10, quantity=250, maximum=1)
+    return Store([macbook, shipping], metrics=metrics), macbook, shipping
+
+
+def test_store_records_orders_and_rejections_by_cause():
+    metrics = CheckoutMetrics()
+    store, macbook, shipping = make_store(metrics)
+    store.order([(macbook, 2), (shipping, 1)])
+    with pytest.raises(PurchaseError) as error:
+        store.order([(shipping, 2)])
+    assert error.value.cause == OVER_MAXIMUM
+    with pytest.raises(ValueError):
+        store.order([(macbook, 100)])
+    with pytest.raises(ValueError):
+        store.order([(Product("Stranger", price=1, quantity=1), 1)])
+    store.order_many([[(macbook, 1)], [(shipping, 5)]])
+
+    assert metrics.orders.total() == 2
+    assert metrics.order_seconds.count == 1
+    assert metrics.order_lines.count == 2
+    rejections = metrics.rejections
+    assert rejections.get(("over_maximum",)) == 2
+    assert rejections.get(("out_of_stock",)) == 1
+    assert rejections.get(("unknown_product",)) == 1
+    assert metrics.promotion_hit_rates() == {"30% off!": 2 / 3}
+
+
+def test_store_records_committed_holds():
+    metrics = CheckoutMetrics()
+    store, macbook, shipping = make_store(metrics)
+    token = store.reserve([(macbook, 2), (shipping, 1)], ttl=30)
+    store.commit(token)
+    with pytest.raises(ValueError):
+        store.commit(token)
+    token = store.reserve([(macbook, 1)], ttl=30)
+    store.remove_product(macbook)
+    with pytest.raises(PurchaseError):
+        store.commit(token)
+
+    assert metrics.orders.total() == 1
+    assert metrics.order_seconds.count == 1
+    assert metrics.order_lines.count == 1
+    assert metrics.rejections.get(("other",)) == 1
+    assert metrics.rejections.get(("unknown_product",)) == 1
+    assert metrics.promotion_hit_rates() == {"30% off!": 1 / 2}
+
+
+def test_product_buy_metrics_are_class_wide_and_off_by_default():
+    product = Product("Test Product", price=10.0, quantity=5)
+    product.buy(1)
+    metrics = CheckoutMetrics()
+    Product.metrics = metrics
+    try:
+        product.buy(1)
+        with pytest.raises(ValueError):
+            product.buy(10)
+    finally:
+        Product.metrics = None
+    product.buy(1)
+    assert metrics.buys.total() == 1
+    assert metrics.rejections.get(("out_of_stock",)) == 1
+
+
+def test_registry_exports_prometheus_and_json(tmp_path):
+    registry = MetricsRegistry()
+    metrics = CheckoutMetrics(registry)
+    store, macbook, _ = make_store(metrics)
+    store.order([(macbook, 1)])
+
+    text = registry.to_prometheus()
+    assert "# TYPE store_orders_total counter" in text
+    assert "store_orders_total 1" in text
+    assert 'checkout_promotion_lines_total{promotion="30% off!"} 1' in text
+    assert 'store_order_seconds_bucket{le="+Inf"} 1' in text
+    with pytest.raises(ValueError):
+        registry.counter("store_orders_total", "Again")
+
+    registry.write(str(tmp_path / "metrics.json"))
+    data = json.loads((tmp_path / "metrics.json").read_text())
+    assert data["metrics"]["store_order_lines"]["count"] == 1
+
+    server = registry.serve()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url) as response:
+            assert response.read().decode() == registry.to_prometheus()
+    finally:
+        server.shutdown()
+        server.server_close()
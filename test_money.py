@@ -0,0 +1,113 @@
+import random
+from decimal import Decimal
+import pytest
+import money
+from products import Product, NonStockedProduct
+from promotions import PercentDiscount, SecondHalfPrice, ThirdOneFree
+from store import Store
+
+# Property tests: random cases from a fixed seed, checked against Decimal
+CASES = 2000
+
+
+def reference_round(numerator, denominator, rounding):
+    return int((Decimal(numerator) / Decimal(denominator))
+               .to_integral_value(rounding=rounding))
+
+
+@pytest.mark.parametrize("rounding", money.ROUNDING_POLICIES)
+def test_integer_division_matches_decimal(rounding):
+    rng = random.Random(rounding)
+    for _ in range(CASES):
+        numerator = rng.randint(-10 ** 9, 10 ** 9)
+        denominator = rng.choice([2, 3, 100, 10000, rng.randint(1, 999)])
+        expected = reference_round(numerator, denominator, rounding)
+        assert money.divide(numerator, denominator, rounding) == expected
+        if numerator >= 0:
+            assert money.divider(denominator, rounding)(numerator) == \
+                expected
+
+
+def test_cents_conversions():
+    assert money.to_cents(0.1) + money.to_cents(0.2) == money.to_cents(0.3)
+    assert money.to_cents(1450) == 145000
+    assert money.to_cents("19.995") == 2000
+    assert money.to_cents("19.995", money.ROUND_DOWN) == 1999
+    assert money.format_cents(123456) == "$1234.56"
+    assert money.format_cents(-5) == "-$0.05"
+
+
+@pytest.mark.parametrize("rounding", money.ROUNDING_POLICIES)
+def test_promotions_in_cents_match_exact_arithmetic(rounding):
+    rng = random.Random(f"promotions-{rounding}")
+    for _ in range(CASES):
+        price_cents = rng.randint(0, 500000)
+        quantity = rng.randint(1, 50)
+        product = Product("Test Product", price=price_cents / 100,
+                          quantity=100)
+
+        percent = PercentDiscount("Sale", percent=rng.randint(0, 10000) / 100)
+        percent.rounding = rounding
+        product.set_promotion(percent)
+        kept = 10000 - money.to_cents(percent.percent)
+        assert product.get_price_cents(quantity) == reference_round(
+            quantity * price_cents * kept, 10000, rounding)
+
+        second_half = SecondHalfPrice("Second Half price!")
+        second_half.rounding = rounding
+        product.set_promotion(second_half)
+        full = quantity // 2 if quantity >= 2 else quantity
+        half_cents = reference_round((quantity - full) * price_cents, 2,
+                                     rounding) if quantity >= 2 else 0
+        assert product.get_price_cents(quantity) == \
+            full * price_cents + half_cents
+
+        product.set_promotion(ThirdOneFree("Third One Free!"))
+        assert product.get_price_cents(quantity) == \
+            quantity // 3 * 2 * price_cents
+
+
+def test_cents_prices_stay_within_a_cent_of_float_prices():
+    rng = random.Random("float")
+    promotions = [None, PercentDiscount("30% off!", percent=30),
+                  SecondHalfPrice("Second Half price!"),
+                  ThirdOneFree("Third One Free!")]
+    for _ in range(CASES):
+        product = Product("Test Product", price=rng.randint(0, 10 ** 6) / 100,
+                          quantity=100)
+        promotion = rng.choice(promotions)
+        if promotion:
+            product.set_promotion(promotion)
+        quantity = rng.randint(1, 20)
+        assert abs(product.get_price_cents(quantity) -
+                   product.get_price(quantity) * 100) <= 0.5 + 1e-6
+
+
+def test_cents_store_totals_are_exact():
+    rng = random.Random("store")
+    catalog = [Product(f"Product {index}", price=rng.randint(1, 99999) / 100,
+                       quantity=10 ** 6) for index in range(20)]
+    catalog.append(NonStockedProduct("Windows License", price=125.99))
+    for product, promotion in zip(catalog, [
+            PercentDiscount("15% off", percent=15),
+            SecondHalfPrice("Second Half price!"),
+            ThirdOneFree("Third One Free!")]):
+        product.set_promotion(promotion)
+    store = Store(catalog, money="cents")
+    orders = [[(rng.choice(catalog), rng.randint(1, 9))
+               for _ in range(rng.randint(1, 6))] for _ in range(300)]
+
+    totals = [store.order(shopping_list) for shopping_list in orders]
+    assert all(isinstance(total, int) for total in totals)
+    assert totals == [sum(product.get_price_cents(quantity)
+                          for product, quantity in shopping_list)
+                      for shopping_list in orders]
+    assert store.order_many(orders).totals == totals
+
+
+def test_cents_mode_rejects_promotion_engine():
+    from promotion_engine import PromotionEngine
+    with pytest.raises(ValueError):
+        Store(money="cents", promotion_engine=PromotionEngine())
+    with pytest.raises(ValueError):
+        Store(money="decimal")
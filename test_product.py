@@ -1,5 +1,6 @@
 import pytest
 from products import Product
+from promotions import PercentDiscount
 
 
 def test_create_normal_product():
@@ -45,3 +46,17 @@ def test_buying_larger_quantity_than_exists_invokes_exception():
     product = Product("Test Product", price=10.0, quantity=5)
     with pytest.raises(ValueError):
         product.buy(6)
+
+
+def test_show_string_is_cached_until_product_changes():
+    # Test that show() reformats after stock, price or promotion changes
+    product = Product("Test Product", price=10.0, quantity=5)
+    assert product.show() is product.show()
+    product.buy(2)
+    assert "Quantity: 3" in product.show()
+    product.set_price(12.5)
+    assert "Price: $12.50" in product.show()
+    product.set_promotion(PercentDiscount("30% off!", percent=30))
+    assert product.show().endswith("(Promotion: 30% off!)")
+    product.remove_promotion()
+    assert "Promotion" not in product.show()
@@ -0,0 +1,66 @@
+import pytest
+from products import Product, NonStockedProduct, LimitedProduct
+from promotions import ThirdOneFree
+from product_table import (ProductTable, KIND_NON_STOCKED, KIND_LIMITED)
+from store import Store
+
+
+def test_products_use_slots():
+    product = LimitedProduct("Shipping", price=10, quantity=250, maximum=1)
+    assert not hasattr(product, "__dict__")
+    with pytest.raises(AttributeError):
+        product.colour = "red"
+
+
+def test_views_behave_like_products():
+    table = ProductTable()
+    table.append("Bose QuietComfort Earbuds", price=250, quantity=5,
+                 promotion=ThirdOneFree("Third One Free!"))
+    table.append("Windows License", price=125, quantity=0,
+                 kind=KIND_NON_STOCKED)
+    table.append("Shipping", price=10, quantity=250, kind=KIND_LIMITED,
+                 maximum=1)
+    earbuds, license_, shipping = table
+    assert isinstance(earbuds, Product)
+    assert isinstance(license_, NonStockedProduct)
+    assert isinstance(shipping, LimitedProduct)
+
+    assert earbuds.buy(3) == 500
+    assert table.quantities[0] == 2
+    assert license_.buy(4) == 125
+    with pytest.raises(ValueError):
+        shipping.buy(2)
+    assert earbuds.buy(2) == 0
+    assert not earbuds.is_active
+
+
+def test_store_accepts_views():
+    table = ProductTable()
+    table.add(Product("MacBook Air M2", price=1450, quantity=100))
+    table.add(LimitedProduct("Shipping", price=10, quantity=250, maximum=1))
+    store = Store(list(table))
+    macbook, shipping = store.products
+    assert store.order([(macbook, 2), (shipping, 1)]) == 2910
+    assert store.get_total_quantity() == 98 + 249
+    with pytest.raises(NameError):
+        table.append("", price=1, quantity=1)
+
+
+def test_store_observes_whole_table():
+    table = ProductTable()
+    macbook = table.add(Product("MacBook Air M2", price=1450, quantity=100))
+    changes = []
+    macbook.add_observer(lambda product, field, old: changes.append(old))
+    table.add(Product("Google Pixel 7", price=500, quantity=250))
+    store = Store()
+    macbook, pixel = store.add_table(table)
+    assert store.products == [macbook, pixel]
+    assert not table._observers.keys() - {macbook._row}
+    store.order([(macbook, 2), (pixel, 10)])
+    assert changes == [100]
+    assert store.get_total_quantity() == 98 + 240
+    store.remove_product(pixel)
+    pixel.set_quantity(1)
+    assert store.get_total_quantity() == 98
+    with pytest.raises(ValueError):
+        store.add_table(table)
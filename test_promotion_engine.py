@@ -0,0 +1,74 @@
+import pytest
+from products import Product, NonStockedProduct
+from promotions import PercentDiscount, SecondHalfPrice, ThirdOneFree
+from promotion_engine import (PromotionEngine, ProductRule,
+                              CartPercentDiscount, CartAmountDiscount)
+from store import Store
+
+
+def make_products():
+    return (Product("MacBook Air M2", price=1000, quantity=100),
+            Product("Bose QuietComfort Earbuds", price=300, quantity=500),
+            NonStockedProduct("Windows License", price=100))
+
+
+def test_rules_stack_across_groups_and_pick_best_within_group():
+    macbook, earbuds, _ = make_products()
+    engine = PromotionEngine()
+    engine.set_category(earbuds, "audio")
+    engine.add_rule(ProductRule(PercentDiscount("10% off", percent=10),
+                                [macbook], group="percent"))
+    engine.add_rule(ProductRule(PercentDiscount("20% off", percent=20),
+                                [macbook], group="percent"))
+    engine.add_rule(ProductRule(ThirdOneFree("Third One Free!"),
+                                categories=["audio"], group="multibuy"))
+    engine.add_rule(ProductRule(PercentDiscount("5% off audio", percent=5),
+                                categories=["audio"], group="percent"))
+
+    macbook_line = engine.price_line(macbook, 2)
+    assert macbook_line.price == 1600
+    assert macbook_line.rules == ("20% off",)
+    earbuds_line = engine.price_line(earbuds, 3)
+    assert earbuds_line.price == pytest.approx(600 * 0.95)
+    assert set(earbuds_line.rules) == {"Third One Free!", "5% off audio"}
+
+
+def test_exclusive_rule_wins_only_when_cheaper():
+    macbook, _, _ = make_products()
+    engine = PromotionEngine()
+    engine.add_rule(ProductRule(PercentDiscount("10% off", percent=10),
+                                [macbook]))
+    engine.add_rule(ProductRule(SecondHalfPrice("Second Half price!"),
+                                [macbook], exclusive=True))
+    assert engine.price_line(macbook, 1).rules == ("10% off",)
+    line = engine.price_line(macbook, 4)
+    assert (line.price, line.rules) == (3000, ("Second Half price!",))
+
+
+def test_products_own_promotion_stacks_with_rules():
+    macbook, _, _ = make_products()
+    macbook.set_promotion(ThirdOneFree("Third One Free!"))
+    engine = PromotionEngine()
+    assert engine.price_line(macbook, 3).price == 2000
+    engine.add_rule(ProductRule(PercentDiscount("50% off", percent=50),
+                                [macbook]))
+    assert engine.price_line(macbook, 3).price == pytest.approx(1000)
+
+
+def test_cart_rules_apply_to_store_orders():
+    macbook, earbuds, windows = make_products()
+    engine = PromotionEngine()
+    engine.add_rule(CartPercentDiscount("10% over $2000", percent=10,
+                                        minimum_total=2000))
+    engine.add_rule(CartAmountDiscount("$50 off", amount=50))
+    engine.add_rule(CartAmountDiscount("$500 off, alone", amount=500,
+                                       minimum_total=3000, exclusive=True))
+    store = Store([macbook, earbuds, windows], promotion_engine=engine)
+
+    assert store.order([(earbuds, 1)]) == 250
+    assert store.order([(macbook, 2), (windows, 1)]) == \
+        pytest.approx(2100 * 0.9 - 50)
+    assert store.order([(macbook, 3), (earbuds, 1)]) == 2800
+    assert macbook.get_quantity() == 95
+    assert store.order_many([[(earbuds, 1)], [(macbook, 3)]]).totals == \
+        [250, 2500]
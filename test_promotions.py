@@ -0,0 +1,40 @@
+import pytest
+from products import Product, NonStockedProduct
+from promotions import PercentDiscount, SecondHalfPrice, ThirdOneFree
+
+PROMOTIONS = [PercentDiscount("30% off!", percent=30),
+              PercentDiscount("12.5% off!", percent=12.5),
+              SecondHalfPrice("Second Half price!"),
+              ThirdOneFree("Third One Free!")]
+
+
+@pytest.mark.parametrize("promotion", PROMOTIONS)
+def test_compiled_pricing_matches_apply_promotion(promotion):
+    product = Product("Test Product", price=13.37, quantity=100)
+    product.set_promotion(promotion)
+    quantities = list(range(1, 40))
+    expected = [promotion.apply_promotion(product, quantity)
+                for quantity in quantities]
+    assert [product.get_price(quantity) for quantity in quantities] == \
+        expected
+    assert promotion.apply_promotion_many(product, quantities) == expected
+
+
+def test_compiled_pricing_follows_price_and_promotion_changes():
+    product = Product("Test Product", price=10.0, quantity=100)
+    assert product.get_price(3) == 30
+    product.set_promotion(ThirdOneFree("Third One Free!"))
+    assert product.get_price(3) == 20
+    product.set_price(20.0)
+    assert product.get_price(3) == 40
+    product.set_promotion(PercentDiscount("50% off!", percent=50))
+    assert product.get_price(3) == 30
+    product.remove_promotion()
+    assert product.get_price(3) == 60
+
+
+def test_non_stocked_product_price_is_fixed():
+    license_ = NonStockedProduct("Windows License", price=125)
+    assert license_.buy(3) == 125
+    license_.set_promotion(PercentDiscount("30% off!", percent=30))
+    assert license_.buy(2) == 175
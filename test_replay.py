@@ -0,0 +1,44 @@
+import pytest
+from products import Product
+from replay import (ScriptedConsole, generate_sessions, load_sessions,
+                    run_session, run_sessions, save_sessions)
+from store import Store
+
+
+def make_store():
+    return Store([Product(f"Product {index}", price=10, quantity=100)
+                  for index in range(25)], thread_safe=True)
+
+
+def test_scripted_session_drives_the_menu():
+    store = make_store()
+    console = run_session(store, [["list"], ["total"],
+                                  ["order", [[1, 2], [23, 1], [99, 1]]]])
+    assert store.products[0].get_quantity() == 98
+    # Product 23 is on the second page of the order listing
+    assert store.products[22].get_quantity() == 99
+    assert sorted(console.timings) == ["list", "order", "total"]
+    assert console.output_lines > 25
+
+
+def test_parallel_sessions_report_latency_and_final_stock(tmp_path):
+    store = make_store()
+    sessions = generate_sessions(20, product_count=25, seed=1)
+    save_sessions(tmp_path / "sessions.jsonl", sessions)
+    assert load_sessions(tmp_path / "sessions.jsonl") == sessions
+
+    report = run_sessions(store, sessions, workers=4)
+    ordered = sum(quantity for actions in sessions for action in actions
+                  if action[0] == "order" for _, quantity in action[1])
+    assert report["total_quantity"] == 25 * 100 - ordered
+    assert sum(report["stock"].values()) == report["total_quantity"]
+    assert report["actions"]["order"]["count"] == sum(
+        action[0] == "order" for actions in sessions for action in actions)
+
+
+def test_unknown_prompts_end_the_session():
+    console = ScriptedConsole([])
+    with pytest.raises(EOFError):
+        console.input("Something else? ")
+    with pytest.raises(ValueError):
+        ScriptedConsole([["checkout"]])
@@ -0,0 +1,90 @@
+import math
+import pytest
+from products import Product, NonStockedProduct
+from restock import RestockPlanner
+from store import Store
+
+
+def make_store_and_planner(now):
+    store = Store([Product("MacBook Air M2", price=1450, quantity=100),
+                   Product("Google Pixel 7", price=500, quantity=100),
+                   NonStockedProduct("Windows License", price=125)])
+    planner = RestockPlanner(half_life=3600, clock=lambda: now[0])
+    planner.attach(store)
+    return store, planner
+
+
+def test_rates_decay_with_half_life():
+    now = [0.0]
+    store, planner = make_store_and_planner(now)
+    macbook, pixel, _ = store.products
+    store.order([(macbook, 10), (pixel, 2)])
+    store.order_many([[(macbook, 10)], [(pixel, 1000)]])
+    rate = planner.get_rate(macbook)
+    assert rate == pytest.approx(20 / (3600 / math.log(2)))
+    assert planner.get_rate(pixel) == pytest.approx(rate / 10)
+    now[0] = 3600.0
+    assert planner.get_rate(macbook) == pytest.approx(rate / 2)
+
+    planner.detach(store)
+    store.order([(macbook, 10)])
+    assert planner.get_rate(macbook) == pytest.approx(rate / 2)
+
+
+def test_landmark_moves_without_changing_rates():
+    now = [0.0]
+    store, planner = make_store_and_planner(now)
+    macbook = store.products[0]
+    planner.MAX_EXPONENT = 1.0
+    store.order([(macbook, 4)])
+    now[0] = 3600.0 * 3
+    store.order([(macbook, 1)])
+    tau = 3600 / math.log(2)
+    assert planner.get_rate(macbook) == pytest.approx((4 / 8 + 1) / tau)
+
+
+def test_plan_suggests_products_running_out_within_horizon():
+    now = [0.0]
+    store, planner = make_store_and_planner(now)
+    macbook, pixel, license = store.products
+    store.order([(macbook, 60), (pixel, 1), (license, 5)])
+
+    forecasts = planner.forecast(store.products)
+    assert [forecast.product for forecast in forecasts] == [macbook, pixel]
+    macbook_rate = forecasts[0].rate
+    assert forecasts[0].seconds_to_stockout == pytest.approx(
+        40 / macbook_rate)
+
+    horizon = 45 / macbook_rate
+    suggestions = planner.plan(store.products, lead_time=horizon / 3,
+                               coverage=horizon * 2 / 3)
+    assert len(suggestions) == 1
+    assert suggestions[0].forecast.product is macbook
+    assert suggestions[0].reorder_quantity == 5
+    with pytest.raises(ValueError):
+        planner.plan(store.products, lead_time=-1, coverage=0)
+
+
+def test_forecast_is_consistent_with_a_concurrent_landmark_move():
+    now = [0.0]
+    store, planner = make_store_and_planner(now)
+    macbook, pixel, _ = store.products
+    planner.MAX_EXPONENT = 1.0
+    store.order([(macbook, 4)])
+    armed = [True]
+
+    def clock():
+        if armed[0]:
+            # Another thread's order moves the landmark as the forecast
+            # reads the time
+            armed[0] = False
+            store.order([(pixel, 1)])
+        return now[0]
+
+    now[0] = 3600.0 * 3
+    planner._clock = clock
+    tau = 3600 / math.log(2)
+    forecast = {item.product: item.rate for item in planner.forecast(
+        store.products)}
+    assert forecast[macbook] == pytest.approx(4 / 8 / tau)
+    assert forecast[pixel] == pytest.approx(1 / tau)
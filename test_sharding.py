@@ -0,0 +1,43 @@
+import pytest
+from products import Product, NonStockedProduct
+from promotions import SecondHalfPrice
+from sharding import ShardedStore
+
+
+def make_catalog():
+    catalog = [Product(f"Product {index}", price=10, quantity=5,
+                       product_id=index) for index in range(4)]
+    catalog[1].set_promotion(SecondHalfPrice("Second Half price!"))
+    catalog.append(NonStockedProduct("Windows License", price=125,
+                                     product_id=4))
+    return catalog
+
+
+def test_orders_within_and_across_shards():
+    catalog = make_catalog()
+    with ShardedStore(catalog, shards=2) as store:
+        assert store.order([(catalog[0], 2), (catalog[2], 1)]) == 30
+        assert store.order([(catalog[0], 1), (catalog[1], 2),
+                            (catalog[4], 1)]) == 10 + 15 + 125
+        assert store.get_quantity(catalog[0]) == 2
+        assert store.get_quantity(catalog[1]) == 3
+        assert store.get_total_quantity() == 2 + 3 + 4 + 5 + 1
+
+
+def test_cross_shard_order_is_all_or_nothing():
+    catalog = make_catalog()
+    with ShardedStore(catalog, shards=2) as store:
+        with pytest.raises(ValueError):
+            store.order([(catalog[0], 2), (catalog[1], 6)])
+        assert store.get_quantity(catalog[0]) == 5
+        assert store.get_quantity(catalog[1]) == 5
+
+        stranger = Product("Product 0", price=10, quantity=5)
+        results = store.order_batch([[(catalog[0], 5), (catalog[1], 1)],
+                                     [(catalog[0], 1), (catalog[3], 1)],
+                                     [(stranger, 1)]])
+        assert results[0] == 60
+        assert isinstance(results[1], ValueError)
+        assert isinstance(results[2], ValueError)
+        assert store.get_quantity(catalog[3]) == 5
+        assert store.get_total_quantity() == 0 + 4 + 5 + 5 + 1
@@ -0,0 +1,67 @@
+import pytest
+from products import Product, NonStockedProduct, LimitedProduct
+from promotions import PercentDiscount, SecondHalfPrice
+from snapshot import write_snapshot, open_snapshot
+from store import Store
+import main
+
+
+def make_products():
+    macbook = Product("MacBook Air M2", price=1450, quantity=100,
+                      product_id=30)
+    macbook.set_promotion(SecondHalfPrice("Second Half price!"))
+    windows = NonStockedProduct("Windows License", price=125, product_id=10)
+    windows.set_promotion(PercentDiscount("30% off!", percent=30))
+    shipping = LimitedProduct("Shipping", price=10, quantity=250, maximum=1,
+                              product_id=20)
+    return [macbook, windows, shipping]
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = tmp_path / "store.snap"
+    write_snapshot(make_products(), path, sequence=7)
+    with open_snapshot(path, writable=False) as table:
+        assert table.sequence == 7
+        assert len(table) == 3
+        shipping = table.find(20)
+        assert isinstance(shipping, LimitedProduct)
+        assert (shipping.name, shipping.quantity, shipping.maximum) == \
+            ("Shipping", 250, 1)
+        macbook = table.find(30)
+        assert macbook.promotion.name == "Second Half price!"
+        assert macbook.get_price(2) == 2175
+        assert table.find(10).promotion.percent == 30
+        with pytest.raises(ValueError):
+            table.find(11)
+
+
+def test_stock_changes_are_written_in_place(tmp_path):
+    path = tmp_path / "store.snap"
+    write_snapshot(make_products(), path)
+    with open_snapshot(path) as table:
+        store = Store(list(table))
+        store.order([(store.get_product(30), 100), (store.get_product(20), 1)])
+        table.flush()
+    with open_snapshot(path, writable=False) as table:
+        assert table.find(30).quantity == 0
+        assert not table.find(30).is_active
+        assert table.find(20).quantity == 249
+
+
+def test_open_rejects_other_files(tmp_path):
+    path = tmp_path / "not-a-snapshot"
+    path.write_bytes(b"x" * 100)
+    with pytest.raises(ValueError):
+        open_snapshot(path)
+
+
+def test_load_store_from_catalog(tmp_path):
+    path = tmp_path / "catalog.snap"
+    write_snapshot(make_products(), path)
+    store = main.load_store(path)
+    macbook = store.get_product(30)
+    assert store.order([(macbook, 2), (store.get_product(10), 1)]) == \
+        2175 + 87.5
+    assert store.get_total_quantity() == 98 + 1 + 250
+    with open_snapshot(path, writable=False) as table:
+        assert table.find(30).quantity == 100
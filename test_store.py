@@ -0,0 +1,323 @@
+import pytest
+from products import Product, NonStockedProduct, LimitedProduct
+from store import Store
+
+
+def make_store():
+    return Store([
+        Product("MacBook Air M2", price=1450, quantity=100),
+        Product("Google Pixel 7", price=500, quantity=2),
+        NonStockedProduct("Windows License", price=125),
+        LimitedProduct("Shipping", price=10, quantity=250, maximum=1),
+    ])
+
+
+def test_products_are_indexed_by_id_and_name():
+    store = make_store()
+    pixel = store.find_products("Google Pixel 7")[0]
+    assert store.get_product(pixel.product_id) is pixel
+    assert pixel in store
+    assert store.find_products("Unknown") == []
+    with pytest.raises(ValueError):
+        store.add_product(pixel)
+
+
+def test_remove_product_updates_indexes():
+    store = make_store()
+    pixel = store.find_products("Google Pixel 7")[0]
+    store.remove_product(pixel)
+    assert pixel not in store
+    assert pixel not in store.get_all_products()
+    assert store.find_products("Google Pixel 7") == []
+    with pytest.raises(ValueError):
+        store.remove_product(pixel)
+
+
+def test_sold_out_product_leaves_active_set():
+    store = make_store()
+    pixel = store.find_products("Google Pixel 7")[0]
+    assert store.order([(pixel, 2)]) == 1000
+    assert pixel not in store.get_all_products()
+    assert len(store.get_all_products()) == 3
+
+
+def test_order_rejects_product_from_another_store():
+    store = make_store()
+    stranger = Product("MacBook Air M2", price=1450, quantity=100)
+    with pytest.raises(ValueError):
+        store.order([(stranger, 1)])
+
+
+def test_aggregates_follow_orders_and_catalog_changes():
+    store = make_store()
+    macbook = store.find_products("MacBook Air M2")[0]
+    assert store.get_total_quantity() == 100 + 2 + 1 + 250
+    assert store.get_stock_value() == 145000 + 1000 + 125 + 2500
+
+    store.order([(macbook, 10)])
+    assert store.get_total_quantity() == 90 + 2 + 1 + 250
+    assert store.get_stock_value() == 130500 + 1000 + 125 + 2500
+
+    store.remove_product(macbook)
+    assert store.get_total_quantity() == 2 + 1 + 250
+    assert store.get_active_count() == 3
+
+
+def test_aggregates_are_built_on_first_use():
+    store = make_store()
+    macbook = store.find_products("MacBook Air M2")[0]
+    pixel = store.find_products("Google Pixel 7")[0]
+    store.order([(macbook, 10), (pixel, 2)])
+    store.remove_product(store.find_products("Shipping")[0])
+    store.add_product(Product("Bose Earbuds", price=250, quantity=4))
+    assert store.get_active_count() == 3
+    assert store.get_total_quantity() == 90 + 1 + 4
+    assert store.get_promoted_stock_value() == 130500 + 125 + 1000
+
+
+def test_promoted_stock_value_tracks_promotions():
+    from promotions import PercentDiscount
+    store = make_store()
+    pixel = store.find_products("Google Pixel 7")[0]
+    before = store.get_promoted_stock_value()
+    pixel.set_promotion(PercentDiscount("50% off", percent=50))
+    assert store.get_promoted_stock_value() == before - 500
+    pixel.remove_promotion()
+    assert store.get_promoted_stock_value() == before
+
+
+def test_order_many_matches_sequential_orders():
+    from promotions import SecondHalfPrice, ThirdOneFree
+    store, reference = make_store(), make_store()
+    for target in (store, reference):
+        target.find_products("MacBook Air M2")[0].set_promotion(
+            SecondHalfPrice("Second Half price!"))
+        target.find_products("Windows License")[0].set_promotion(
+            ThirdOneFree("Third One Free!"))
+
+    def lines(target, spec):
+        return [(target.find_products(name)[0], qty) for name, qty in spec]
+
+    specs = [[("MacBook Air M2", 3), ("Shipping", 1)],
+             [("Windows License", 4)],
+             [("MacBook Air M2", 1), ("Google Pixel 7", 2)]]
+    result = store.order_many([lines(store, spec) for spec in specs])
+    expected = [reference.order(lines(reference, spec)) for spec in specs]
+    assert result.totals == expected
+    assert result.failures == []
+    assert store.get_total_quantity() == reference.get_total_quantity()
+
+
+def test_order_batch_places_each_order_all_or_nothing():
+    store = make_store()
+    macbook = store.find_products("MacBook Air M2")[0]
+    pixel = store.find_products("Google Pixel 7")[0]
+    shipping = store.find_products("Shipping")[0]
+    stranger = Product("Stranger", price=1, quantity=1)
+    results = store.order_batch([[(macbook, 2), (shipping, 1)],
+                                 [(pixel, 1), (shipping, 2)],
+                                 [(pixel, 2)],
+                                 [(stranger, 1)]])
+    assert results[0] == 2 * 1450 + 10
+    assert isinstance(results[1], ValueError)
+    assert results[2] == 2 * 500
+    assert isinstance(results[3], ValueError)
+    assert (macbook.get_quantity(), pixel.get_quantity(),
+            shipping.get_quantity()) == (98, 0, 249)
+
+
+def test_order_many_reports_failed_lines():
+    store = make_store()
+    pixel = store.find_products("Google Pixel 7")[0]
+    shipping = store.find_products("Shipping")[0]
+    result = store.order_many([[(pixel, 1)], [(pixel, 2), (shipping, 1)],
+                               [(shipping, 2)], [(pixel, 1)]])
+    assert result.totals == [500, 10, 0.0, 500]
+    assert [failure[:2] for failure in result.failures] == [(1, 0), (2, 0)]
+    assert pixel.get_quantity() == 0
+    assert shipping.get_quantity() == 249
+
+
+def test_quote_prices_like_order_without_buying():
+    from promotions import SecondHalfPrice, PercentDiscount
+    store = make_store()
+    macbook = store.find_products("MacBook Air M2")[0]
+    macbook.set_promotion(SecondHalfPrice("Second Half price!"))
+    windows = store.find_products("Windows License")[0]
+    windows.set_promotion(PercentDiscount("30% off!", percent=30))
+    shopping_list = [(macbook, 3), (windows, 1)]
+    quote = store.quote(shopping_list)
+    assert quote.can_order
+    assert [(line.list_price, line.price, line.promotion)
+            for line in quote.lines] == [
+        (4350, 2900.0, "Second Half price!"), (125, 87.5, "30% off!")]
+    assert store.get_total_quantity() == 100 + 2 + 1 + 250
+    assert store.order(shopping_list) == quote.total
+
+
+def test_quote_many_reports_lines_that_cant_be_bought():
+    store = make_store()
+    pixel = store.find_products("Google Pixel 7")[0]
+    shipping = store.find_products("Shipping")[0]
+    stranger = Product("Google Pixel 7", price=500, quantity=5)
+    store.reserve([(pixel, 1)], ttl=60)
+    first, second = store.quote_many([[(pixel, 1), (shipping, 2)],
+                                      [(pixel, 2), (stranger, 1)]])
+    assert first.total == 500
+    assert not first.can_order
+    assert [line.error is None for line in first.lines] == [True, False]
+    assert second.total == 0.0
+    assert all(line.error for line in second.lines)
+    cents = Store([Product("Cable", price=0.1, quantity=3)], money="cents")
+    assert cents.quote([(cents.products[0], 3)]).total == 30
+
+
+def test_failed_order_leaves_stock_untouched():
+    store = make_store()
+    macbook = store.find_products("MacBook Air M2")[0]
+    pixel = store.find_products("Google Pixel 7")[0]
+    shipping = store.find_products("Shipping")[0]
+    with pytest.raises(ValueError):
+        store.order([(macbook, 2), (pixel, 1), (shipping, 2)])
+    with pytest.raises(ValueError):
+        store.order([(pixel, 2), (macbook, 1), (pixel, 1)])
+    assert macbook.get_quantity() == 100
+    assert pixel.get_quantity() == 2
+    assert shipping.get_quantity() == 250
+    assert store.get_total_quantity() == 100 + 2 + 1 + 250
+
+
+def test_thread_safe_store_never_oversells():
+    import sys
+    import threading
+    store = Store([Product("Hot Item", price=1, quantity=1000),
+                   Product("Other Item", price=1, quantity=1000)],
+                  thread_safe=True, lock_stripes=4)
+    hot, other = store.products
+    sold = []
+
+    def buyer():
+        for _ in range(300):
+            try:
+                store.order([(hot, 1), (other, 1)])
+                sold.append(1)
+            except ValueError:
+                pass
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=buyer) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert len(sold) == 1000
+    assert hot.get_quantity() == other.get_quantity() == 0
+    assert store.get_total_quantity() == 0
+    assert store.get_active_count() == 0
+
+
+def test_aggregates_built_during_orders_stay_exact():
+    import sys
+    import threading
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for _ in range(5):
+            store = Store([Product(f"Item {number}", price=2, quantity=50)
+                           for number in range(2000)],
+                          thread_safe=True, lock_stripes=8)
+            products = store.products
+
+            def buyer(offset):
+                for turn in range(0, 2000, 4):
+                    store.order([(products[offset + turn], 1)])
+
+            threads = [threading.Thread(target=buyer, args=(offset,))
+                       for offset in range(4)]
+            for thread in threads:
+                thread.start()
+            store.get_total_quantity()
+            store.get_promoted_stock_value()
+            for thread in threads:
+                thread.join()
+            assert store.get_total_quantity() == 2000 * 49
+            assert store.get_stock_value() == 2000 * 49 * 2
+            assert store.get_promoted_stock_value() == 2000 * 49 * 2
+    finally:
+        sys.setswitchinterval(interval)
+
+
+def test_products_page_through_with_cursor_and_filters():
+    store = Store([Product(f"Product {number}", price=number, quantity=number)
+                   for number in range(10)])
+    first = store.get_products_page(page_size=4)
+    assert [product.price for product in first.products] == [0, 1, 2, 3]
+    second = store.get_products_page(page_size=4, cursor=first.next_cursor)
+    assert [product.price for product in second.products] == [4, 5, 6, 7]
+    last = store.get_products_page(page_size=4, cursor=second.next_cursor)
+    assert [product.price for product in last.products] == [8, 9]
+    assert last.next_cursor is None
+
+    page = store.get_products_page(page_size=3, offset=1, active_only=True,
+                                   where=lambda product: product.price % 2)
+    assert [product.price for product in page.products] == [3, 5, 7]
+    with pytest.raises(ValueError):
+        store.get_products_page(cursor=-1)
+
+
+def test_cursor_follows_products_added_and_removed():
+    store = Store([Product(f"Product {number}", price=number, quantity=1,
+                           product_id=number) for number in range(6)])
+    page = store.get_products_page(page_size=2)
+    assert page.next_cursor == 1
+    store.remove_product(store.get_product(2))
+    store.add_product(Product("Product 2", price=2, quantity=1, product_id=2))
+    store.add_product(Product("Product 6", price=6, quantity=1, product_id=6))
+    ids = []
+    while page.next_cursor is not None:
+        page = store.get_products_page(page_size=2, cursor=page.next_cursor)
+        ids += [product.product_id for product in page.products]
+    assert ids == [3, 4, 5, 2, 6]
+    assert [product.product_id for product in store.iter_products(after=5)] \
+        == [2, 6]
+    store.remove_product(store.get_product(5))
+    with pytest.raises(ValueError):
+        list(store.iter_products(after=5))
+
+
+def test_holds_take_stock_until_committed_released_or_expired():
+    now = [0.0]
+    store = Store([Product("Google Pixel 7", price=500, quantity=5)],
+                  clock=lambda: now[0])
+    pixel = store.products[0]
+
+    token = store.reserve([(pixel, 3)], ttl=60)
+    assert store.get_available_quantity(pixel) == 2
+    with pytest.raises(ValueError):
+        store.order([(pixel, 3)])
+    with pytest.raises(ValueError):
+        store.reserve([(pixel, 3)], ttl=60)
+    assert store.order_many([[(pixel, 3)]]).failures[0][2] == \
+        "Not enough stock available"
+
+    assert store.commit(token) == 1500
+    assert pixel.get_quantity() == 2
+    assert store.get_available_quantity(pixel) == 2
+    with pytest.raises(ValueError):
+        store.commit(token)
+
+    token = store.reserve([(pixel, 2)], ttl=60)
+    store.release(token)
+    assert store.get_available_quantity(pixel) == 2
+
+    token = store.reserve([(pixel, 2)], ttl=60)
+    now[0] = 61.0
+    assert store.order([(pixel, 1)]) == 500
+    with pytest.raises(ValueError):
+        store.commit(token)
+    with pytest.raises(ValueError):
+        store.release(token)